@@ -0,0 +1,52 @@
+# benchmarks/bench_categorizer.py
+"""
+Mede a vazão do categorizador por palavras-chave.
+Uso: python benchmarks/bench_categorizer.py [quantidade_de_itens]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.categorizer import Categorizer
+
+SAMPLE_WORDS = [
+    'Corrigir', 'bug', 'na', 'API', 'de', 'login', 'rapidamente', 'Estudar', 'capítulo', 'do', 'livro',
+    'Reunião', 'com', 'cliente', 'sobre', 'o', 'projeto', 'Ir', 'à', 'academia', 'e', 'ao', 'médico',
+    'programação', 'assíncrona', 'revisar', 'relatório', 'família', 'vídeo', 'aula', 'deploy'
+]
+
+
+def make_items(count):
+    rng = random.Random(42)
+    return [
+        {
+            'id': index,
+            'title': ' '.join(rng.choices(SAMPLE_WORDS, k=6)),
+            'text': ' '.join(rng.choices(SAMPLE_WORDS, k=40))
+        }
+        for index in range(count)
+    ]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    items = make_items(count)
+
+    started = time.perf_counter()
+    categorizer = Categorizer()
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    results = categorizer.categorize_many(items)
+    elapsed = time.perf_counter() - started
+
+    print(f"Compilação do léxico: {compile_ms:.2f} ms")
+    print(f"{len(results)} itens em {elapsed * 1000:.1f} ms ({len(results) / elapsed:,.0f} itens/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# benchmarks/bench_export_memory.py
+"""
+Pico de memória (tracemalloc) da exportação de tarefas para a nuvem: lista + json.dumps(indent=2)
++ encode (abordagem antiga) contra a gravação em streaming do ExportFile, para volumes crescentes.
+No streaming o pico deve ficar praticamente constante. Também confere que o JSON gerado é
+igual ao de `json.dumps` e que o NDJSON com gzip é lido de volta sem perdas.
+Uso: python benchmarks/bench_export_memory.py
+"""
+
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services import export_stream
+from src.services.export_stream import ExportFile, read_export
+
+HEADER = {'delta_seq': 3, 'exported_at': '2024-01-01T00:00:00', 'version': '2.0'}
+
+
+def fake_task(i):
+    return {
+        'id': i, 'title': f'Tarefa {i}', 'description': 'Descrição da tarefa ' * 5, 'status': 'pending',
+        'priority': 'medium', 'project_id': i % 50, 'created_by': 1, 'tags': ['a', 'b'],
+        'created_at': '2024-01-01T00:00:00', 'updated_at': '2024-01-02T00:00:00', 'completed_at': None
+    }
+
+
+def rows(count):
+    return (fake_task(i) for i in range(count))
+
+
+def peak(func):
+    tracemalloc.start()
+    func()
+    _, top = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return top / 1024 / 1024
+
+
+def old_export(count):
+    data = dict({'tasks': [task for task in rows(count)]}, **HEADER)
+    return json.dumps(data, indent=2).encode('utf-8')
+
+
+def streamed_export(count, export_format='json'):
+    export = ExportFile(export_format).write('tasks', rows(count), HEADER, volatile=('exported_at', 'delta_seq'))
+    export.close()
+
+
+def main():
+    # O arquivo temporário vai para o disco a partir de 1 MB, para medir só o custo da serialização
+    export_stream.SPOOL_MAX_BYTES = 1024 * 1024
+
+    sample = ExportFile('json').write('tasks', rows(100), HEADER)
+    assert sample.read_all() == json.dumps(dict({'tasks': list(rows(100))}, **HEADER), separators=(',', ':')).encode()
+    gz = ExportFile('ndjson.gz').write('tasks', rows(100), HEADER)
+    assert read_export(gz.read_all()) == dict({'tasks': list(rows(100))}, **HEADER)
+    print(f"Formato conferido (100 tarefas: JSON {sample.size} bytes, NDJSON gzip {gz.size} bytes)\n")
+
+    print(f"{'tarefas':>8} {'antes (MB)':>11} {'JSON stream':>12} {'NDJSON gz':>10}")
+    for count in (1_000, 10_000, 50_000):
+        print(f"{count:>8} {peak(lambda: old_export(count)):>11.1f} "
+              f"{peak(lambda: streamed_export(count)):>12.1f} {peak(lambda: streamed_export(count, 'ndjson.gz')):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# benchmarks/bench_import_time.py
+"""
+Mede o tempo de importação da aplicação (python -X importtime) e falha se passar do orçamento
+ou se algum SDK de IA for importado no boot.
+Uso: python benchmarks/bench_import_time.py [orçamento_ms]   (padrão: IMPORT_BUDGET_MS ou 1500)
+"""
+
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que só devem ser importados no primeiro uso (ver src/services/ai_providers.py)
+LAZY_MODULES = ('google.generativeai', 'openai')
+
+TOP_N = 15
+
+
+def measure():
+    """Importa src.main em um processo limpo e retorna [(módulo, cumulativo_us, profundidade)]."""
+    env = dict(os.environ, DATABASE_URL='sqlite://', JOB_WORKER_INLINE='false')
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import src.main'],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise SystemExit(f"Falha ao importar a aplicação:\n{completed.stderr[-2000:]}")
+
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        entries.append((name.strip(), int(cumulative), len(name) - len(name.lstrip())))
+    return entries
+
+
+def main():
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else float(os.environ.get('IMPORT_BUDGET_MS', '1500'))
+    entries = measure()
+
+    total_ms = next(cumulative for name, cumulative, _ in entries if name == 'src.main') / 1000
+    top_level = sorted((e for e in entries if e[2] <= 3), key=lambda e: e[1], reverse=True)[:TOP_N]
+
+    print(f"Importação de src.main: {total_ms:.0f} ms (orçamento {budget_ms:.0f} ms)")
+    for name, cumulative, _ in top_level:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    imported = {name for name, _, _ in entries}
+    eager = [module for module in LAZY_MODULES if module in imported]
+
+    failed = False
+    if eager:
+        print(f"ERRO: importados no boot, mas deveriam ser sob demanda: {', '.join(eager)}")
+        failed = True
+    if total_ms > budget_ms:
+        print("ERRO: importação acima do orçamento")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/bench_restore.py
+"""
+Restauração de um backup .lexflow com 100 mil tarefas (e 200 projetos) em um banco SQLite
+temporário: primeiro para um usuário sem dados (tudo inserido, com IDs remapeados) e depois
+de novo, com o mesmo arquivo (tudo atualizado no lugar via ON CONFLICT, sem duplicar).
+Uso: python benchmarks/bench_restore.py [número de tarefas]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORKDIR = tempfile.mkdtemp(prefix='lexflow-bench-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORKDIR, 'bench.db')}"
+os.environ.setdefault('SEARCH_INDEX_DIR', os.path.join(WORKDIR, 'index'))
+os.environ.setdefault('JOB_WORKER_INLINE', 'false')
+
+from sqlalchemy import insert
+
+from src import db
+from src.main import app
+from src.models.project import Project, Task
+from src.models.tenant import Tenant
+from src.models.user import User
+from src.services import backup_archive
+
+
+def seed(user, tasks):
+    """Dados de origem gravados direto em lote (o tempo da carga não entra na medição)."""
+    projects = [{'name': f'Projeto {i}', 'owner_id': user.id, 'tenant_id': user.tenant_id} for i in range(200)]
+    project_ids = db.session.execute(insert(Project).returning(Project.id, sort_by_parameter_order=True),
+                                     projects).scalars().all()
+    db.session.execute(insert(Task), [
+        {'title': f'Tarefa {i}', 'description': 'Descrição da tarefa ' * 3, 'status': 'pending',
+         'priority': 'medium', 'project_id': project_ids[i % len(project_ids)], 'created_by': user.id,
+         'tenant_id': user.tenant_id, 'tags': ['a', 'b']}
+        for i in range(tasks)
+    ])
+    db.session.commit()
+
+
+def timed_restore(user, path):
+    with open(path, 'rb') as fileobj:
+        started = time.perf_counter()
+        summary = backup_archive.restore_archive(user, fileobj)
+        return time.perf_counter() - started, summary['entities']['tasks']
+
+
+def main():
+    tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    # A indexação semântica do restaurado não faz parte da medição
+    backup_archive._index_restored = lambda id_maps: None
+
+    with app.app_context():
+        db.create_all()
+        tenant = Tenant(name='bench')
+        db.session.add(tenant)
+        db.session.flush()
+        source = User(username='origem', email='origem@bench', password_hash='x', tenant_id=tenant.id)
+        target = User(username='destino', email='destino@bench', password_hash='x', tenant_id=tenant.id)
+        db.session.add_all([source, target])
+        db.session.commit()
+        seed(source, tasks)
+
+        started = time.perf_counter()
+        archive = backup_archive.build_archive(source)
+        path = os.path.join(WORKDIR, 'bench.lexflow')
+        with open(path, 'wb') as out:
+            out.write(archive.read_all())
+        archive.close()
+        print(f"Backup: {tasks} tarefas, {os.path.getsize(path) / 1024 / 1024:.1f} MB "
+              f"em {time.perf_counter() - started:.1f} s")
+
+        elapsed, counts = timed_restore(target, path)
+        print(f"Restauração (novos):     {elapsed:.1f} s {counts}")
+        elapsed, counts = timed_restore(target, path)
+        print(f"Restauração (de novo):   {elapsed:.1f} s {counts}")
+        print(f"Tarefas do destino: {Task.query.filter_by(created_by=target.id).count()}")
+
+
+if __name__ == '__main__':
+    main()
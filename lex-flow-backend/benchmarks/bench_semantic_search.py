@@ -0,0 +1,76 @@
+# benchmarks/bench_semantic_search.py
+"""
+Mede a latência da busca semântica sobre N itens de um tenant (sem banco: os vetores
+vão direto para a matriz mapeada em memória, como faz o índice incremental).
+Uso: python benchmarks/bench_semantic_search.py [itens] [consultas]   (padrão: 100000 e 200)
+Falha se o p95 passar de SEARCH_BUDGET_MS (padrão 50).
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.services.semantic_index import HashingEmbedder, TenantIndex, KIND_CODES
+
+VOCABULARY = (
+    'estudar revisar projeto reunião cliente relatório matemática álgebra python flask banco dados '
+    'prova leitura livro capítulo exercício treino corrida saúde médico consulta mercado compras '
+    'viagem orçamento financeiro investimento meta objetivo hábito rotina manhã noite semana '
+    'trabalho equipe apresentação design frontend backend deploy servidor backup nuvem tarefa'
+).split()
+
+USERS = 20
+BATCH = 5000
+
+
+def random_text(rng):
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(rng.randint(5, 30)))
+
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    budget_ms = float(os.environ.get('SEARCH_BUDGET_MS', '50'))
+    rng = random.Random(42)
+    embedder = HashingEmbedder()
+    kind_codes = list(KIND_CODES.values())
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = TenantIndex(1, embedder.dim, directory)
+        started = time.perf_counter()
+        for start in range(0, items, BATCH):
+            rows = list(range(start, min(start + BATCH, items)))
+            index.write(rows, embedder.embed([random_text(rng) for _ in rows]))
+        index.set_metadata(
+            np.ones(items, dtype=bool),
+            np.array([rng.choice(kind_codes) for _ in range(items)], dtype=np.int8),
+            np.arange(items, dtype=np.int64),
+            np.array([rng.randint(1, USERS) for _ in range(items)], dtype=np.int64)
+        )
+        print(f"Indexação de {items} itens: {time.perf_counter() - started:.1f} s")
+
+        latencies = []
+        for _ in range(queries):
+            query = ' '.join(rng.choice(VOCABULARY) for _ in range(3))
+            started = time.perf_counter()
+            index.search_vector(embedder.embed([query])[0], rng.randint(1, USERS), k=10)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"Consultas: {queries}  mediana {statistics.median(latencies):.2f} ms  p95 {p95:.2f} ms  "
+          f"máx {latencies[-1]:.2f} ms  (orçamento p95 {budget_ms:.0f} ms)")
+    if p95 > budget_ms:
+        print("ERRO: p95 acima do orçamento")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
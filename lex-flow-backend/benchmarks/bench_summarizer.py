@@ -0,0 +1,53 @@
+# benchmarks/bench_summarizer.py
+"""
+Mede o tempo do resumidor extrativo sobre entradas grandes.
+Uso: python benchmarks/bench_summarizer.py [tamanho_em_mb]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.summarizer import ExtractiveSummarizer
+
+VOCABULARY = (
+    'produtividade foco estudo revisão projeto tarefa prazo reunião hábito energia manhã tarde '
+    'objetivo missão problema estratégia aprendizado leitura prática código teste entrega cliente '
+    'pomodoro pausa descanso meta progresso obstáculo sono exercício disciplina planejamento semana'
+).split()
+FILLERS = 'o a de que e do da em um para com não uma os no se na por mais as dos como mas'.split()
+
+
+def make_text(size_bytes):
+    rng = random.Random(7)
+    parts, size = [], 0
+    while size < size_bytes:
+        words = [rng.choice(VOCABULARY if rng.random() < 0.5 else FILLERS) for _ in range(rng.randint(8, 25))]
+        sentence = ' '.join(words).capitalize() + rng.choice(['.', '.', '.', '!', '?'])
+        if rng.random() < 0.05:
+            sentence += '\n\n'
+        parts.append(sentence)
+        size += len(sentence) + 1
+    return ' '.join(parts)
+
+
+def main():
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    text = make_text(int(megabytes * 1024 * 1024))
+    summarizer = ExtractiveSummarizer()
+
+    for max_length in (200, 1000):
+        started = time.perf_counter()
+        result = summarizer.summarize(text, max_length=max_length)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{len(text) / 1024 / 1024:.1f} MB, {result['sentences_total']:,} frases, max_length={max_length}: "
+            f"{elapsed * 1000:.0f} ms ({len(result['summary'])} caracteres, {result['sentences_selected']} frases)"
+        )
+
+
+if __name__ == '__main__':
+    main()
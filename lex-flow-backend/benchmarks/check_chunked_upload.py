@@ -0,0 +1,174 @@
+# benchmarks/check_chunked_upload.py
+"""
+Verifica os uploads em partes (Google Drive, Dropbox e OneDrive) contra um servidor local que
+imita as sessões de upload de cada provedor e interrompe uma parte no meio, forçando a retomada.
+Confere o conteúdo final, que nenhuma requisição excede uma parte e que a retomada não
+reenvia o arquivo inteiro. Falha com código 1 se algum cenário divergir.
+Uso: python benchmarks/check_chunked_upload.py
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.cloud_storage import (
+    CHUNK_GRANULARITY, DropboxService, GoogleDriveService, OneDriveService
+)
+
+CHUNK = 2 * CHUNK_GRANULARITY
+# Parte (por sessão) que o servidor grava pela metade e responde com erro
+FAIL_CHUNK = 2
+
+
+class UploadStub(BaseHTTPRequestHandler):
+    sessions = {}
+    largest_body = 0
+    bytes_received = 0
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload=None, headers=None):
+        body = json.dumps(payload).encode() if payload is not None else b''
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        with UploadStub.lock:
+            UploadStub.largest_body = max(UploadStub.largest_body, len(body))
+            UploadStub.bytes_received += len(body)
+        return body
+
+    def _new_session(self):
+        session_id = str(len(UploadStub.sessions) + 1)
+        UploadStub.sessions[session_id] = {'data': bytearray(), 'chunks': 0}
+        return session_id
+
+    def _store(self, session, body):
+        """Grava a parte; na parte FAIL_CHUNK grava só a metade e sinaliza a falha."""
+        session['chunks'] += 1
+        if session['chunks'] == FAIL_CHUNK and len(body) > 1:
+            session['data'] += body[:len(body) // 2]
+            return False
+        session['data'] += body
+        return True
+
+    def _file(self, session_id):
+        data = bytes(UploadStub.sessions[session_id]['data'])
+        return {'id': session_id, 'size': len(data), 'sha256': hashlib.sha256(data).hexdigest()}
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self._body()
+        host = f"http://{self.headers['Host']}"
+        if path == '/upload/drive/v3/files':
+            self._reply(200, {}, headers={'Location': f"{host}/drive-session/{self._new_session()}"})
+        elif path.endswith(':/createUploadSession'):
+            self._reply(200, {'uploadUrl': f"{host}/onedrive-session/{self._new_session()}"})
+        elif path.startswith('/2/files/upload_session/'):
+            arg = json.loads(self.headers['Dropbox-API-Arg'])
+            endpoint = path.rsplit('/', 1)[1]
+            if endpoint == 'start':
+                return self._reply(200, {'session_id': self._new_session()})
+            cursor = arg['cursor']
+            session = UploadStub.sessions[cursor['session_id']]
+            if cursor['offset'] != len(session['data']):
+                return self._reply(409, {'error': {'.tag': 'incorrect_offset', 'correct_offset': len(session['data'])}})
+            if endpoint == 'append_v2':
+                return self._reply(200, None) if self._store(session, body) else self._reply(408, {'error': 'timeout'})
+            self._reply(200, dict(self._file(cursor['session_id']), path_display=arg['commit']['path']))
+        else:
+            self._reply(404, {})
+
+    def do_PUT(self):
+        body = self._body()
+        kind, session_id = urlparse(self.path).path.strip('/').split('/')
+        session = UploadStub.sessions[session_id]
+        match = re.match(r'bytes (\*|(\d+)-(\d+))/(\*|\d+)', self.headers.get('Content-Range', ''))
+        total = None if match.group(4) == '*' else int(match.group(4))
+        if match.group(2) is not None:
+            if int(match.group(2)) != len(session['data']):
+                return self._reply(416, {'error': 'offset fora de ordem'})
+            if not self._store(session, body):
+                return self._reply(408, {'error': 'timeout'})
+        if total is not None and len(session['data']) == total:
+            return self._reply(201, self._file(session_id))
+        if kind == 'onedrive-session':
+            return self._reply(202, {'nextExpectedRanges': [f"{len(session['data'])}-"]})
+        headers = {'Range': f"bytes=0-{len(session['data']) - 1}"} if session['data'] else {}
+        self._reply(308, None, headers=headers)
+
+    def do_GET(self):
+        kind, session_id = urlparse(self.path).path.strip('/').split('/')
+        self._reply(200, {'nextExpectedRanges': [f"{len(UploadStub.sessions[session_id]['data'])}-"]})
+
+
+def generated(size, piece=64 * 1024):
+    """Gerador de bytes determinístico, em pedaços que não coincidem com as partes."""
+    produced = 0
+    while produced < size:
+        chunk = hashlib.sha256(str(produced).encode()).digest() * (piece // 32)
+        chunk = chunk[:min(piece - 7, size - produced)]
+        produced += len(chunk)
+        yield chunk
+
+
+def main():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), UploadStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    drive, dropbox, onedrive = GoogleDriveService(), DropboxService(), OneDriveService()
+    drive.upload_url = f"{base}/upload/drive/v3"
+    dropbox.content_url = f"{base}/2"
+    onedrive.base_url = f"{base}/v1.0"
+    failures = []
+
+    def check(name, condition, detail=''):
+        print(f"  [{'ok' if condition else 'FALHOU'}] {name} {detail}")
+        if not condition:
+            failures.append(name)
+
+    size = 5 * CHUNK + 12345
+    expected = hashlib.sha256(b''.join(generated(size))).hexdigest()
+    exact = 3 * CHUNK  # termina exatamente no fim de uma parte
+    expected_exact = hashlib.sha256(b''.join(generated(exact))).hexdigest()
+
+    print("Uploads em partes com retomada:")
+    for name, service, folder in (('Google Drive', drive, 'pasta'), ('Dropbox', dropbox, '/Lex Flow'),
+                                  ('OneDrive', onedrive, 'Lex Flow')):
+        for label, total, digest in (('gerador', size, expected), ('fim alinhado à parte', exact, expected_exact)):
+            UploadStub.largest_body = UploadStub.bytes_received = 0
+            result = service.upload_stream('backup.bin', generated(total), 'token', folder, chunk_size=CHUNK)
+            check(f"{name} ({label}): conteúdo íntegro", result.get('sha256') == digest and result.get('size') == total,
+                  f"({result.get('size')} bytes)")
+            check(f"{name} ({label}): requisições limitadas a uma parte", UploadStub.largest_body <= CHUNK,
+                  f"(maior corpo: {UploadStub.largest_body})")
+            # A parte interrompida conta inteira; a retomada reenvia só a metade que faltava
+            check(f"{name} ({label}): retomada sem reenvio", UploadStub.bytes_received <= total + CHUNK // 2 + 1024,
+                  f"(recebidos: {UploadStub.bytes_received})")
+
+    content = b''.join(generated(size))
+    result = onedrive.upload_file('backup.bin', content, 'token', 'Lex Flow')
+    check('upload_file acima do limite usa a sessão', result.get('size') == size, f"({result})" if 'error' in result else '')
+
+    server.shutdown()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
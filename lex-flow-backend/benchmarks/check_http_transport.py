@@ -0,0 +1,157 @@
+# benchmarks/check_http_transport.py
+"""
+Verifica o comportamento de retentativa e timeout da camada HTTP dos provedores de nuvem
+contra um servidor HTTP local (sem acesso à rede). Falha com código 1 se algum cenário divergir.
+Uso: python benchmarks/check_http_transport.py
+"""
+
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from src.services import telemetry
+from src.services.http_transport import HTTPTransport
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Cada rota simula um comportamento de provedor; `hits` conta as chamadas por rota."""
+
+    hits = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body=b'{}', headers=None):
+        try:
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # O cliente desistiu por timeout (cenário /slow)
+
+    def _handle(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        count = StubHandler.hits[self.path] = StubHandler.hits.get(self.path, 0) + 1
+
+        if self.path == '/ok':
+            self._reply(200, b'{"ok": true}')
+        elif self.path == '/flaky':
+            # Duas falhas 503 e depois sucesso
+            self._reply(503) if count <= 2 else self._reply(200, b'{"ok": true}')
+        elif self.path == '/rate-limited':
+            # 429 com Retry-After de 1 s na primeira chamada
+            self._reply(429, headers={'Retry-After': '1'}) if count == 1 else self._reply(200, b'{"ok": true}')
+        elif self.path == '/long-retry-after':
+            self._reply(429, headers={'Retry-After': '3600'})
+        elif self.path == '/always-500':
+            self._reply(500)
+        elif self.path == '/bad-gateway':
+            # 502 na primeira chamada
+            self._reply(502) if count == 1 else self._reply(200, b'{"ok": true}')
+        elif self.path == '/disconnect':
+            # Recebe a requisição e fecha a conexão sem responder
+            self.close_connection = True
+        elif self.path == '/slow':
+            time.sleep(2)
+            self._reply(200)
+        else:
+            self._reply(404)
+
+    do_GET = _handle
+    do_POST = _handle
+    do_PUT = _handle
+
+
+def main():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    sleeps = []
+    transport = HTTPTransport('stub', connect_timeout=1, read_timeout=0.5, max_retries=3,
+                              backoff_base=0.05, backoff_max=5, sleep=lambda delay: (sleeps.append(delay), time.sleep(delay)))
+    failures = []
+
+    def check(name, condition, detail=''):
+        print(f"  [{'ok' if condition else 'FALHOU'}] {name} {detail}")
+        if not condition:
+            failures.append(name)
+
+    def scenario(path, method='GET', **kwargs):
+        StubHandler.hits.pop(path, None)
+        del sleeps[:]
+        started = time.perf_counter()
+        try:
+            result = transport.request(method, base + path, operation=path.strip('/'), **kwargs)
+        except requests.RequestException as e:
+            result = e
+        return result, StubHandler.hits.get(path, 0), time.perf_counter() - started
+
+    print("Cenários da camada HTTP:")
+    for _ in range(5):
+        transport.get(base + '/ok', operation='ok')
+    adapter = transport.session.get_adapter(base)
+    pool = next(iter(adapter.poolmanager.pools._container.values()))
+    check('conexão reaproveitada no pool', pool.num_connections == 1, f"(conexões abertas: {pool.num_connections})")
+
+    response, hits, _ = scenario('/flaky')
+    check('503 é refeito até o sucesso', getattr(response, 'status_code', None) == 200 and hits == 3, f"(chamadas: {hits})")
+
+    response, hits, elapsed = scenario('/rate-limited')
+    check('429 respeita o Retry-After', getattr(response, 'status_code', None) == 200 and hits == 2 and elapsed >= 1.0,
+          f"(chamadas: {hits}, {elapsed:.2f} s)")
+
+    response, hits, _ = scenario('/long-retry-after')
+    check('Retry-After acima do limite devolve o 429 sem esperar', getattr(response, 'status_code', None) == 429 and hits == 1,
+          f"(chamadas: {hits})")
+
+    response, hits, _ = scenario('/always-500')
+    check('desiste após max_retries', getattr(response, 'status_code', None) == 500 and hits == 4, f"(chamadas: {hits})")
+    check('backoff com jitter limitado', all(0 <= delay <= 5 for delay in sleeps), f"(esperas: {[round(d, 3) for d in sleeps]})")
+
+    response, hits, elapsed = scenario('/slow')
+    check('timeout de leitura em GET é refeito e então relançado',
+          isinstance(response, requests.ReadTimeout) and hits == 4 and elapsed < 4, f"(chamadas: {hits}, {elapsed:.2f} s)")
+
+    response, hits, _ = scenario('/slow', method='POST')
+    check('timeout de leitura em POST não é refeito', isinstance(response, requests.ReadTimeout) and hits == 1,
+          f"(chamadas: {hits})")
+
+    response, hits, _ = scenario('/disconnect', method='POST')
+    check('conexão interrompida em POST não é refeita', isinstance(response, requests.ConnectionError) and hits == 1,
+          f"(chamadas: {hits})")
+
+    response, hits, _ = scenario('/disconnect')
+    check('conexão interrompida em GET é refeita', isinstance(response, requests.ConnectionError) and hits == 4,
+          f"(chamadas: {hits})")
+
+    response, hits, _ = scenario('/bad-gateway', method='POST')
+    check('502 em POST não é refeito', getattr(response, 'status_code', None) == 502 and hits == 1,
+          f"(chamadas: {hits})")
+
+    response, hits, _ = scenario('/rate-limited', method='POST')
+    check('429 em POST é refeito', getattr(response, 'status_code', None) == 200 and hits == 2, f"(chamadas: {hits})")
+
+    metrics = telemetry.registry.render()
+    check('métricas por chamada registradas',
+          'lexflow_http_request_duration_seconds_count{provider="stub",operation="flaky"' in metrics
+          and 'lexflow_http_retries_total{provider="stub",operation="rate-limited"' in metrics)
+
+    server.shutdown()
+    transport.close()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
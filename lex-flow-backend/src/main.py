@@ -17,7 +17,7 @@ from src import db
 from src.models.user import db
 from src.routes.user import user_bp
 from src.routes.auth import auth_bp
-from src.routes.cloud import cloud_bp
+from src.routes.cloud import cloud_bp, sync_scheduler, token_refresher
 from src.routes.collaboration import collaboration_bp
 from src.routes.ai import ai_bp
 from src.routes.telos import telos_bp
@@ -27,7 +27,14 @@ from src.routes.gamification import gamification_bp
 from src.routes.integrations import integrations_bp
 from src.routes.study_videos import study_videos_bp
 from src.routes.analytics import analytics_bp
+from src.routes.jobs import jobs_bp
+from src.routes.metrics import metrics_bp
+from src.routes.search import search_bp
 from src.services.collaboration import CollaborationService
+from src.services.job_queue import job_queue
+from src.services import telemetry
+from src.services import semantic_index
+from src.services import cloud_storage
 
 # --- CRIAÇÃO DAS INSTÂNCIAS GLOBAIS DAS EXTENSÕES ---
 # Inicializar as extensões fora da fábrica permite que sejam importadas em outros módulos (como blueprints) sem causar importações circulares.
@@ -102,6 +109,16 @@ def create_app():
     
     app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
 
+    # Blueprint para consultar o status dos jobs em segundo plano.
+    app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
+
+    # Busca semântica local em anotações, tarefas, revisões e vídeos.
+    app.register_blueprint(search_bp, url_prefix='/api/search')
+
+    # Métricas no formato do Prometheus (fora de /api, como esperado pelos coletores).
+    app.register_blueprint(metrics_bp)
+    telemetry.init_app(app)
+
     # --- 5. INICIALIZAÇÃO DE SERVIÇOS E ROTAS GLOBAIS ---
     
     # Inicializa o serviço de colaboração, passando a instância do SocketIO.
@@ -109,6 +126,22 @@ def create_app():
     # Anexa o serviço ao objeto 'app' para que possa ser acessado em outras partes da aplicação, se necessário.
     app.collaboration_service = collaboration_service
 
+    # Fila de jobs em segundo plano (tabela 'background_jobs', sem broker externo).
+    # Os workers rodam em um processo separado: 'python -m src.worker'. Importar o app
+    # (gunicorn, 'flask ...', scripts) não inicia threads; ver start_inline_services.
+    job_queue.init_app(app, socketio)
+
+    # Índice semântico atualizado a cada commit; 'flask search-reindex' reconstrói do zero.
+    semantic_index.init_app(app)
+
+    # Registro de exclusões usado pela sincronização incremental com a nuvem.
+    cloud_storage.init_app(app)
+
+    # Renovação antecipada dos tokens OAuth e sincronização automática das conexões de nuvem
+    # (rodam no worker; ver start_inline_services).
+    token_refresher.init_app(app)
+    sync_scheduler.init_app(app)
+
     # Rota "catch-all" para servir a aplicação de página única (SPA) do frontend.
     # Qualquer rota não reconhecida pela API do Flask será direcionada para o 'index.html' do frontend,
     # permitindo que o roteador do React (React Router) assuma o controle.
@@ -132,6 +165,17 @@ def create_app():
     # Retorna a instância do aplicativo configurada.
     return app
 
+def start_inline_services():
+    """
+    Roda em threads do próprio processo o que normalmente fica em 'python -m src.worker'.
+    Só no servidor de desenvolvimento ('python src/main.py') e com JOB_WORKER_INLINE=true.
+    """
+    if os.environ.get('JOB_WORKER_INLINE', 'false').lower() != 'true':
+        return
+    job_queue.start_background_workers(int(os.environ.get('JOB_WORKER_THREADS', '1')))
+    token_refresher.start()
+    sync_scheduler.start()
+
 # --- PONTO DE ENTRADA DA APLICAÇÃO ---
 
 # Cria a instância do app usando a fábrica.
@@ -143,4 +187,8 @@ app = create_app()
 if __name__ == '__main__':
     # 'host="0.0.0.0"' torna o servidor acessível na rede local.
     # 'debug=True' ativa o recarregamento automático e o debugger. Não use em produção!
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    debug = True
+    # Com o reloader, o processo pai só observa os arquivos: os workers ficam no filho, que atende as requisições
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_inline_services()
+    socketio.run(app, host='0.0.0.0', port=5000, debug=debug)
\ No newline at end of file
@@ -8,9 +8,12 @@ from .project import Project, Task, ProjectCollaborator # Importa todas as class
 from .quick_note import QuickNote
 from .pomodoro import PomodoroSettings, PomodoroSession
 from .gamification import GamificationProfile
-from .integration import Integration
+from .integration import Integration, ExternalTaskLink
 from .study_video import StudyVideo
-from .cloud_sync import CloudSync # Novo import
+from .cloud_sync import CloudSync, SyncTombstone, BackupIdMap, InstanceSetting # Novo import
+from .category_lexicon import CategoryLexicon
+from .background_job import BackgroundJob
+from .search_index import SearchIndexEntry
 
 # Importa os modelos do TELOS
 from .telos import TelosFramework, TelosReview
\ No newline at end of file
@@ -0,0 +1,50 @@
+# src/models/background_job.py
+
+import uuid
+from datetime import datetime
+from src import db
+from sqlalchemy.types import JSON
+
+class BackgroundJob(db.Model):
+    """
+    Fila de trabalhos em segundo plano (insights de IA, sincronizações com a nuvem, etc.).
+    A própria tabela é a fila: workers reivindicam jobs com um UPDATE condicional,
+    então nenhum broker externo é necessário.
+    """
+    __tablename__ = 'background_jobs'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    kind = db.Column(db.String(50), nullable=False) # Ex: 'ai.productivity_insights', 'cloud.sync'
+    payload = db.Column(JSON)
+    status = db.Column(db.String(20), default='queued', nullable=False) # 'queued', 'running', 'completed', 'failed'
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=3, nullable=False)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow, nullable=False) # Usado no backoff entre tentativas
+    result = db.Column(JSON)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_background_jobs_status_run_after', 'status', 'run_after'),
+        db.Index('ix_background_jobs_user_status', 'user_id', 'status'),
+    )
+
+    def to_dict(self, include_result=True):
+        """Converte o objeto em um dicionário para a API."""
+        data = {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+        if include_result:
+            data['result'] = self.result
+        return data
@@ -0,0 +1,28 @@
+# src/models/category_lexicon.py
+
+from datetime import datetime
+from src import db
+from sqlalchemy.types import JSON
+
+class CategoryLexicon(db.Model):
+    """
+    Léxico de categorização personalizado de um tenant.
+    Cada tenant tem no máximo um léxico; sem ele, o léxico padrão é usado.
+    """
+    __tablename__ = 'category_lexicons'
+
+    id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id', ondelete='CASCADE'), unique=True, nullable=False)
+    lexicon = db.Column(JSON, nullable=False) # Ex: {'técnica': {'código': 1.0, 'program*': 0.8}}
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Também serve como versão do léxico para o cache de categorizadores compilados
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        """Converte o objeto em um dicionário para a API."""
+        return {
+            'id': self.id,
+            'tenant_id': self.tenant_id,
+            'lexicon': self.lexicon,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -21,13 +21,31 @@ class CloudSync(db.Model):
     sync_enabled = db.Column(db.Boolean, default=True)
     last_sync = db.Column(db.DateTime)
     sync_status = db.Column(db.String(20), default='idle') # Ex: 'idle', 'syncing', 'error', 'completed'
-    sync_settings = db.Column(JSON) # Configurações extras
+    # Configurações extras, ex: {'auto_sync': True, 'backup_frequency': 'daily',
+    #  'folder': {'id': '<id da pasta Lex Flow no provedor>', 'ref': '<ID ou caminho usado nos uploads>'}}
+    sync_settings = db.Column(JSON)
+    # Próxima sincronização automática (ver src/services/sync_scheduler.py); None = só manual
+    next_sync_at = db.Column(db.DateTime, index=True)
+    # Estado da sincronização incremental por entidade, ex:
+    # {'tasks': {'watermark': '2024-01-01T10:00:00', 'delta_seq': 12, 'snapshot_seq': 10, ...},
+    #  'backups': [{'file_name': 'lexflow-backup-20240101T100000Z.lexflow', 'ref': '<id remoto>', ...}],
+    #  'remote': {'folder': '<id da pasta>', 'cursor': '<cursor do feed de alterações do provedor>'}}
+    sync_watermarks = db.Column(JSON)
+    # Hash do último conteúdo enviado de cada arquivo de estado completo, ex:
+    # {'settings.json': {'sha256': '...', 'ref': '<id remoto>', 'checksum': '<md5/content_hash do provedor>'}}
+    artifact_hashes = db.Column(JSON)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relacionamento explícito de volta para o User
     user = relationship('User', back_populates='cloud_connections')
 
+    def update_sync_status(self, status):
+        """Atualiza o status; uma sincronização concluída também registra `last_sync`."""
+        self.sync_status = status
+        if status == 'completed':
+            self.last_sync = datetime.utcnow()
+
     def to_dict(self):
         """Converte o objeto em um dicionário para a API."""
         return {
@@ -36,5 +54,55 @@ class CloudSync(db.Model):
             'provider_user_id': self.provider_user_id,
             'sync_enabled': self.sync_enabled,
             'last_sync': self.last_sync.isoformat() if self.last_sync else None,
-            'sync_status': self.sync_status
-        }
\ No newline at end of file
+            'sync_status': self.sync_status,
+            'sync_settings': self.sync_settings or {},
+            'next_sync_at': self.next_sync_at.isoformat() if self.next_sync_at else None
+        }
+
+
+class SyncTombstone(db.Model):
+    """
+    Registro de exclusão de tarefas/projetos, para que a sincronização incremental
+    envie as remoções sem comparar a lista inteira de IDs. Entradas já sincronizadas
+    por todas as conexões do usuário são apagadas na compactação.
+    """
+    __tablename__ = 'sync_tombstones'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    entity = db.Column(db.String(30), nullable=False) # 'tasks', 'projects'
+    entity_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_sync_tombstones_user_entity_deleted', 'user_id', 'entity', 'deleted_at'),
+    )
+
+
+class BackupIdMap(db.Model):
+    """
+    Correspondência entre o ID de um registro no backup (.lexflow) e o ID local criado ao
+    restaurá-lo. Restaurar o mesmo backup de novo atualiza os registros em vez de duplicá-los.
+    """
+    __tablename__ = 'backup_id_maps'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    entity = db.Column(db.String(40), nullable=False) # 'projects', 'tasks', 'quick_notes', ...
+    source_id = db.Column(db.Integer, nullable=False)
+    local_id = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'entity', 'source_id', name='uq_backup_id_maps_source'),
+    )
+
+
+class InstanceSetting(db.Model):
+    """
+    Valores fixos desta instalação (um banco). Ex: 'instance_id', gravado no manifesto dos
+    backups para reconhecer, na restauração, um backup feito neste mesmo banco.
+    """
+    __tablename__ = 'instance_settings'
+
+    key = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.String(255), nullable=False)
@@ -30,4 +30,26 @@ class Integration(db.Model):
             'id': self.id,
             'user_id': self.user_id,
             'configs': self.configs or {}
-        }
\ No newline at end of file
+        }
+
+class ExternalTaskLink(db.Model):
+    """
+    Correspondência entre uma tarefa e o item criado para ela em um serviço externo
+    (issue do GitHub, card do Trello, página do Notion). Guarda o hash do conteúdo enviado:
+    a sincronização só chama a API para tarefas novas ou alteradas.
+    """
+    __tablename__ = 'external_task_links'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id', ondelete='CASCADE'), nullable=False)
+    target = db.Column(db.String(20), nullable=False) # 'github', 'trello' ou 'notion'
+    destination = db.Column(db.String(255), nullable=False) # repositório, lista ou database de destino
+    external_id = db.Column(db.String(255), nullable=False)
+    url = db.Column(db.String(500), nullable=True)
+    content_hash = db.Column(db.String(64), nullable=False)
+    synced_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('task_id', 'target', name='uq_external_task_links_task_target'),
+    )
@@ -61,14 +61,24 @@ class Project(db.Model):
 # -------------------------------------------------
 class Task(db.Model):
     __tablename__ = 'tasks'
+    # Consultas por autor e status (contexto das sugestões de IA: tarefas abertas e concluídas recentes)
+    __table_args__ = (
+        db.Index('ix_tasks_created_by_status', 'created_by', 'status', 'completed_at'),
+        # Sincronização incremental com a nuvem (alterações desde o último watermark)
+        db.Index('ix_tasks_created_by_updated', 'created_by', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'), nullable=False, index=True)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     status = db.Column(db.String(20), default='pending')
     category = db.Column(db.String(50), default='general')
+    # Campos usados no cálculo de prioridade
+    priority = db.Column(db.String(20), default='medium')
+    due_date = db.Column(db.DateTime, nullable=True)
+    estimated_time = db.Column(db.Integer, nullable=True) # Estimativa em minutos
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -86,6 +96,9 @@ class Task(db.Model):
             'project_id': self.project_id,
             'status': self.status,
             'category': self.category,
+            'priority': self.priority,
+            'due_date': self.due_date.isoformat() if self.due_date else None,
+            'estimated_time': self.estimated_time,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
@@ -0,0 +1,41 @@
+# src/models/search_index.py
+
+from datetime import datetime
+from src import db
+
+class SearchIndexEntry(db.Model):
+    """
+    Metadados do índice semântico: liga cada registro indexado (anotação, tarefa,
+    revisão TELOS, vídeo) à linha da matriz de vetores do seu tenant.
+    Os vetores em si ficam em um arquivo float32 mapeado em memória (ver services/semantic_index.py).
+    """
+    __tablename__ = 'search_index_entries'
+
+    id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False) # Dono (ou criador, no caso de tarefas)
+    kind = db.Column(db.String(30), nullable=False) # 'quick_note', 'task', 'telos_review', 'study_video'
+    object_id = db.Column(db.Integer, nullable=False)
+    row = db.Column(db.Integer, nullable=False) # Linha na matriz de vetores do tenant
+    content_hash = db.Column(db.String(40), nullable=False) # Evita recalcular o vetor quando o texto não mudou
+    deleted = db.Column(db.Boolean, default=False, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'object_id', name='uq_search_entry_object'),
+        db.UniqueConstraint('tenant_id', 'row', name='uq_search_entry_row'),
+        db.Index('ix_search_entries_tenant_updated', 'tenant_id', 'updated_at'),
+    )
+
+    def to_dict(self):
+        """Converte o objeto em um dicionário para a API."""
+        return {
+            'id': self.id,
+            'tenant_id': self.tenant_id,
+            'user_id': self.user_id,
+            'kind': self.kind,
+            'object_id': self.object_id,
+            'row': self.row,
+            'deleted': self.deleted,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
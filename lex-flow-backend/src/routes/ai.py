@@ -1,24 +1,39 @@
 from flask import Blueprint, request, jsonify
 from src.services.ai_service import AIService
 import asyncio
-from functools import wraps
 from datetime import datetime
 from src.routes.auth import token_required 
+from src.utils.decorators import async_route
+from src.services.categorizer import DEFAULT_CATEGORY, DEFAULT_LEXICON, get_categorizer, validate_lexicon
+from src.services.priority_scoring import PriorityScoringEngine
+from src.services.summarizer import MIN_SUMMARY_LENGTH, ExtractiveSummarizer
+from src.services.task_context import TaskContextAssembler
+from src.models.category_lexicon import CategoryLexicon
+from src.models.project import Project
+from src.services.job_queue import job_queue, job_handler
+from src.routes.jobs import wants_async, job_accepted_response
+from src import db
 
 ai_bp = Blueprint('ai', __name__)
 ai_service = AIService()
+priority_engine = PriorityScoringEngine()
+summarizer = ExtractiveSummarizer()
+task_context = TaskContextAssembler(priority_engine)
+
+
+# --- Jobs em segundo plano (executados pelo worker da fila) ---
+
+@job_handler('ai.productivity_insights')
+def productivity_insights_job(user_id, payload):
+    insights = asyncio.run(ai_service.get_productivity_insights(payload['user_data']))
+    return {'insights': insights, 'analysis_date': payload.get('analysis_date', 'today')}
+
+
+@job_handler('ai.schedule_optimization')
+def schedule_optimization_job(user_id, payload):
+    optimization = asyncio.run(ai_service.optimize_schedule(payload['schedule_data']))
+    return {'optimization': optimization, 'optimized_for': payload.get('optimized_for', 'produtividade geral')}
 
-def async_route(f):
-    """Decorator para rotas assíncronas"""
-    @wraps(f)
-    def wrapper(*args, **kwargs):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(f(*args, **kwargs))
-        finally:
-            loop.close()
-    return wrapper
 
 @ai_bp.route('/providers', methods=['GET', 'OPTIONS'])
 @token_required
@@ -41,9 +56,14 @@ def get_ai_providers(current_user):
 @token_required
 @async_route
 async def get_task_suggestions(current_user):
-    """Gera sugestões inteligentes de tarefas"""
+    """
+    Gera sugestões inteligentes de tarefas.
+    Basta enviar `intent`: o servidor busca tarefas, conclusões, objetivos TELOS e anotações relevantes.
+    Listas enviadas pelo cliente (`current_tasks`, `completed_tasks`, `goals`) ainda são aceitas.
+    """
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
+        intent = data.get('intent') or data.get('context', '')
         
         # Validar dados de entrada
         if not data:
@@ -53,13 +73,16 @@ async def get_task_suggestions(current_user):
             }), 400
         
         # Preparar contexto do usuário
-        user_context = {
-            'current_tasks': data.get('current_tasks', []),
-            'completed_tasks': data.get('completed_tasks', []),
-            'goals': data.get('goals', []),
-            'preferences': data.get('preferences', {}),
-            'additional_context': data.get('context', '')
-        }
+        if any(key in data for key in ('current_tasks', 'completed_tasks', 'goals')):
+            user_context = {
+                'current_tasks': data.get('current_tasks', []),
+                'completed_tasks': data.get('completed_tasks', []),
+                'goals': data.get('goals', []),
+                'preferences': data.get('preferences', {}),
+                'additional_context': intent
+            }
+        else:
+            user_context = task_context.assemble(current_user, intent, data.get('preferences', {}))
         
         # Gerar sugestões
         suggestions = await ai_service.get_task_suggestions(user_context)
@@ -83,7 +106,7 @@ async def get_task_suggestions(current_user):
 @token_required
 @async_route
 async def get_productivity_insights(current_user):
-    """Analisa dados e fornece insights de produtividade"""
+    """Analisa dados e fornece insights de produtividade (com `async` no corpo ou na query, vira um job)"""
     try:
         data = request.get_json()
         
@@ -103,6 +126,13 @@ async def get_productivity_insights(current_user):
             'goals_progress': data.get('goals_progress', {}),
             'time_tracking': data.get('time_tracking', [])
         }
+
+        if wants_async(data):
+            job = job_queue.enqueue(current_user.id, 'ai.productivity_insights', {
+                'user_data': user_data,
+                'analysis_date': data.get('analysis_date', 'today')
+            })
+            return job_accepted_response(job)
         
         # Gerar insights
         insights = await ai_service.get_productivity_insights(user_data)
@@ -166,7 +196,7 @@ async def get_study_recommendations(current_user):
 @token_required
 @async_route
 async def optimize_schedule(current_user):
-    """Otimiza cronograma baseado em padrões de produtividade"""
+    """Otimiza cronograma baseado em padrões de produtividade (com `async` no corpo ou na query, vira um job)"""
     try:
         data = request.get_json()
         
@@ -186,6 +216,13 @@ async def optimize_schedule(current_user):
             'preferences': data.get('preferences', {}),
             'historical_performance': data.get('historical_performance', [])
         }
+
+        if wants_async(data):
+            job = job_queue.enqueue(current_user.id, 'ai.schedule_optimization', {
+                'schedule_data': schedule_data,
+                'optimized_for': data.get('optimization_goal', 'produtividade geral')
+            })
+            return job_accepted_response(job)
         
         # Otimizar cronograma
         optimization = await ai_service.optimize_schedule(schedule_data)
@@ -218,43 +255,48 @@ async def smart_categorization(current_user):
             }), 400
         
         items = data['items']
-        categorized_items = []
+        use_ai = data.get('use_ai', False) and bool(ai_service.get_available_providers())
         
-        # Simular categorização inteligente
-        # Em uma implementação real, usaria IA para categorizar
-        for item in items:
-            category = 'geral'
-            confidence = 0.5
-            
-            text = item.get('text', '').lower()
-            title = item.get('title', '').lower()
-            
-            # Regras simples de categorização
-            if any(word in text + title for word in ['código', 'programar', 'bug', 'api', 'desenvolvimento']):
-                category = 'técnica'
-                confidence = 0.8
-            elif any(word in text + title for word in ['estudar', 'aprender', 'curso', 'vídeo', 'livro']):
-                category = 'estudo'
-                confidence = 0.8
-            elif any(word in text + title for word in ['reunião', 'call', 'apresentação', 'projeto']):
-                category = 'trabalho'
-                confidence = 0.7
-            elif any(word in text + title for word in ['pessoal', 'família', 'saúde', 'exercício']):
-                category = 'pessoal'
-                confidence = 0.7
+        # Categorizador compilado do tenant (léxico próprio ou padrão), reaproveitado entre requisições
+        categorizer = get_categorizer(current_user.tenant_id)
+        keyword_results = categorizer.categorize_many(items)
+        
+        ai_results = [None] * len(items)
+        batch_stats = None
+        if use_ai:
+            # Um único pipeline em lote categoriza todos os itens com poucas chamadas ao modelo
+            labels = categorizer.categories + [c for c in [DEFAULT_CATEGORY] if c not in categorizer.categories]
+            batch = await ai_service.categorize_items_batch(items, labels)
+            ai_results, batch_stats = batch['results'], batch['stats']
+        
+        categorized_items = []
+        for item, keyword_result, ai_result in zip(items, keyword_results, ai_results):
+            if ai_result:
+                category = ai_result['category']
+                confidence = ai_result.get('confidence', 0.8)
+                reasoning = ai_result.get('reasoning', f'Classificado por IA como {category}')
+            else:
+                # Itens que a IA não resolveu (ou modo sem IA) usam o léxico de palavras-chave
+                category = keyword_result['category']
+                confidence = keyword_result['confidence']
+                if keyword_result['matched_terms']:
+                    reasoning = f"Palavras-chave encontradas: {', '.join(keyword_result['matched_terms'])}"
+                else:
+                    reasoning = 'Nenhuma palavra-chave encontrada'
             
             categorized_items.append({
                 'id': item.get('id'),
                 'original': item,
                 'suggested_category': category,
                 'confidence': confidence,
-                'reasoning': f'Baseado em palavras-chave relacionadas a {category}'
+                'reasoning': reasoning
             })
         
         return jsonify({
             'success': True,
             'categorized_items': categorized_items,
-            'total_processed': len(items)
+            'total_processed': len(items),
+            'batch_stats': batch_stats
         })
         
     except Exception as e:
@@ -263,6 +305,40 @@ async def smart_categorization(current_user):
             'error': str(e)
         }), 500
 
+@ai_bp.route('/categorization/lexicon', methods=['GET', 'OPTIONS'])
+@token_required
+def get_categorization_lexicon(current_user):
+    """Retorna o léxico de categorização do tenant (ou o padrão)"""
+    lexicon = CategoryLexicon.query.filter_by(tenant_id=current_user.tenant_id).first()
+    return jsonify({
+        'success': True,
+        'lexicon': lexicon.lexicon if lexicon else DEFAULT_LEXICON,
+        'is_default': lexicon is None
+    })
+
+@ai_bp.route('/categorization/lexicon', methods=['PUT'])
+@token_required
+def save_categorization_lexicon(current_user):
+    """Salva o léxico de categorização do tenant"""
+    data = request.get_json() or {}
+    try:
+        lexicon_data = validate_lexicon(data.get('lexicon'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    try:
+        lexicon = CategoryLexicon.query.filter_by(tenant_id=current_user.tenant_id).first()
+        if lexicon:
+            lexicon.lexicon = lexicon_data
+        else:
+            lexicon = CategoryLexicon(tenant_id=current_user.tenant_id, lexicon=lexicon_data)
+            db.session.add(lexicon)
+        db.session.commit()
+        return jsonify({'success': True, 'lexicon': lexicon.to_dict()})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @ai_bp.route('/smart-summary', methods=['POST', 'OPTIONS'])
 @token_required
 @async_route
@@ -279,28 +355,32 @@ async def smart_summary(current_user):
         
         content = data['content']
         summary_type = data.get('type', 'general')  # general, technical, study
-        max_length = data.get('max_length', 200)
+        try:
+            max_length = int(data.get('max_length', 200))
+        except (TypeError, ValueError):
+            max_length = 0
+        if max_length < 1 or isinstance(data.get('max_length'), bool):
+            return jsonify({
+                'success': False,
+                'error': 'max_length deve ser um inteiro positivo'
+            }), 400
+        max_length = max(max_length, MIN_SUMMARY_LENGTH)
         
-        # Simular resumo inteligente
-        # Em uma implementação real, usaria IA para gerar resumo
-        words = content.split()
-        if len(words) <= max_length // 5:  # Aproximadamente 5 caracteres por palavra
-            summary = content
-        else:
-            # Resumo simples pegando primeiras e últimas frases
-            sentences = content.split('.')
-            if len(sentences) > 3:
-                summary = '. '.join(sentences[:2] + sentences[-1:]) + '.'
-            else:
-                summary = content[:max_length] + '...' if len(content) > max_length else content
+        # Resumo extrativo local (TF-IDF + TextRank), limitado a max_length caracteres
+        result = summarizer.summarize(content, max_length=max_length)
+        summary = result['summary']
         
         return jsonify({
             'success': True,
             'summary': summary,
             'original_length': len(content),
             'summary_length': len(summary),
-            'compression_ratio': round(len(summary) / len(content), 2),
-            'type': summary_type
+            'compression_ratio': round(len(summary) / len(content), 2) if content else 1.0,
+            'type': summary_type,
+            'method': 'extractive',
+            'sentences_total': result['sentences_total'],
+            'sentences_selected': result['sentences_selected'],
+            'chunked': result['chunked']
         })
         
     except Exception as e:
@@ -325,61 +405,45 @@ async def priority_scoring(current_user):
         
         tasks = data['tasks']
         user_context = data.get('context', {})
+        priority_categories = user_context.get('priority_categories', [])
+        top_k = data.get('top_k')
+        if top_k is not None and (isinstance(top_k, bool) or not isinstance(top_k, int) or top_k < 1):
+            return jsonify({
+                'success': False,
+                'error': 'top_k deve ser um inteiro positivo'
+            }), 400
         
-        scored_tasks = []
-        
-        for task in tasks:
-            # Calcular score baseado em múltiplos fatores
-            score = 50  # Score base
-            
-            # Fator urgência
-            if task.get('due_date'):
-                # Simular cálculo de urgência baseado na data
-                score += 20
-            
-            # Fator importância
-            priority = task.get('priority', 'média').lower()
-            if priority == 'alta':
-                score += 30
-            elif priority == 'baixa':
-                score -= 10
-            
-            # Fator esforço (menos esforço = maior score)
-            estimated_time = task.get('estimated_time', 60)
-            if estimated_time < 30:
-                score += 15
-            elif estimated_time > 120:
-                score -= 15
-            
-            # Fator categoria
-            category = task.get('category', '').lower()
-            if category in user_context.get('priority_categories', []):
-                score += 10
-            
-            # Normalizar score (0-100)
-            score = max(0, min(100, score))
-            
-            scored_tasks.append({
-                'id': task.get('id'),
-                'task': task,
-                'priority_score': score,
-                'factors': {
-                    'urgency': 'due_date' in task,
-                    'importance': priority,
-                    'effort': estimated_time,
-                    'category_match': category in user_context.get('priority_categories', [])
-                }
-            })
+        use_ai = data.get('use_ai', False) and bool(ai_service.get_available_providers())
+        
+        if use_ai:
+            # Scores da IA substituem os do motor; tarefas que a IA não pontuou mantêm o score calculado
+            batch = await ai_service.score_tasks_batch(tasks, user_context)
+            ai_results, batch_stats = batch['results'], batch['stats']
+            results = priority_engine.score_tasks(tasks, priority_categories)
+            for result in results:
+                ai_result = ai_results[result['index']]
+                if ai_result:
+                    result['priority_score'] = max(0, min(100, round(ai_result['priority_score'])))
+                    result['reasoning'] = ai_result.get('reasoning', '')
+            results.sort(key=lambda x: x['priority_score'], reverse=True)
+            if top_k is not None:
+                results = results[:top_k]
+        else:
+            batch_stats = None
+            results = priority_engine.score_tasks(tasks, priority_categories, k=top_k)
         
-        # Ordenar por score
-        scored_tasks.sort(key=lambda x: x['priority_score'], reverse=True)
+        scored_tasks = []
+        for result in results:
+            task = tasks[result.pop('index')]
+            scored_tasks.append(dict(result, id=task.get('id'), task=task))
         
         return jsonify({
             'success': True,
             'scored_tasks': scored_tasks,
             'total_tasks': len(tasks),
             'highest_score': scored_tasks[0]['priority_score'] if scored_tasks else 0,
-            'lowest_score': scored_tasks[-1]['priority_score'] if scored_tasks else 0
+            'lowest_score': scored_tasks[-1]['priority_score'] if scored_tasks else 0,
+            'batch_stats': batch_stats
         })
         
     except Exception as e:
@@ -388,6 +452,39 @@ async def priority_scoring(current_user):
             'error': str(e)
         }), 500
 
+@ai_bp.route('/projects/<int:project_id>/priority-scores', methods=['GET', 'OPTIONS'])
+@token_required
+def project_priority_scores(current_user, project_id):
+    """Calcula scores de prioridade das tarefas de um projeto direto do banco"""
+    project = Project.query.filter_by(id=project_id, tenant_id=current_user.tenant_id).first()
+    if not project:
+        return jsonify({'success': False, 'error': 'Projeto não encontrado'}), 404
+    
+    top_k = request.args.get('top_k', type=int)
+    if 'top_k' in request.args and (top_k is None or top_k < 1):
+        return jsonify({'success': False, 'error': 'top_k deve ser um inteiro positivo'}), 400
+
+    try:
+        priority_categories = [c for c in request.args.get('priority_categories', '').split(',') if c]
+        scored_tasks, total_tasks = priority_engine.score_project(
+            project_id,
+            priority_categories,
+            k=top_k,
+            include_completed=request.args.get('include_completed') == 'true'
+        )
+        return jsonify({
+            'success': True,
+            'project_id': project_id,
+            'scored_tasks': scored_tasks,
+            'total_tasks': total_tasks,
+            'returned': len(scored_tasks)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @ai_bp.route('/cache/clear', methods=['POST'])
 def clear_ai_cache():
     """Limpa cache de sugestões de IA"""
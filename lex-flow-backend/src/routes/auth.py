@@ -4,6 +4,7 @@ from flask import Blueprint, request, jsonify, make_response
 from src.models.user import User
 from src.models.tenant import Tenant, Plan, Subscription # Modelos de SaaS
 from src import db # Importa a instância 'db' do pacote src
+from src.services import telemetry
 from datetime import datetime
 from functools import wraps
 
@@ -32,6 +33,7 @@ def token_required(f):
             current_user = User.verify_token(token)
             if not current_user:
                 return jsonify({'success': False, 'error': 'Token inválido ou expirado'}), 401
+            telemetry.set_tenant(current_user.tenant_id)
                 
         except Exception as e:
             return jsonify({'success': False, 'error': 'Token inválido', 'details': str(e)}), 401
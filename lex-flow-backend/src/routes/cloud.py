@@ -1,6 +1,6 @@
 # src/routes/cloud.py (VERSÃO ATUALIZADA)
 
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response
 from datetime import datetime, timedelta
 
 # O QUE MUDOU: Importamos o decorador que centraliza a lógica de autenticação.
@@ -9,6 +9,11 @@ from src.routes.auth import token_required
 from src.models.user import User, db
 from src.models.cloud_sync import CloudSync # Verifique se este import está correto
 from src.services.cloud_storage import CloudSyncManager, GoogleDriveService, DropboxService, OneDriveService
+from src.services.backup_archive import BackupFormatError, backup_file_name, build_archive, restore_archive
+from src.services.job_queue import job_queue, job_handler
+from src.services.token_refresher import TokenRefresher
+from src.services.sync_scheduler import FREQUENCIES, SyncScheduler
+from src.routes.jobs import wants_async, job_accepted_response
 import os
 
 cloud_bp = Blueprint('cloud', __name__)
@@ -32,6 +37,10 @@ OAUTH_CONFIGS = {
     }
 }
 sync_manager = CloudSyncManager()
+# Tokens descriptografados em cache e renovação antecipada (thread iniciada em main.py / worker.py)
+token_refresher = TokenRefresher(sync_manager.get_provider, OAUTH_CONFIGS)
+# Sincronização e backup automáticos conforme sync_settings['backup_frequency'] (também iniciado em main.py / worker.py)
+sync_scheduler = SyncScheduler(lambda user_id, provider: run_scheduled_backup(user_id, provider))
 
 # O QUE MUDOU: Esta função auxiliar não é mais necessária, pois o decorador @token_required faz o trabalho dela.
 # REMOVIDO: def get_user_from_token(token): ...
@@ -120,6 +129,8 @@ def save_connection(current_user): # O QUE MUDOU
                 existing_sync.token_expires_at = datetime.utcnow() + timedelta(seconds=tokens['expires_in'])
             existing_sync.sync_enabled = True
             existing_sync.updated_at = datetime.utcnow()
+            if existing_sync.next_sync_at is None:
+                sync_scheduler.schedule(existing_sync, first=True)
         else:
             cloud_sync = CloudSync(
                 user_id=current_user.id,
@@ -131,6 +142,7 @@ def save_connection(current_user): # O QUE MUDOU
             )
             if 'expires_in' in tokens:
                 cloud_sync.token_expires_at = datetime.utcnow() + timedelta(seconds=tokens['expires_in'])
+            sync_scheduler.schedule(cloud_sync, first=True)
             db.session.add(cloud_sync)
         
         db.session.commit()
@@ -140,6 +152,37 @@ def save_connection(current_user): # O QUE MUDOU
         return jsonify({'error': str(e)}), 500
 
 
+@cloud_bp.route('/settings/<provider>', methods=['PUT'])
+@token_required
+def update_sync_settings(current_user, provider):
+    """
+    Atualiza a sincronização automática da conexão (`auto_sync`, `backup_frequency`:
+    hourly, daily ou weekly) e reagenda a próxima execução.
+    """
+    cloud_sync = CloudSync.query.filter_by(user_id=current_user.id, provider=provider).first()
+    if not cloud_sync:
+        return jsonify({'error': 'Provider not connected'}), 400
+
+    data = request.get_json() or {}
+    frequency = data.get('backup_frequency')
+    if frequency is not None and frequency not in FREQUENCIES:
+        return jsonify({'error': f"backup_frequency must be one of: {', '.join(FREQUENCIES)}"}), 400
+
+    try:
+        settings = dict(cloud_sync.sync_settings or {})
+        if 'auto_sync' in data:
+            settings['auto_sync'] = bool(data['auto_sync'])
+        if frequency is not None:
+            settings['backup_frequency'] = frequency
+        cloud_sync.sync_settings = settings
+        sync_scheduler.schedule(cloud_sync, first=True)
+        db.session.commit()
+        return jsonify({'success': True, 'connection': cloud_sync.to_dict()})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
 @cloud_bp.route('/connections', methods=['GET'])
 @token_required # O QUE MUDOU
 def get_connections(current_user): # O QUE MUDOU
@@ -149,52 +192,292 @@ def get_connections(current_user): # O QUE MUDOU
     return jsonify({'success': True, 'connections': [conn.to_dict() for conn in connections]})
 
 
-@cloud_bp.route('/sync/<provider>', methods=['POST'])
-@token_required # O QUE MUDOU
-def sync_with_provider(current_user, provider): # O QUE MUDOU
-    """Sincroniza dados com provedor específico para o usuário atual."""
-    # REMOVIDO: Bloco de verificação de token
-    cloud_sync = CloudSync.query.filter_by(
-        user_id=current_user.id, # O QUE MUDOU
-        provider=provider
-    ).first()
-    
+def get_valid_access_token(cloud_sync):
+    """
+    Token de acesso descriptografado da conexão (em cache). Normalmente já foi renovado em
+    segundo plano pelo token_refresher; só é renovado aqui se estiver vencido.
+    Retorna (token, None) ou (None, (corpo de erro, status HTTP)).
+    """
+    return token_refresher.access_token(cloud_sync)
+
+
+def run_provider_sync(user_id, provider, force_snapshot=False):
+    """
+    Executa a sincronização do usuário com o provedor (renovando o token se necessário).
+    Usada tanto pela rota síncrona quanto pelo job 'cloud.sync'. Retorna (corpo, status HTTP).
+    Só as alterações desde a última sincronização são enviadas; `force_snapshot` reenvia tudo.
+    """
+    cloud_sync = CloudSync.query.filter_by(user_id=user_id, provider=provider).first()
+
     if not cloud_sync:
-        return jsonify({'error': 'Provider not connected'}), 400
-    
-    # ... (resto da lógica permanece a mesma, usando current_user.id) ...
+        return {'error': 'Provider not connected'}, 400
+
     try:
-        service = sync_manager.get_provider(provider)
-        access_token = service.decrypt_token(cloud_sync.access_token)
-        if cloud_sync.token_expires_at and cloud_sync.token_expires_at < datetime.utcnow():
-            if cloud_sync.refresh_token:
-                config = OAUTH_CONFIGS[provider]
-                refresh_token = service.decrypt_token(cloud_sync.refresh_token)
-                new_tokens = service.refresh_access_token(refresh_token, config['client_id'], config['client_secret'])
-                if 'access_token' in new_tokens:
-                    cloud_sync.access_token = service.encrypt_token(new_tokens['access_token'])
-                    if 'expires_in' in new_tokens:
-                        cloud_sync.token_expires_at = datetime.utcnow() + timedelta(seconds=new_tokens['expires_in'])
-                    access_token = new_tokens['access_token']
-                    db.session.commit()
-                else: return jsonify({'error': 'Failed to refresh token'}), 401
-            else: return jsonify({'error': 'Token expired and no refresh token available'}), 401
-        
+        access_token, failure = get_valid_access_token(cloud_sync)
+        if failure:
+            return failure
+
         cloud_sync.sync_status = 'syncing'
         db.session.commit()
-        
-        sync_result = sync_manager.sync_user_data(current_user.id, provider, access_token) # O QUE MUDOU
-        
+
+        sync_result = sync_manager.sync_user_data(cloud_sync, access_token, force_snapshot)
+
         if sync_result.get('success'):
             cloud_sync.update_sync_status('completed')
         else:
             cloud_sync.sync_status = 'error'
-        
+
         db.session.commit()
-        return jsonify(sync_result)
+        return sync_result, 200
     except Exception as e:
+        db.session.rollback()
         cloud_sync.sync_status = 'error'
         db.session.commit()
+        return {'error': str(e)}, 500
+
+
+def run_all_providers_sync(user_id, force_snapshot=False):
+    """
+    Sincroniza todas as conexões ativas do usuário ao mesmo tempo: os arquivos de todos os
+    provedores são enviados em paralelo (ver src/services/sync_executor.py), então o tempo
+    total fica próximo do upload mais lento. Retorna (corpo com o resultado por provedor, status HTTP).
+    """
+    connections = CloudSync.query.filter_by(user_id=user_id, sync_enabled=True).all()
+    if not connections:
+        return {'error': 'No provider connected'}, 400
+
+    results, ready = {}, []
+    try:
+        for cloud_sync in connections:
+            access_token, failure = get_valid_access_token(cloud_sync)
+            if failure:
+                results[cloud_sync.provider] = dict(failure[0], success=False)
+                continue
+            cloud_sync.sync_status = 'syncing'
+            ready.append((cloud_sync, access_token))
+        db.session.commit()
+
+        results.update(sync_manager.sync_connections(ready, force_snapshot))
+        for cloud_sync, _ in ready:
+            if results[cloud_sync.provider].get('success'):
+                cloud_sync.update_sync_status('completed')
+            else:
+                cloud_sync.sync_status = 'error'
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        for cloud_sync, _ in ready:
+            cloud_sync.sync_status = 'error'
+        db.session.commit()
+        return {'error': str(e)}, 500
+
+    return {
+        'success': all(result.get('success') for result in results.values()),
+        'results': results,
+        'upload_bytes': sum(result.get('upload_bytes', 0) for result in results.values())
+    }, 200
+
+
+@job_handler('cloud.sync')
+def cloud_sync_job(user_id, payload):
+    """Sincronização em segundo plano. Erros inesperados (500) são relançados para que o job seja refeito."""
+    body, status = run_provider_sync(user_id, payload['provider'], payload.get('full', False))
+    if status >= 500:
+        raise RuntimeError(body.get('error'))
+    return body
+
+
+@job_handler('cloud.sync_all')
+def cloud_sync_all_job(user_id, payload):
+    """Versão em segundo plano de /sync-all (mesma política de retentativa do job 'cloud.sync')."""
+    body, status = run_all_providers_sync(user_id, payload.get('full', False))
+    if status >= 500:
+        raise RuntimeError(body.get('error'))
+    return body
+
+
+@cloud_bp.route('/sync/<provider>', methods=['POST'])
+@token_required # O QUE MUDOU
+def sync_with_provider(current_user, provider): # O QUE MUDOU
+    """
+    Sincroniza dados com provedor específico para o usuário atual.
+    Com `?async=true` a sincronização vai para a fila de jobs e a resposta é 202 com o job_id.
+    Com `?full=true` o estado completo é reenviado (snapshot) em vez de apenas as alterações.
+    """
+    full = request.args.get('full', '').lower() in ('1', 'true', 'yes')
+    if wants_async():
+        if not CloudSync.query.filter_by(user_id=current_user.id, provider=provider).first():
+            return jsonify({'error': 'Provider not connected'}), 400
+        job = job_queue.enqueue(current_user.id, 'cloud.sync', {'provider': provider, 'full': full})
+        return job_accepted_response(job)
+
+    body, status = run_provider_sync(current_user.id, provider, full)
+    return jsonify(body), status
+
+
+@cloud_bp.route('/sync-all', methods=['POST'])
+@token_required
+def sync_all_providers(current_user):
+    """
+    Sincroniza com todos os provedores conectados de uma vez (aceita `?async=true` e `?full=true`).
+    Um arquivo que falhar em um provedor não impede os demais; ele é refeito na próxima sincronização.
+    """
+    full = request.args.get('full', '').lower() in ('1', 'true', 'yes')
+    if wants_async():
+        if not CloudSync.query.filter_by(user_id=current_user.id, sync_enabled=True).first():
+            return jsonify({'error': 'No provider connected'}), 400
+        job = job_queue.enqueue(current_user.id, 'cloud.sync_all', {'full': full})
+        return job_accepted_response(job)
+
+    body, status = run_all_providers_sync(current_user.id, full)
+    return jsonify(body), status
+
+
+def run_provider_backup(user_id, provider):
+    """Envia um backup .lexflow completo ao provedor e faz a rotação das versões. Retorna (corpo, status HTTP)."""
+    cloud_sync = CloudSync.query.filter_by(user_id=user_id, provider=provider).first()
+    if not cloud_sync:
+        return {'error': 'Provider not connected'}, 400
+
+    try:
+        access_token, failure = get_valid_access_token(cloud_sync)
+        if failure:
+            return failure
+        result = sync_manager.backup_user_data(cloud_sync, access_token)
+        db.session.commit()
+        return result, 200 if result.get('success') else 400
+    except Exception as e:
+        db.session.rollback()
+        return {'error': str(e)}, 500
+
+
+def run_scheduled_backup(user_id, provider):
+    """
+    Execução automática (sync_settings['backup_frequency']): sincronização incremental e, se ela
+    der certo, uma nova versão do backup .lexflow (com rotação). Retorna (corpo, status HTTP).
+    """
+    body, status = run_provider_sync(user_id, provider)
+    if status != 200 or not body.get('success'):
+        return body, status
+    backup, status = run_provider_backup(user_id, provider)
+    body = dict(body, backup=backup, success=bool(backup.get('success')))
+    if not body['success']:
+        body['error'] = backup.get('error')
+    return body, status
+
+
+@job_handler('cloud.backup')
+def cloud_backup_job(user_id, payload):
+    """Backup em segundo plano (erros inesperados são relançados para o job ser refeito)."""
+    body, status = run_provider_backup(user_id, payload['provider'])
+    if status >= 500:
+        raise RuntimeError(body.get('error'))
+    return body
+
+
+@cloud_bp.route('/backup/<provider>', methods=['POST'])
+@token_required
+def backup_to_provider(current_user, provider):
+    """
+    Envia um backup completo (.lexflow) ao provedor, mantendo as últimas CLOUD_BACKUP_KEEP versões.
+    Com `?async=true` o backup vai para a fila de jobs.
+    """
+    if wants_async():
+        if not CloudSync.query.filter_by(user_id=current_user.id, provider=provider).first():
+            return jsonify({'error': 'Provider not connected'}), 400
+        job = job_queue.enqueue(current_user.id, 'cloud.backup', {'provider': provider})
+        return job_accepted_response(job)
+
+    body, status = run_provider_backup(current_user.id, provider)
+    return jsonify(body), status
+
+
+@cloud_bp.route('/backup/export', methods=['GET'])
+@token_required
+def export_backup(current_user):
+    """Baixa o backup completo do usuário como arquivo .lexflow (enviado em streaming)."""
+    try:
+        archive = build_archive(current_user)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    return Response(archive.iter_bytes(), mimetype='application/gzip', headers={
+        'Content-Disposition': f'attachment; filename="{backup_file_name()}"',
+        'Content-Length': str(archive.size)
+    })
+
+
+def restore_progress(user_id, source):
+    """Callback de progresso da restauração: evento 'restore_progress' na sala do usuário."""
+    def report(progress):
+        job_queue.emit_to_user(user_id, 'restore_progress', dict(progress, source=source))
+    return report
+
+
+def run_provider_restore(user_id, provider, file_name=None):
+    """Baixa e restaura um backup .lexflow do provedor (o mais recente, se `file_name` não vier). Retorna (corpo, status HTTP)."""
+    cloud_sync = CloudSync.query.filter_by(user_id=user_id, provider=provider).first()
+    if not cloud_sync:
+        return {'error': 'Provider not connected'}, 400
+
+    try:
+        access_token, failure = get_valid_access_token(cloud_sync)
+        if failure:
+            return failure
+        result = sync_manager.restore_user_data(cloud_sync, access_token, file_name,
+                                                progress=restore_progress(user_id, provider))
+        if not result.get('success'):
+            return result, 404 if result.get('error') == 'Backup not found' else 400
+        return result, 200
+    except BackupFormatError as e:
+        return {'error': str(e)}, 400
+    except Exception as e:
+        db.session.rollback()
+        return {'error': str(e)}, 500
+
+
+@job_handler('cloud.restore')
+def cloud_restore_job(user_id, payload):
+    """Restauração em segundo plano (erros inesperados são relançados para o job ser refeito)."""
+    body, status = run_provider_restore(user_id, payload['provider'], payload.get('backup'))
+    if status >= 500:
+        raise RuntimeError(body.get('error'))
+    return body
+
+
+@cloud_bp.route('/restore/<provider>', methods=['POST'])
+@token_required
+def restore_from_provider(current_user, provider):
+    """
+    Restaura o backup .lexflow mais recente do provedor (ou o indicado em `?backup=<nome>`).
+    O progresso é enviado pelo Socket.IO ('restore_progress'); com `?async=true` vai para a fila de jobs.
+    """
+    file_name = request.args.get('backup')
+    if wants_async():
+        if not CloudSync.query.filter_by(user_id=current_user.id, provider=provider).first():
+            return jsonify({'error': 'Provider not connected'}), 400
+        job = job_queue.enqueue(current_user.id, 'cloud.restore', {'provider': provider, 'backup': file_name})
+        return job_accepted_response(job)
+
+    body, status = run_provider_restore(current_user.id, provider, file_name)
+    return jsonify(body), status
+
+
+@cloud_bp.route('/restore', methods=['POST'])
+@token_required
+def restore_backup(current_user):
+    """
+    Importa um backup .lexflow (campo `file` do formulário ou o corpo da requisição).
+    Os registros são gravados em lote (INSERT ... ON CONFLICT) em uma única transação;
+    importar de novo o mesmo backup atualiza os registros em vez de duplicá-los.
+    """
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    try:
+        result = restore_archive(current_user, stream, progress=restore_progress(current_user.id, 'upload'))
+        return jsonify({'success': True, 'restored': result})
+    except BackupFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
@@ -214,6 +497,7 @@ def disconnect_provider(current_user, provider): # O QUE MUDOU
     try:
         db.session.delete(cloud_sync)
         db.session.commit()
+        token_refresher.invalidate(cloud_sync.id)
         return jsonify({'success': True, 'message': f'Successfully disconnected from {provider}'})
     except Exception as e:
         db.session.rollback()
@@ -1,8 +1,14 @@
 # src/routes/integrations.py
 
-from flask import Blueprint, jsonify, request
+import json
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from src import db
 from src.models.integration import Integration
+from src.models.project import Task
+from src.routes.jobs import wants_async, job_accepted_response
+from src.services.job_queue import job_queue, job_handler
+from src.services.task_sync import DESTINATION_KEYS, INLINE_LIMIT, TaskSyncDispatcher, summarize
 from src.utils.decorators import token_required
 
 # No futuro, você criará um serviço para lidar com a lógica real
@@ -11,6 +17,9 @@ from src.utils.decorators import token_required
 
 integrations_bp = Blueprint('integrations', __name__)
 
+# Pools por alvo (GitHub, Trello, Notion) compartilhados entre as requisições
+task_sync = TaskSyncDispatcher()
+
 
 @integrations_bp.route('/', methods=['GET'])
 @token_required
@@ -102,29 +111,60 @@ def test_connections_api(current_user):
     return jsonify({'connections': mock_results})
 
 
+def _user_configs(user_id):
+    integration_config = Integration.query.filter_by(user_id=user_id).first()
+    return (integration_config.configs if integration_config else None) or {}
+
+
+def _emit_progress(user_id, events):
+    """Repassa cada evento da sincronização ao usuário ('task_sync_progress' no Socket.IO)."""
+    for event in events:
+        job_queue.emit_to_user(user_id, 'task_sync_progress', event)
+        yield event
+
+
+@job_handler('integrations.sync_tasks')
+def sync_tasks_job(user_id, payload):
+    """Sincronização de tarefas em segundo plano (o resultado é o mesmo resumo da rota síncrona)."""
+    configs = _user_configs(user_id)
+    events = task_sync.sync(user_id, payload['targets'], configs.get('credentials', {}))
+    return summarize(_emit_progress(user_id, events))
+
+
 @integrations_bp.route('/sync/tasks', methods=['POST'])
 @token_required
 def sync_tasks_api(current_user):
     """
-    Recebe alvos e dispara a sincronização de tarefas.
-    Corresponde à chamada 'syncTasksApi'.
+    Sincroniza as tarefas do usuário com os alvos informados (`{"targets": {...}}`; sem eles, os salvos).
+    Corresponde à chamada 'syncTasksApi'. Com `Accept: application/x-ndjson`, os resultados
+    chegam em streaming: uma linha JSON por tarefa e o resumo na última linha.
+    Com `?async=true`, ou mais de INTEGRATIONS_SYNC_INLINE_LIMIT tarefas, vai para a fila de jobs
+    (progresso em 'task_sync_progress' no Socket.IO).
     """
-    targets = request.get_json()
-    
-    # Placeholder: A lógica real buscaria as tarefas do usuário e as enviaria
-    # para os serviços correspondentes.
-    # Ex: results = integration_service.sync_all_tasks(current_user, targets)
-    
-    mock_results = {
-        'synced_tasks': 5,
-        'results': {
-            'github': [{'id': 123, 'url': '...'}],
-            'trello': [],
-            'notion': [],
-            'errors': ['Falha ao sincronizar 1 tarefa com o Trello.']
-        }
-    }
-    return jsonify(mock_results)
+    data = request.get_json(silent=True) or {}
+    configs = _user_configs(current_user['id'])
+    targets = data.get('targets', data)
+    if not any(targets.get(key) for key in DESTINATION_KEYS):
+        targets = configs.get('syncTargets', {})
+
+    if not any(targets.get(key) for key in DESTINATION_KEYS):
+        return jsonify({'error': 'Nenhum alvo de sincronização configurado (GitHub, Trello ou Notion).'}), 400
+
+    targets = {key: targets[key] for key in DESTINATION_KEYS if targets.get(key)}
+    if wants_async(data) or Task.query.filter_by(created_by=current_user['id']).count() > INLINE_LIMIT:
+        job = job_queue.enqueue(current_user['id'], 'integrations.sync_tasks', {'targets': targets})
+        return job_accepted_response(job)
+
+    events = task_sync.sync(current_user['id'], targets, configs.get('credentials', {}))
+    if request.accept_mimetypes.best == 'application/x-ndjson':
+        lines = (json.dumps(event, ensure_ascii=False) + '\n' for event in events)
+        return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
+    try:
+        return jsonify(summarize(events))
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
 
 
 @integrations_bp.route('/obsidian/export', methods=['POST'])
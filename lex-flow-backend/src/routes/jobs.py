@@ -0,0 +1,53 @@
+# src/routes/jobs.py
+
+from flask import Blueprint, request, jsonify
+
+from src.routes.auth import token_required
+from src.models.background_job import BackgroundJob
+
+jobs_bp = Blueprint('jobs', __name__)
+
+MAX_JOBS_LISTED = 100
+
+
+def wants_async(data=None):
+    """O cliente pede execução em segundo plano com `?async=true` ou `{"async": true}` no corpo."""
+    flag = request.args.get('async')
+    if flag is None and isinstance(data, dict):
+        flag = data.get('async')
+    return str(flag).lower() in ('1', 'true', 'yes')
+
+
+def job_accepted_response(job):
+    """Resposta 202 padrão para endpoints que enfileiram um job."""
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': f"/api/jobs/{job.id}"
+    }), 202
+
+
+@jobs_bp.route('/<job_id>', methods=['GET', 'OPTIONS'])
+@token_required
+def get_job(current_user, job_id):
+    """Status (e resultado, quando concluído) de um job do usuário."""
+    job = BackgroundJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+    if not job:
+        return jsonify({'success': False, 'error': 'Job não encontrado'}), 404
+    return jsonify({'success': True, 'job': job.to_dict()})
+
+
+@jobs_bp.route('', methods=['GET', 'OPTIONS'])
+@token_required
+def list_jobs(current_user):
+    """Jobs recentes do usuário, opcionalmente filtrados por status e tipo (sem os resultados)."""
+    query = BackgroundJob.query.filter_by(user_id=current_user.id)
+    if request.args.get('status'):
+        query = query.filter_by(status=request.args['status'])
+    if request.args.get('kind'):
+        query = query.filter_by(kind=request.args['kind'])
+
+    limit = max(1, min(request.args.get('limit', 20, type=int), MAX_JOBS_LISTED))
+    jobs = query.order_by(BackgroundJob.created_at.desc()).limit(limit).all()
+    return jsonify({'success': True, 'jobs': [job.to_dict(include_result=False) for job in jobs]})
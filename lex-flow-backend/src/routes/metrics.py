@@ -0,0 +1,24 @@
+# src/routes/metrics.py
+
+import hmac
+import os
+
+from flask import Blueprint, Response, request, jsonify
+
+from src.services import telemetry
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Métricas de latência, tokens, falhas de parse, cache e fallback das chamadas de IA.
+    Se METRICS_TOKEN estiver definido, exige 'Authorization: Bearer <METRICS_TOKEN>'.
+    """
+    expected = os.environ.get('METRICS_TOKEN')
+    if expected:
+        provided = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(provided, f"Bearer {expected}"):
+            return jsonify({'error': 'Não autorizado'}), 401
+    return Response(telemetry.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
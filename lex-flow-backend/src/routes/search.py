@@ -0,0 +1,47 @@
+# src/routes/search.py
+
+import time
+
+from flask import Blueprint, request, jsonify
+
+from src.routes.auth import token_required
+from src.services.semantic_index import semantic_index, KIND_CODES
+
+search_bp = Blueprint('search', __name__)
+
+DEFAULT_RESULTS = 10
+MAX_RESULTS = 50
+
+
+@search_bp.route('', methods=['GET', 'OPTIONS'])
+@token_required
+def semantic_search(current_user):
+    """
+    Busca semântica em anotações, tarefas, revisões TELOS e vídeos de estudo.
+    Parâmetros: q (texto), k (quantidade, até 50) e kinds (ex: 'quick_note,task').
+    """
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'success': False, 'error': 'Parâmetro q é obrigatório'}), 400
+
+    try:
+        k = max(1, min(int(request.args.get('k', DEFAULT_RESULTS)), MAX_RESULTS))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Parâmetro k inválido'}), 400
+
+    kinds = [kind.strip() for kind in request.args.get('kinds', '').split(',') if kind.strip()]
+    unknown = [kind for kind in kinds if kind not in KIND_CODES]
+    if unknown:
+        return jsonify({'success': False, 'error': f"Tipos desconhecidos: {', '.join(unknown)}"}), 400
+
+    try:
+        started = time.perf_counter()
+        results = semantic_index.search(current_user.tenant_id, current_user.id, query, k, kinds or None)
+        took_ms = (time.perf_counter() - started) * 1000
+        return jsonify({
+            'success': True,
+            'results': semantic_index.hydrate(results),
+            'took_ms': round(took_ms, 2)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
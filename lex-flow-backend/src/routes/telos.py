@@ -3,7 +3,12 @@
 from flask import Blueprint, jsonify, request
 from src import db
 from src.models.telos import TelosFramework, TelosReview
-from src.utils.decorators import token_required 
+from src.utils.decorators import token_required, async_route
+from src.services import fabric_service
+from src.services.prompt_context import build_telos_context
+from sqlalchemy import func
+from datetime import date, timedelta
+import asyncio
 import logging # Adicione o import de logging
 
 telos_bp = Blueprint('telos', __name__)
@@ -95,4 +100,72 @@ def save_telos_review(current_user):
         logger.error(f"Erro ao salvar Telos Review para o usuário {current_user['id']}: {e}")
         return jsonify({'error': 'Ocorreu um erro interno ao salvar a revisão.'}), 500
 
-# ...
\ No newline at end of file
+
+# --- PATTERNS DO FABRIC SOBRE OS DADOS SALVOS ---
+
+# Janela máxima de revisões enviadas a um pattern
+MAX_PATTERN_WINDOW_DAYS = 365
+
+@telos_bp.route('/patterns/<pattern_name>', methods=['POST'])
+@token_required
+@async_route
+async def run_telos_pattern(current_user, pattern_name):
+    """
+    Executa um pattern do Fabric sobre o framework e as revisões do usuário salvos no banco.
+    Corpo opcional: {'days': 30, 'question': '...'} ('question' é obrigatório no pattern 'chat').
+    """
+    if pattern_name not in fabric_service.PROMPTS:
+        return jsonify({'error': 'Pattern desconhecido.'}), 404
+
+    data = request.get_json(silent=True) or {}
+    question = (data.get('question') or '').strip()
+    if pattern_name == 'chat' and not question:
+        return jsonify({'error': "O pattern 'chat' requer o campo 'question'"}), 400
+    try:
+        days = max(1, min(int(data.get('days', 30)), MAX_PATTERN_WINDOW_DAYS))
+    except (TypeError, ValueError):
+        return jsonify({'error': "O campo 'days' deve ser um número"}), 400
+
+    user_id = current_user['id']
+    start_date = date.today() - timedelta(days=days)
+    try:
+        framework = TelosFramework.query.filter_by(user_id=user_id).with_entities(
+            TelosFramework.content, TelosFramework.updated_at
+        ).first()
+        if not framework:
+            return jsonify({'error': 'Framework TELOS não encontrado. Salve seu framework primeiro.'}), 404
+
+        # A versão dos dados é obtida com uma única agregação; as revisões só são carregadas se não houver cache
+        window = (TelosReview.user_id == user_id, TelosReview.review_date >= start_date)
+        review_count, last_review_update = db.session.query(
+            func.count(TelosReview.id), func.max(TelosReview.updated_at)
+        ).filter(*window).one()
+        data_version = f"{framework.updated_at}|{start_date}|{review_count}|{last_review_update}"
+
+        def load_context():
+            reviews = db.session.query(TelosReview.review_date, TelosReview.content).filter(
+                *window
+            ).order_by(TelosReview.review_date.asc()).all()
+            return build_telos_context(
+                pattern_name,
+                framework.content,
+                [{'review_date': r.review_date.isoformat(), 'content': r.content} for r in reviews]
+            )
+
+        result = await fabric_service.run_pattern_cached(user_id, pattern_name, data_version, load_context, question)
+        return jsonify({
+            'pattern': pattern_name,
+            'result': result['result'],
+            'cached': result['cached'],
+            'reviews_considered': review_count,
+            'window_start': start_date.isoformat()
+        })
+    except asyncio.TimeoutError:
+        logger.error(f"Timeout ao executar o pattern '{pattern_name}' para o usuário {user_id}")
+        return jsonify({'error': 'O modelo demorou demais para responder. Tente novamente.'}), 504
+    except fabric_service.FabricError as e:
+        logger.error(f"Erro no pattern '{pattern_name}' para o usuário {user_id}: {e}")
+        return jsonify({'error': str(e)}), 502
+    except Exception as e:
+        logger.error(f"Erro ao executar o pattern '{pattern_name}' para o usuário {user_id}: {e}")
+        return jsonify({'error': 'Ocorreu um erro interno ao executar o pattern.'}), 500
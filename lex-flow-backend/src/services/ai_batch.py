@@ -0,0 +1,178 @@
+# src/services/ai_batch.py
+"""
+Pipeline de inferência em lote para os endpoints de IA.
+
+Em vez de uma chamada ao modelo por item, os itens são deduplicados, empacotados
+em prompts estruturados (respeitando um orçamento de tokens) e enviados em
+paralelo. A resposta de cada lote é um JSON com um resultado por item; apenas
+os itens que falharam são reenviados nas tentativas seguintes.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.services import telemetry
+from src.services.json_extract import extract_json
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa barata de tokens (aproximadamente 4 caracteres por token)."""
+    return max(1, len(text) // 4)
+
+
+def _parse_batch_response(response_text: str) -> List[Dict[str, Any]]:
+    """Extrai a lista 'results' do JSON retornado pelo modelo (lança ValueError se não houver)."""
+    return extract_json(response_text, 'batch')['results']
+
+
+class BatchPromptPipeline:
+    """
+    Executa uma tarefa de IA sobre muitos itens com poucas chamadas ao modelo.
+
+    - `call_model`: corrotina que recebe o prompt e devolve (provedor usado, texto bruto do modelo).
+    - `instructions`: descrição da tarefa (o que fazer com cada item).
+    - `output_format`: exemplo do objeto esperado para cada item (sem o 'id').
+    - `validate`: função opcional que decide se o resultado de um item é aceitável.
+    - `name`: nome da operação usado na telemetria.
+    """
+
+    def __init__(self, call_model: Callable[[str], Awaitable[Tuple[str, str]]], instructions: str,
+                 output_format: Dict[str, Any], validate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                 token_budget: int = 6000, max_items_per_batch: int = 50,
+                 max_parallel: int = 4, max_retries: int = 2, max_field_chars: int = 2000,
+                 name: str = 'batch'):
+        self.call_model = call_model
+        self.instructions = instructions
+        self.output_format = output_format
+        self.validate = validate or (lambda result: True)
+        self.token_budget = token_budget
+        self.max_items_per_batch = max_items_per_batch
+        self.max_parallel = max_parallel
+        self.max_retries = max_retries
+        self.max_field_chars = max_field_chars
+        self.name = name
+
+    # --- Preparação dos itens ---
+
+    def _fit_payload(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Trunca campos de texto muito longos para que um item caiba sozinho no orçamento."""
+        return {
+            key: (value[:self.max_field_chars] if isinstance(value, str) else value)
+            for key, value in payload.items()
+        }
+
+    @staticmethod
+    def _payload_key(payload: Dict[str, Any]) -> str:
+        """Chave estável do conteúdo do item, usada para deduplicação."""
+        canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+    def _prompt_overhead(self) -> int:
+        return estimate_tokens(self._build_prompt([]))
+
+    def _pack(self, entries: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Agrupa os itens em lotes que respeitam o orçamento de tokens e o limite de itens."""
+        budget = max(1, self.token_budget - self._prompt_overhead())
+        batches, current, used = [], [], 0
+        for entry in entries:
+            cost = estimate_tokens(entry['serialized']) + 2
+            if current and (used + cost > budget or len(current) >= self.max_items_per_batch):
+                batches.append(current)
+                current, used = [], 0
+            current.append(entry)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    def _build_prompt(self, batch: List[Dict[str, Any]]) -> str:
+        example = dict({'id': 'i0'}, **self.output_format)
+        lines = '\n'.join(entry['serialized'] for entry in batch)
+        return (
+            f"{self.instructions}\n\n"
+            f"Cada linha abaixo é um item em JSON com um campo 'id'. Processe TODOS os itens.\n"
+            f"ITENS:\n{lines}\n\n"
+            f"Retorne APENAS um JSON válido no formato:\n"
+            f"{json.dumps({'results': [example]}, ensure_ascii=False)}\n"
+            f"Inclua exatamente um objeto em 'results' para cada 'id' recebido."
+        )
+
+    # --- Execução ---
+
+    async def _run_batch(self, batch: List[Dict[str, Any]], semaphore: asyncio.Semaphore) -> Dict[str, Dict[str, Any]]:
+        """Executa um lote e retorna apenas os resultados válidos, indexados pelo id do item."""
+        expected = {entry['id'] for entry in batch}
+        async with semaphore:
+            try:
+                provider, response_text = await self.call_model(self._build_prompt(batch))
+            except Exception as e:
+                logger.warning("Erro ao processar lote de %d itens: %s", len(batch), e)
+                return {}
+        try:
+            parsed = _parse_batch_response(response_text)
+        except ValueError as e:
+            telemetry.record_parse_failure(provider, self.name)
+            logger.warning("Resposta inválida para lote de %d itens: %s", len(batch), e)
+            return {}
+
+        results = {}
+        for result in parsed:
+            item_id = str(result.get('id'))
+            if item_id in expected and item_id not in results and self.validate(result):
+                results[item_id] = result
+        return results
+
+    async def run(self, items: List[Dict[str, Any]],
+                  to_payload: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Processa `items` e retorna {'results': [...], 'stats': {...}}.
+        `results` segue a ordem de `items`; itens sem resultado válido ficam como None.
+        """
+        unique_entries: Dict[str, Dict[str, Any]] = {}
+        item_keys = []
+        for item in items:
+            payload = self._fit_payload(to_payload(item))
+            key = self._payload_key(payload)
+            item_keys.append(key)
+            if key not in unique_entries:
+                entry_id = f"i{len(unique_entries)}"
+                unique_entries[key] = {
+                    'id': entry_id,
+                    'serialized': json.dumps(dict({'id': entry_id}, **payload), ensure_ascii=False, separators=(',', ':'))
+                }
+
+        resolved: Dict[str, Dict[str, Any]] = {}
+        pending = list(unique_entries.values())
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        stats = {
+            'total_items': len(items),
+            'unique_items': len(unique_entries),
+            'duplicates': len(items) - len(unique_entries),
+            'model_calls': 0,
+            'retried_items': 0,
+            'failed_items': 0
+        }
+
+        for attempt in range(self.max_retries + 1):
+            if not pending:
+                break
+            if attempt > 0:
+                stats['retried_items'] += len(pending)
+            batches = self._pack(pending)
+            stats['model_calls'] += len(batches)
+            batch_results = await asyncio.gather(*(self._run_batch(batch, semaphore) for batch in batches))
+            for results in batch_results:
+                resolved.update(results)
+            pending = [entry for entry in pending if entry['id'] not in resolved]
+
+        stats['failed_items'] = len(pending)
+        results = []
+        for key in item_keys:
+            result = resolved.get(unique_entries[key]['id'])
+            results.append({k: v for k, v in result.items() if k != 'id'} if result else None)
+        return {'results': results, 'stats': stats}
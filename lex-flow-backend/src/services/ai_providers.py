@@ -0,0 +1,89 @@
+# src/services/ai_providers.py
+"""
+Registro compartilhado dos clientes de IA (Google Gemini e OpenAI).
+
+Os SDKs são pesados para importar, então nada é importado nem configurado na
+importação deste módulo: cada cliente é criado no primeiro uso, uma única vez
+por processo, protegido por um lock. `ai_service` e `fabric_service` usam o
+mesmo registro, então `genai.configure` roda uma vez só.
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GEMINI_MODEL = 'gemini-1.5-flash'
+DEFAULT_OPENAI_MODEL = 'gpt-4o-mini'
+
+
+def _build_openai_client() -> Optional[Any]:
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        logger.info("OPENAI_API_KEY não definida; OpenAI indisponível.")
+        return None
+    import openai
+    return openai.OpenAI(api_key=api_key)
+
+
+class ProviderRegistry:
+    """Cria e guarda os clientes dos provedores sob demanda (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple[str, str], Optional[Any]] = {}
+        self._gemini_configured = False
+
+    def _get(self, key: Tuple[str, str], factory: Callable[[], Optional[Any]]) -> Optional[Any]:
+        # Caminho rápido sem lock; a falha de configuração também fica guardada (None)
+        if key in self._clients:
+            return self._clients[key]
+        with self._lock:
+            if key not in self._clients:
+                try:
+                    self._clients[key] = factory()
+                    if self._clients[key] is not None:
+                        logger.info("Cliente %s (%s) configurado.", *key)
+                except Exception as e:
+                    logger.error("Falha ao configurar o cliente %s (%s): %s", key[0], key[1], e)
+                    self._clients[key] = None
+            return self._clients[key]
+
+    def _build_gemini_model(self, model_name: str) -> Optional[Any]:
+        api_key = os.getenv('GEMINI_API_KEY')
+        if not api_key:
+            logger.info("GEMINI_API_KEY não definida; Gemini indisponível.")
+            return None
+        import google.generativeai as genai
+        # Chamado sob o lock: a configuração global da biblioteca acontece uma vez
+        if not self._gemini_configured:
+            genai.configure(api_key=api_key)
+            self._gemini_configured = True
+        return genai.GenerativeModel(model_name)
+
+    def gemini(self, model_name: str = DEFAULT_GEMINI_MODEL) -> Optional[Any]:
+        """Modelo Gemini (`GenerativeModel`) ou None se não houver chave/configuração."""
+        return self._get(('gemini', model_name), lambda: self._build_gemini_model(model_name))
+
+    def openai(self) -> Optional[Any]:
+        """Cliente OpenAI ou None se não houver chave/configuração."""
+        return self._get(('openai', 'client'), _build_openai_client)
+
+    def available(self) -> List[str]:
+        providers = []
+        if self.openai():
+            providers.append('openai')
+        if self.gemini():
+            providers.append('gemini')
+        return providers
+
+    def reset(self):
+        """Descarta os clientes criados (ex: após trocar as chaves de API)."""
+        with self._lock:
+            self._clients.clear()
+            self._gemini_configured = False
+
+
+providers = ProviderRegistry()
@@ -1,64 +1,90 @@
 # ai_service.py
-import os
-import json
 import asyncio
-from typing import List, Dict, Any, Optional
+import logging
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
-import openai
-import google.generativeai as genai # CORREÇÃO: Import padrão, mais limpo
+from src.services.ai_batch import BatchPromptPipeline
+from src.services.ai_providers import DEFAULT_GEMINI_MODEL, DEFAULT_OPENAI_MODEL, providers
+from src.services.json_extract import SCHEMAS, JSONExtractionError, StreamingJSONExtractor, conform, select_document
+from src.services.prompt_context import ContextBuilder
+from src.services import telemetry
 
-# ==================== CÓDIGO DE DEPURAÇÃO ====================
-print("--- INICIANDO DEPURAÇÃO DO GOOGLE GENAI ---")
-try:
-    # CORREÇÃO: O atributo padrão para versão é __version__
-    print(f"Caminho do módulo genai: {genai.__file__}")
-    if hasattr(genai, '__version__'):
-        print(f"Versão reportada pelo módulo: {genai.__version__}")
-except Exception as e:
-    print(f"Não foi possível inspecionar o módulo genai: {e}")
-print("--- FIM DA DEPURAÇÃO ---")
-# ==========================================================
+logger = logging.getLogger(__name__)
 
 
 class AIService:
     def __init__(self):
-        # Configurar OpenAI (mantenha como está)
-        self.openai_client = None
-        if os.getenv('OPENAI_API_KEY'):
-            try:
-                self.openai_client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-                print("Cliente OpenAI configurado com sucesso.")
-            except Exception as e:
-                print(f"ERRO: Falha ao configurar o cliente OpenAI: {e}")
-
-        # Configurar Gemini
-        self.gemini_client = None
-        self.default_model_gemini = "gemini-1.5-flash" # CORREÇÃO: "gemini-1.5-flash" é o nome correto do modelo mais recente e rápido. "gemini-2.5-flash" não existe no momento.
-        
-        gemini_api_key = os.getenv('GEMINI_API_KEY')
-        if gemini_api_key:
-            try:
-                # ================== CORREÇÃO CRUCIAL NA INICIALIZAÇÃO ==================
-                # 1. Primeiro, configuramos a chave da API para toda a biblioteca.
-                genai.configure(api_key=gemini_api_key)
-                
-                # 2. Depois, criamos a instância do modelo que vamos usar.
-                self.gemini_client = genai.GenerativeModel(self.default_model_gemini)
-                
-                print("Cliente Google Gemini configurado com sucesso.")
-                # =======================================================================
-            except Exception as e:
-                print(f"ERRO: Falha ao configurar o cliente Google Gemini: {e}")
-                self.gemini_client = None
-        else:
-            print("AVISO: Chave de API do Gemini (GEMINI_API_KEY) não encontrada no ambiente.")
-        
-        # Configurações padrão
-        self.default_model_openai = "gpt-4o-mini"
+        # Os clientes são criados sob demanda pelo registro compartilhado (ver ai_providers)
+        self.default_model_gemini = DEFAULT_GEMINI_MODEL
+        self.default_model_openai = DEFAULT_OPENAI_MODEL
         
         # Cache para otimização
         self.suggestion_cache = {}
         self.cache_duration = timedelta(hours=1)
+
+    @property
+    def gemini_client(self):
+        return providers.gemini(self.default_model_gemini)
+
+    @property
+    def openai_client(self):
+        return providers.openai()
+
+    # Chamadas instrumentadas (latência, tokens e status vão para /metrics)
+    def _gemini_generate(self, operation: str, prompt: str) -> str:
+        with telemetry.track_llm_call('gemini', operation, prompt) as call:
+            response = self.gemini_client.generate_content(prompt)
+            call.record_response(response, response.text)
+        return response.text
+
+    def _openai_chat(self, operation: str, **kwargs) -> str:
+        prompt = '\n'.join(message['content'] for message in kwargs.get('messages', []))
+        with telemetry.track_llm_call('openai', operation, prompt) as call:
+            response = self.openai_client.chat.completions.create(model=self.default_model_openai, **kwargs)
+            content = response.choices[0].message.content
+            call.record_response(response, content)
+        return content
+
+    def _gemini_json(self, operation: str, prompt: str) -> Any:
+        """
+        Chama o Gemini em modo stream e para de ler assim que chega um JSON completo que
+        atende ao esquema da operação (um "[1]" no texto antes da resposta não interrompe a leitura).
+        """
+        extractor = StreamingJSONExtractor(emit_items=False)
+        schema = SCHEMAS.get(operation)
+        with telemetry.track_llm_call('gemini', operation, prompt) as call:
+            response = self.gemini_client.generate_content(prompt, stream=True)
+            for chunk in response:
+                if any(self._conforms(value, schema) for kind, value in extractor.feed(chunk.text)
+                       if kind == 'document'):
+                    break
+            extractor.finish()
+            call.record_response(response, extractor.buffer)
+        return self._select_json('gemini', operation, extractor.documents)
+
+    @staticmethod
+    def _conforms(document: Any, schema: Optional[Dict[str, Any]]) -> bool:
+        if schema is None:
+            return True
+        try:
+            conform(document, schema)
+            return True
+        except JSONExtractionError:
+            return False
+
+    def _select_json(self, provider: str, operation: str, documents: List[Any]) -> Any:
+        """Valida os documentos extraídos contra o esquema da operação (ver json_extract.SCHEMAS)"""
+        try:
+            return select_document(documents, operation)
+        except JSONExtractionError:
+            telemetry.record_parse_failure(provider, operation)
+            raise
+
+    def _parse_json(self, provider: str, operation: str, text: str) -> Any:
+        extractor = StreamingJSONExtractor(emit_items=False)
+        extractor.feed(text or '')
+        extractor.finish()
+        return self._select_json(provider, operation, extractor.documents)
         
     # ... (o resto da classe de get_task_suggestions em diante permanece igual no início)
     
@@ -88,24 +114,11 @@ class AIService:
             
             # CORREÇÃO: A chamada generate_content não precisa dos parâmetros 'model' ou 'config'.
             # A instância self.gemini_client já é o modelo.
-            response = self.gemini_client.generate_content(prompt)
-            
-            # Parse da resposta
-            response_text = response.text.strip()
-            # Limpeza robusta do JSON
-            if response_text.startswith('```json'):
-                response_text = response_text[7:-3].strip()
-            elif response_text.startswith('```'):
-                response_text = response_text[3:-3].strip()
-            
-            result = json.loads(response_text)
+            result = self._gemini_json('task_suggestions', prompt)
             return result.get('suggestions', [])
             
         except Exception as e:
-            # CORREÇÃO: Imprimir o erro completo ajuda na depuração
-            import traceback
-            print(f"Erro no Gemini para sugestões de tarefas: {e}")
-            traceback.print_exc()
+            logger.exception("Erro no Gemini para sugestões de tarefas: %s", e)
             return []
 
     async def _get_gemini_productivity_insights(self, context: str) -> Dict[str, Any]:
@@ -138,18 +151,10 @@ class AIService:
             """
             
             # CORREÇÃO: Chamada simplificada e correta
-            response = self.gemini_client.generate_content(prompt)
-            
-            response_text = response.text.strip()
-            if response_text.startswith('```json'):
-                response_text = response_text[7:-3].strip()
-            elif response_text.startswith('```'):
-                response_text = response_text[3:-3].strip()
-            
-            return json.loads(response_text)
+            return self._gemini_json('productivity_insights', prompt)
             
         except Exception as e:
-            print(f"Erro no Gemini para insights de produtividade: {e}")
+            logger.warning("Erro no Gemini para insights de produtividade: %s", e)
             return {}
 
     async def _get_gemini_study_recommendations(self, context: str) -> List[Dict[str, Any]]:
@@ -178,19 +183,11 @@ class AIService:
             """
             
             # CORREÇÃO: Chamada simplificada e correta
-            response = self.gemini_client.generate_content(prompt)
-            
-            response_text = response.text.strip()
-            if response_text.startswith('```json'):
-                response_text = response_text[7:-3].strip()
-            elif response_text.startswith('```'):
-                response_text = response_text[3:-3].strip()
-            
-            result = json.loads(response_text)
+            result = self._gemini_json('study_recommendations', prompt)
             return result.get('recommendations', [])
             
         except Exception as e:
-            print(f"Erro no Gemini para recomendações de estudo: {e}")
+            logger.warning("Erro no Gemini para recomendações de estudo: %s", e)
             return []
 
     async def _get_gemini_schedule_optimization(self, context: str) -> Dict[str, Any]:
@@ -220,18 +217,10 @@ class AIService:
             """
             
             # CORREÇÃO: Chamada simplificada e correta
-            response = self.gemini_client.generate_content(prompt)
-            
-            response_text = response.text.strip()
-            if response_text.startswith('```json'):
-                response_text = response_text[7:-3].strip()
-            elif response_text.startswith('```'):
-                response_text = response_text[3:-3].strip()
-            
-            return json.loads(response_text)
+            return self._gemini_json('schedule_optimization', prompt)
             
         except Exception as e:
-            print(f"Erro no Gemini para otimização de cronograma: {e}")
+            logger.warning("Erro no Gemini para otimização de cronograma: %s", e)
             return {}
 
     # O resto do seu código (métodos do OpenAI, de preparação de contexto, fallback, etc.)
@@ -248,22 +237,24 @@ class AIService:
             cache_key = self._get_cache_key(context, "task_suggestions")
             
             # Verificar cache
-            if cache_key in self.suggestion_cache:
-                cached_data = self.suggestion_cache[cache_key]
-                if self._is_cache_valid(cached_data['timestamp']):
-                    return cached_data['suggestions']
+            cached_data = self.suggestion_cache.get(cache_key)
+            cache_hit = bool(cached_data) and self._is_cache_valid(cached_data['timestamp'])
+            telemetry.record_cache('ai_suggestions', cache_hit)
+            if cache_hit:
+                return cached_data['suggestions']
             
             # Gerar sugestões
             suggestions = []
             
             # Tentar com Gemini primeiro (mais rápido)
             if self.gemini_client:
-                print("Tentando gerar sugestões com Gemini...")
                 suggestions = await self._get_gemini_task_suggestions(context)
             
             # Fallback para OpenAI se Gemini falhar
             if not suggestions and self.openai_client:
-                print("Gemini falhou ou não está disponível. Usando OpenAI como fallback.")
+                if self.gemini_client:
+                    telemetry.record_fallback('task_suggestions', 'gemini', 'openai')
+                logger.info("Gemini falhou ou não está disponível. Usando OpenAI como fallback.")
                 suggestions = await self._get_openai_task_suggestions(context)
             
             # Cache das sugestões
@@ -276,7 +267,8 @@ class AIService:
             return suggestions
             
         except Exception as e:
-            print(f"Erro ao gerar sugestões de tarefas: {e}")
+            logger.error("Erro ao gerar sugestões de tarefas: %s", e)
+            telemetry.record_fallback('task_suggestions', 'ai', 'static')
             return self._get_fallback_task_suggestions()
     
     async def get_productivity_insights(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -288,10 +280,11 @@ class AIService:
             cache_key = self._get_cache_key(context, "productivity_insights")
             
             # Verificar cache
-            if cache_key in self.suggestion_cache:
-                cached_data = self.suggestion_cache[cache_key]
-                if self._is_cache_valid(cached_data['timestamp']):
-                    return cached_data['insights']
+            cached_data = self.suggestion_cache.get(cache_key)
+            cache_hit = bool(cached_data) and self._is_cache_valid(cached_data['timestamp'])
+            telemetry.record_cache('ai_suggestions', cache_hit)
+            if cache_hit:
+                return cached_data['insights']
             
             insights = {}
             
@@ -301,6 +294,8 @@ class AIService:
             
             # Fallback para OpenAI
             if not insights and self.openai_client:
+                if self.gemini_client:
+                    telemetry.record_fallback('productivity_insights', 'gemini', 'openai')
                 insights = await self._get_openai_productivity_insights(context)
             
             # Cache dos insights
@@ -313,7 +308,8 @@ class AIService:
             return insights
             
         except Exception as e:
-            print(f"Erro ao gerar insights de produtividade: {e}")
+            logger.error("Erro ao gerar insights de produtividade: %s", e)
+            telemetry.record_fallback('productivity_insights', 'ai', 'static')
             return self._get_fallback_productivity_insights()
     
     async def get_study_recommendations(self, study_context: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -325,10 +321,11 @@ class AIService:
             cache_key = self._get_cache_key(context, "study_recommendations")
             
             # Verificar cache
-            if cache_key in self.suggestion_cache:
-                cached_data = self.suggestion_cache[cache_key]
-                if self._is_cache_valid(cached_data['timestamp']):
-                    return cached_data['recommendations']
+            cached_data = self.suggestion_cache.get(cache_key)
+            cache_hit = bool(cached_data) and self._is_cache_valid(cached_data['timestamp'])
+            telemetry.record_cache('ai_suggestions', cache_hit)
+            if cache_hit:
+                return cached_data['recommendations']
             
             recommendations = []
             
@@ -338,6 +335,8 @@ class AIService:
             
             # Fallback para OpenAI
             if not recommendations and self.openai_client:
+                if self.gemini_client:
+                    telemetry.record_fallback('study_recommendations', 'gemini', 'openai')
                 recommendations = await self._get_openai_study_recommendations(context)
             
             # Cache das recomendações
@@ -350,7 +349,8 @@ class AIService:
             return recommendations
             
         except Exception as e:
-            print(f"Erro ao gerar recomendações de estudo: {e}")
+            logger.error("Erro ao gerar recomendações de estudo: %s", e)
+            telemetry.record_fallback('study_recommendations', 'ai', 'static')
             return self._get_fallback_study_recommendations()
     
     async def optimize_schedule(self, schedule_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -368,19 +368,22 @@ class AIService:
             
             # Fallback para OpenAI
             if not optimization and self.openai_client:
+                if self.gemini_client:
+                    telemetry.record_fallback('schedule_optimization', 'gemini', 'openai')
                 optimization = await self._get_openai_schedule_optimization(context)
             
             return optimization
             
         except Exception as e:
-            print(f"Erro ao otimizar cronograma: {e}")
+            logger.error("Erro ao otimizar cronograma: %s", e)
+            telemetry.record_fallback('schedule_optimization', 'ai', 'static')
             return self._get_fallback_schedule_optimization()
 
     # Métodos específicos do OpenAI (sem alterações)
     async def _get_openai_task_suggestions(self, context: str) -> List[Dict[str, Any]]:
         try:
-            response = self.openai_client.chat.completions.create(
-                model=self.default_model_openai,
+            content = self._openai_chat(
+                'task_suggestions',
                 messages=[
                     {"role": "system", "content": "Você é um assistente de produtividade especializado em sugerir tarefas inteligentes. Responda APENAS com JSON válido."},
                     {"role": "user", "content": f'Baseado no contexto: {context}\n\nSugira 5 tarefas no formato JSON:\n{{\n    "suggestions": [\n        {{\n            "title": "Título",\n            "description": "Descrição",\n            "priority": "alta|média|baixa",\n            "category": "técnica|estudo|pessoal",\n            "estimated_time": "tempo em minutos",\n            "reasoning": "Justificativa"\n        }}\n    ]\n}}'}
@@ -389,16 +392,16 @@ class AIService:
                 max_tokens=1000,
                 response_format={"type": "json_object"} # Adicionado para garantir JSON
             )
-            result = json.loads(response.choices[0].message.content)
+            result = self._parse_json('openai', 'task_suggestions', content)
             return result.get('suggestions', [])
         except Exception as e:
-            print(f"Erro no OpenAI para sugestões de tarefas: {e}")
+            logger.warning("Erro no OpenAI para sugestões de tarefas: %s", e)
             return []
 
     async def _get_openai_productivity_insights(self, context: str) -> Dict[str, Any]:
         try:
-            response = self.openai_client.chat.completions.create(
-                model=self.default_model_openai,
+            content = self._openai_chat(
+                'productivity_insights',
                 messages=[
                     {"role": "system", "content": "Você é um analista de produtividade especializado. Responda APENAS com JSON válido."},
                     {"role": "user", "content": f'Analise os dados: {context}\n\nForneça insights no formato JSON:\n{{\n    "overall_score": 85,\n    "strengths": ["força1", "força2"],\n    "areas_for_improvement": ["área1", "área2"],\n    "recommendations": [\n        {{\n            "title": "Recomendação",\n            "description": "Descrição",\n            "impact": "alto|médio|baixo",\n            "effort": "fácil|médio|difícil"\n        }}\n    ],\n    "trends": {{\n        "productivity_trend": "crescente|estável|decrescente",\n        "focus_pattern": "manhã|tarde|noite",\n        "best_day": "dia da semana"\n    }}\n}}'}
@@ -407,15 +410,15 @@ class AIService:
                 max_tokens=1500,
                 response_format={"type": "json_object"}
             )
-            return json.loads(response.choices[0].message.content)
+            return self._parse_json('openai', 'productivity_insights', content)
         except Exception as e:
-            print(f"Erro no OpenAI para insights de produtividade: {e}")
+            logger.warning("Erro no OpenAI para insights de produtividade: %s", e)
             return {}
 
     async def _get_openai_study_recommendations(self, context: str) -> List[Dict[str, Any]]:
         try:
-            response = self.openai_client.chat.completions.create(
-                model=self.default_model_openai,
+            content = self._openai_chat(
+                'study_recommendations',
                 messages=[
                     {"role": "system", "content": "Você é um especialista em educação e curadoria de conteúdo. Responda APENAS com JSON válido."},
                     {"role": "user", "content": f'Baseado no histórico: {context}\n\nRecomende conteúdos no formato JSON:\n{{\n    "recommendations": [\n        {{\n            "title": "Título",\n            "type": "vídeo|artigo|curso|livro",\n            "description": "Descrição",\n            "difficulty": "iniciante|intermediário|avançado",\n            "estimated_time": "tempo estimado",\n            "relevance_score": 95,\n            "topics": ["tópico1", "tópico2"],\n            "url": null\n        }}\n    ]\n}}'}
@@ -424,16 +427,16 @@ class AIService:
                 max_tokens=1200,
                 response_format={"type": "json_object"}
             )
-            result = json.loads(response.choices[0].message.content)
+            result = self._parse_json('openai', 'study_recommendations', content)
             return result.get('recommendations', [])
         except Exception as e:
-            print(f"Erro no OpenAI para recomendações de estudo: {e}")
+            logger.warning("Erro no OpenAI para recomendações de estudo: %s", e)
             return []
     
     async def _get_openai_schedule_optimization(self, context: str) -> Dict[str, Any]:
         try:
-            response = self.openai_client.chat.completions.create(
-                model=self.default_model_openai,
+            content = self._openai_chat(
+                'schedule_optimization',
                 messages=[
                     {"role": "system", "content": "Você é um especialista em otimização de cronogramas e produtividade. Responda APENAS com JSON válido."},
                     {"role": "user", "content": f'Otimize o cronograma: {context}\n\nRetorne no formato JSON:\n{{\n    "optimized_schedule": [\n        {{\n            "time_slot": "09:00-10:00",\n            "activity": "Atividade",\n            "reasoning": "Justificativa",\n            "energy_level": "alta|média|baixa"\n        }}\n    ],\n    "improvements": ["melhoria1", "melhoria2"],\n    "productivity_score": 88\n}}'}
@@ -442,30 +445,110 @@ class AIService:
                 max_tokens=1000,
                 response_format={"type": "json_object"}
             )
-            return json.loads(response.choices[0].message.content)
+            return self._parse_json('openai', 'schedule_optimization', content)
         except Exception as e:
-            print(f"Erro no OpenAI para otimização de cronograma: {e}")
+            logger.warning("Erro no OpenAI para otimização de cronograma: %s", e)
             return {}
     
-    # Métodos de preparação de contexto (sem alterações)
+    # Métodos de processamento em lote
+    async def _complete_prompt(self, prompt: str) -> Tuple[str, str]:
+        """Executa um prompt no primeiro provedor disponível e retorna (provedor, texto bruto)"""
+        if self.gemini_client:
+            try:
+                return 'gemini', await asyncio.to_thread(self._gemini_generate, 'batch', prompt)
+            except Exception as e:
+                logger.warning("Erro no Gemini para prompt em lote: %s", e)
+        if self.openai_client:
+            if self.gemini_client:
+                telemetry.record_fallback('batch', 'gemini', 'openai')
+            return 'openai', await asyncio.to_thread(
+                self._openai_chat,
+                'batch',
+                messages=[
+                    {"role": "system", "content": "Você processa itens em lote. Responda APENAS com JSON válido."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.2,
+                response_format={"type": "json_object"}
+            )
+        raise RuntimeError("Nenhum provedor de IA disponível")
+
+    async def categorize_items_batch(self, items: List[Dict[str, Any]], categories: List[str]) -> Dict[str, Any]:
+        """
+        Categoriza muitos itens com poucas chamadas ao modelo.
+        Retorna {'results': [...], 'stats': {...}}, com None para itens não categorizados.
+        """
+        pipeline = BatchPromptPipeline(
+            call_model=self._complete_prompt,
+            name='categorization',
+            instructions=(
+                "Classifique cada tarefa/anotação em exatamente uma das categorias: "
+                f"{', '.join(categories)}."
+            ),
+            output_format={"category": categories[0], "confidence": 0.9, "reasoning": "Justificativa curta"},
+            validate=lambda result: result.get('category') in categories
+        )
+        return await pipeline.run(
+            items,
+            lambda item: {'title': item.get('title', ''), 'text': item.get('text', '')}
+        )
+
+    async def score_tasks_batch(self, tasks: List[Dict[str, Any]], user_context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Calcula scores de prioridade (0-100) para muitas tarefas com poucas chamadas ao modelo.
+        Retorna {'results': [...], 'stats': {...}}, com None para tarefas não pontuadas.
+        """
+        def is_valid(result):
+            score = result.get('priority_score')
+            return isinstance(score, (int, float)) and 0 <= score <= 100
+
+        priority_categories = user_context.get('priority_categories', [])
+        pipeline = BatchPromptPipeline(
+            call_model=self._complete_prompt,
+            name='priority_scoring',
+            instructions=(
+                "Atribua a cada tarefa um score de prioridade de 0 a 100 considerando urgência (due_date), "
+                "importância (priority), esforço (estimated_time, em minutos) e se a categoria está entre as "
+                f"prioritárias do usuário ({', '.join(priority_categories) or 'nenhuma'}). "
+                f"Data atual: {datetime.now().date().isoformat()}."
+            ),
+            output_format={"priority_score": 75, "reasoning": "Justificativa curta"},
+            validate=is_valid
+        )
+        return await pipeline.run(
+            tasks,
+            lambda task: {
+                'title': task.get('title', ''),
+                'priority': task.get('priority', 'média'),
+                'due_date': task.get('due_date'),
+                'estimated_time': task.get('estimated_time', 60),
+                'category': task.get('category', '')
+            }
+        )
+
+    # Métodos de preparação de contexto (com orçamento de tokens por tipo de prompt)
     def _prepare_task_context(self, user_context: Dict[str, Any]) -> str:
-        current_tasks = user_context.get('current_tasks', [])
-        completed_tasks = user_context.get('completed_tasks', [])
-        user_goals = user_context.get('goals', [])
         time_of_day = datetime.now().strftime('%H:%M')
         day_of_week = datetime.now().strftime('%A')
         
-        context = f"Hora atual: {time_of_day}, {day_of_week}\n\nTarefas atuais: {json.dumps(current_tasks, indent=2)}\nTarefas concluídas recentemente: {json.dumps(completed_tasks[-5:], indent=2)}\nObjetivos do usuário: {json.dumps(user_goals, indent=2)}\n\nContexto adicional: {user_context.get('additional_context', '')}"
-        return context
+        builder = ContextBuilder.for_prompt('task_suggestions', recent_items=5)
+        return builder.build({
+            'Hora atual': f"{time_of_day}, {day_of_week}",
+            'Tarefas atuais': user_context.get('current_tasks', []),
+            'Tarefas concluídas recentemente': user_context.get('completed_tasks', []),
+            'Objetivos do usuário': user_context.get('goals', []),
+            'Anotações relacionadas': user_context.get('related_notes', []),
+            'Contexto adicional': user_context.get('additional_context', '')
+        }, label='task_suggestions')
     
     def _prepare_productivity_context(self, user_data: Dict[str, Any]) -> str:
-        return json.dumps(user_data, indent=2)
+        return ContextBuilder.for_prompt('productivity_insights').build(user_data, label='productivity_insights')
     
     def _prepare_study_context(self, study_context: Dict[str, Any]) -> str:
-        return json.dumps(study_context, indent=2)
+        return ContextBuilder.for_prompt('study_recommendations').build(study_context, label='study_recommendations')
     
     def _prepare_schedule_context(self, schedule_data: Dict[str, Any]) -> str:
-        return json.dumps(schedule_data, indent=2)
+        return ContextBuilder.for_prompt('schedule_optimization').build(schedule_data, label='schedule_optimization')
     
     # Métodos de fallback (sem alterações)
     def _get_fallback_task_suggestions(self) -> List[Dict[str, Any]]:
@@ -481,12 +564,12 @@ class AIService:
         return {"optimized_schedule": [{"time_slot": "09:00-11:00", "activity": "Tarefas de alta prioridade", "reasoning": "Manhã é período de maior energia mental", "energy_level": "alta"}, {"time_slot": "14:00-16:00", "activity": "Tarefas administrativas", "reasoning": "Período adequado para tarefas de rotina", "energy_level": "média"}], "improvements": ["Concentrar tarefas complexas pela manhã", "Reservar tarde para tarefas mais simples"], "productivity_score": 80}
     
     def get_available_providers(self) -> List[str]:
-        providers = []
+        available = []
         if self.openai_client:
-            providers.append("openai")
+            available.append("openai")
         if self.gemini_client:
-            providers.append("gemini")
-        return providers
+            available.append("gemini")
+        return available
     
     def clear_cache(self):
         self.suggestion_cache.clear()
@@ -497,3 +580,7 @@ class AIService:
     def _get_cache_key(self, context: str, suggestion_type: str) -> str:
         """Gera chave para cache baseada no contexto e tipo"""
         return f"{suggestion_type}:{hash(str(context))}"
+
+    def _is_cache_valid(self, timestamp: datetime) -> bool:
+        """Verifica se uma entrada do cache ainda está dentro de `cache_duration`"""
+        return datetime.now() - timestamp < self.cache_duration
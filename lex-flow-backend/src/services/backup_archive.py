@@ -0,0 +1,462 @@
+# src/services/backup_archive.py
+"""
+Formato de backup `.lexflow`: todos os dados do usuário em um único arquivo versionado.
+
+É um tar comprimido com gzip contendo:
+
+    manifest.json        formato, versão do esquema, data, instalação, usuário e, por entidade,
+                         o arquivo, a quantidade de registros e o SHA-256 do conteúdo
+    projects.ndjson      um registro por linha (colunas da tabela, sem dono/tenant)
+    tasks.ndjson
+    quick_notes.ndjson
+    ...
+
+O manifesto é o primeiro membro e as entidades seguem a ordem de dependência
+(projetos antes das tarefas), então a importação lê o arquivo em streaming
+(`tarfile` em modo 'r|gz'), sem extraí-lo nem carregá-lo inteiro na memória.
+Os registros mantêm o `id` de origem; na restauração ganham IDs locais (guardados em
+`backup_id_maps`) e as referências (ex: tasks.project_id) são remapeadas.
+
+Integrações e conexões de nuvem ficam de fora (contêm credenciais).
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import tarfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import Date, DateTime, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from src import db
+from src.services.export_stream import EXPORT_BATCH_SIZE, SpooledArtifact
+
+logger = logging.getLogger(__name__)
+
+FORMAT_NAME = 'lexflow'
+SCHEMA_VERSION = 1
+ARCHIVE_EXTENSION = '.lexflow'
+MANIFEST_NAME = 'manifest.json'
+# Versões mantidas no provedor; as mais antigas são apagadas a cada novo backup
+BACKUP_KEEP = int(os.environ.get('CLOUD_BACKUP_KEEP', '7'))
+IMPORT_BATCH_SIZE = int(os.environ.get('BACKUP_IMPORT_BATCH_SIZE', '1000'))
+
+_COMPACT = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+class BackupFormatError(ValueError):
+    """Arquivo que não é um backup .lexflow válido (ou de uma versão mais nova do esquema)."""
+
+
+@dataclass(frozen=True)
+class ArchiveEntity:
+    """Tabela incluída no backup."""
+    name: str
+    model: type
+    owner: str                                             # coluna com o id do usuário
+    refs: Dict[str, str] = field(default_factory=dict)     # coluna -> entidade referenciada
+    singleton: bool = False                                # um registro por usuário (configurações, perfis)
+    natural_key: Tuple[str, ...] = ()                      # unicidade além do dono (ex: uma revisão por dia)
+
+    @property
+    def table(self):
+        return self.model.__table__
+
+    @property
+    def columns(self) -> List[str]:
+        """Colunas gravadas no arquivo (o dono e o tenant são os do usuário que importa)."""
+        return [column.name for column in self.table.columns if column.name not in (self.owner, 'tenant_id')]
+
+
+_entities: Optional[List[ArchiveEntity]] = None
+
+
+def archive_entities() -> List[ArchiveEntity]:
+    """Entidades do backup, em ordem de dependência."""
+    global _entities
+    if _entities is None:
+        from src.models.gamification import GamificationProfile
+        from src.models.pomodoro import PomodoroSession, PomodoroSettings
+        from src.models.project import Project, Task
+        from src.models.quick_note import QuickNote
+        from src.models.study_video import StudyVideo
+        from src.models.telos import TelosFramework, TelosReview
+        _entities = [
+            ArchiveEntity('projects', Project, 'owner_id'),
+            ArchiveEntity('tasks', Task, 'created_by', refs={'project_id': 'projects'}),
+            ArchiveEntity('quick_notes', QuickNote, 'user_id'),
+            ArchiveEntity('pomodoro_settings', PomodoroSettings, 'user_id', singleton=True),
+            ArchiveEntity('pomodoro_sessions', PomodoroSession, 'user_id'),
+            ArchiveEntity('telos_frameworks', TelosFramework, 'user_id', singleton=True),
+            ArchiveEntity('telos_reviews', TelosReview, 'user_id', natural_key=('review_date',)),
+            ArchiveEntity('study_videos', StudyVideo, 'user_id'),
+            ArchiveEntity('gamification_profiles', GamificationProfile, 'user_id', singleton=True),
+        ]
+    return _entities
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _decode(column, value: Any) -> Any:
+    if value is None or not isinstance(value, str):
+        return value
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Date):
+        return date.fromisoformat(value)
+    return value
+
+
+def backup_file_name(moment: datetime = None) -> str:
+    return f"lexflow-backup-{(moment or datetime.utcnow()):%Y%m%dT%H%M%SZ}{ARCHIVE_EXTENSION}"
+
+
+# --- Exportação ---
+
+class BackupArchive(SpooledArtifact):
+    """Arquivo .lexflow gerado em disco temporário; `count` é o total de registros."""
+
+    def __init__(self):
+        super().__init__()
+        self.manifest: Dict[str, Any] = {}
+
+
+def _dump_entity(entity: ArchiveEntity, user_id: int) -> SpooledArtifact:
+    """Grava os registros da entidade em NDJSON, lendo do banco em lotes."""
+    part = SpooledArtifact()
+    digest = hashlib.sha256()
+    table = entity.table
+    columns = [table.c[name] for name in entity.columns]
+    statement = (select(*columns).where(table.c[entity.owner] == user_id).order_by(table.c.id)
+                 .execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for row in db.session.execute(statement).mappings():
+        line = json.dumps({name: _encode(value) for name, value in row.items()}, **_COMPACT).encode('utf-8') + b'\n'
+        part.file.write(line)
+        digest.update(line)
+        part.count += 1
+    part.size = part.file.tell()
+    part.sha256 = digest.hexdigest()
+    return part
+
+
+def instance_id() -> str:
+    """Identificador desta instalação (gerado e gravado em `instance_settings` no primeiro uso)."""
+    from src.models.cloud_sync import InstanceSetting
+
+    setting = db.session.get(InstanceSetting, 'instance_id')
+    if setting is None:
+        try:
+            with db.session.begin_nested():
+                db.session.add(InstanceSetting(key='instance_id', value=uuid.uuid4().hex))
+        except IntegrityError:
+            pass  # Outro processo gravou primeiro
+        setting = db.session.get(InstanceSetting, 'instance_id', populate_existing=True)
+    return setting.value
+
+
+def build_archive(user) -> BackupArchive:
+    """Gera o backup completo do usuário (memória limitada: cada entidade vai para um arquivo temporário)."""
+    created_at = datetime.utcnow()
+    parts = [(entity, _dump_entity(entity, user.id)) for entity in archive_entities()]
+    manifest = {
+        'format': FORMAT_NAME,
+        'schema_version': SCHEMA_VERSION,
+        'created_at': created_at.isoformat(),
+        'instance_id': instance_id(),
+        'user': {'id': user.id, 'username': user.username},
+        'entities': {
+            entity.name: {'file': f"{entity.name}.ndjson", 'count': part.count, 'sha256': part.sha256}
+            for entity, part in parts
+        }
+    }
+
+    archive = BackupArchive()
+    archive.manifest = manifest
+    mtime = time.mktime(created_at.timetuple())
+    try:
+        with tarfile.open(fileobj=archive.file, mode='w:gz', format=tarfile.PAX_FORMAT) as tar:
+            manifest_bytes = json.dumps(manifest, indent=2, ensure_ascii=False).encode('utf-8')
+            info = tarfile.TarInfo(MANIFEST_NAME)
+            info.size, info.mtime = len(manifest_bytes), mtime
+            tar.addfile(info, io.BytesIO(manifest_bytes))
+            for entity, part in parts:
+                info = tarfile.TarInfo(f"{entity.name}.ndjson")
+                info.size, info.mtime = part.size, mtime
+                tar.addfile(info, part.rewind())
+    finally:
+        for _, part in parts:
+            part.close()
+
+    archive.size = archive.file.tell()
+    archive.count = sum(part.count for _, part in parts)
+    digest = hashlib.sha256()
+    archive.rewind()
+    for block in iter(lambda: archive.file.read(1024 * 1024), b''):
+        digest.update(block)
+    archive.sha256 = digest.hexdigest()
+    archive.rewind()
+    return archive
+
+
+# --- Leitura ---
+
+def _records(member_file: BinaryIO, expected_sha256: Optional[str], name: str) -> Iterator[Dict[str, Any]]:
+    digest = hashlib.sha256()
+    try:
+        for line in member_file:
+            digest.update(line)
+            if line.strip():
+                yield json.loads(line)
+    except (tarfile.TarError, EOFError, OSError, ValueError) as e:
+        raise BackupFormatError(f"Conteúdo de {name} ilegível: {e}") from e
+    if expected_sha256 and digest.hexdigest() != expected_sha256:
+        raise BackupFormatError(f"Conteúdo de {name} não confere com o manifesto")
+
+
+def iter_archive(fileobj: BinaryIO) -> Iterator[Tuple[Dict[str, Any], ArchiveEntity, Iterator[Dict[str, Any]]]]:
+    """
+    Lê o backup em streaming: gera (manifesto, entidade, registros) para cada entidade conhecida.
+    Os registros de uma entidade precisam ser consumidos antes de avançar para a próxima.
+    """
+    by_file = {f"{entity.name}.ndjson": entity for entity in archive_entities()}
+    try:
+        with tarfile.open(fileobj=fileobj, mode='r|gz') as tar:
+            manifest = None
+            for member in tar:
+                if manifest is None:
+                    if member.name != MANIFEST_NAME:
+                        raise BackupFormatError("Manifesto ausente no início do arquivo")
+                    manifest = json.loads(tar.extractfile(member).read())
+                    if manifest.get('format') != FORMAT_NAME:
+                        raise BackupFormatError("Arquivo não é um backup do Lex Flow")
+                    if int(manifest.get('schema_version', 0)) > SCHEMA_VERSION:
+                        raise BackupFormatError(f"Versão do backup ({manifest['schema_version']}) mais nova que a suportada")
+                    continue
+                entity = by_file.get(member.name)
+                if entity is None or not member.isfile():
+                    logger.info("Ignorando %s do backup (entidade desconhecida)", member.name)
+                    continue
+                expected = (manifest.get('entities', {}).get(entity.name) or {}).get('sha256')
+                yield manifest, entity, _records(tar.extractfile(member), expected, member.name)
+            if manifest is None:
+                raise BackupFormatError("Arquivo de backup vazio")
+    except (tarfile.TarError, EOFError, OSError, ValueError) as e:
+        if isinstance(e, BackupFormatError):
+            raise
+        raise BackupFormatError(f"Arquivo de backup inválido: {e}") from e
+
+
+# --- Importação ---
+
+def _batches(records: Iterator[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _prepare(entity: ArchiveEntity, record: Dict[str, Any], user, id_maps: Dict[str, Dict[int, int]]) -> Optional[Dict[str, Any]]:
+    """Linha pronta para gravar: colunas conhecidas, dono/tenant do usuário e referências remapeadas."""
+    table = entity.table
+    row = {name: _decode(table.c[name], record[name]) for name in entity.columns if name in record and name != 'id'}
+    row[entity.owner] = user.id
+    if 'tenant_id' in table.c.keys():
+        row['tenant_id'] = user.tenant_id
+    for column, target in entity.refs.items():
+        if row.get(column) is not None:
+            mapped = id_maps.get(target, {}).get(row[column])
+            if mapped is None:
+                return None  # Referência a um registro que não veio no backup
+            row[column] = mapped
+    return row
+
+
+def _dialect_insert(table):
+    """INSERT com suporte a ON CONFLICT do banco em uso (SQLite ou PostgreSQL)."""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise RuntimeError(f"Restauração em lote não suportada no banco '{dialect}' (use SQLite ou PostgreSQL)")
+    return dialect_insert(table)
+
+
+def _upsert(table, conflict: List[str], columns: List[str], returning: bool = False, where=None):
+    statement = _dialect_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c[name] for name in conflict],
+        set_={name: statement.excluded[name] for name in columns if name not in conflict and name != 'id'},
+        where=where
+    )
+    if returning:
+        statement = statement.returning(table.c.id, sort_by_parameter_order=True)
+    return statement
+
+
+def _same_keys(pairs: List[Tuple[Any, Dict[str, Any]]]) -> Iterator[List[Tuple[Any, Dict[str, Any]]]]:
+    """Separa as linhas por conjunto de colunas (um executemany exige as mesmas chaves em todas)."""
+    groups: Dict[Tuple[str, ...], List[Tuple[Any, Dict[str, Any]]]] = {}
+    for source_id, row in pairs:
+        groups.setdefault(tuple(sorted(row)), []).append((source_id, row))
+    return iter(groups.values())
+
+
+class _Restore:
+    """Estado de uma restauração: mapas de IDs já resolvidos, contagens e progresso."""
+
+    def __init__(self, user, progress: Optional[Callable[[Dict[str, Any]], None]]):
+        from src.models.cloud_sync import BackupIdMap
+        self.user = user
+        self.progress = progress
+        self.id_maps: Dict[str, Dict[int, int]] = {}
+        self.summary: Dict[str, Dict[str, int]] = {}
+        self.map_table = BackupIdMap.__table__
+        self.processed = 0
+        self.total = 0
+        # Backup do próprio usuário feito nesta mesma instalação: os IDs de origem que ainda existem são os
+        # locais. Em outro banco o mesmo ID de usuário pode ser de outra pessoa (ou de outros registros)
+        self.own = False
+        self.restored_at = datetime.utcnow()
+
+    def known_ids(self, entity: ArchiveEntity, source_ids: List[int]) -> Dict[int, int]:
+        """IDs locais de registros já restaurados antes (tabela backup_id_maps)."""
+        table = self.map_table
+        known = dict(db.session.execute(select(table.c.source_id, table.c.local_id).where(
+            table.c.user_id == self.user.id, table.c.entity == entity.name, table.c.source_id.in_(source_ids)
+        )).all())
+        if self.own:
+            rows = entity.table
+            known.update((local, local) for local in db.session.execute(select(rows.c.id).where(
+                rows.c[entity.owner] == self.user.id, rows.c.id.in_([i for i in source_ids if i not in known])
+            )).scalars())
+        return known
+
+    def remember(self, entity: ArchiveEntity, pairs: List[Tuple[int, int]]):
+        self.id_maps.setdefault(entity.name, {}).update(pairs)
+        if pairs:
+            db.session.execute(
+                _upsert(self.map_table, ['user_id', 'entity', 'source_id'], ['local_id']),
+                [{'user_id': self.user.id, 'entity': entity.name, 'source_id': source, 'local_id': local}
+                 for source, local in pairs]
+            )
+
+    def write_batch(self, entity: ArchiveEntity, batch: List[Dict[str, Any]], counts: Dict[str, int]):
+        table = entity.table
+        pairs = []
+        for record in batch:
+            row = _prepare(entity, record, self.user, self.id_maps)
+            if row is None:
+                counts['skipped'] += 1
+                continue
+            if 'updated_at' in table.c.keys():
+                # Restaurado conta como alterado agora: a sincronização incremental (updated_at > watermark) o envia
+                row['updated_at'] = self.restored_at
+            pairs.append((record.get('id'), row))
+        if not pairs:
+            return
+
+        if entity.singleton or entity.natural_key:
+            # A chave única (dono [+ chave natural]) identifica o registro: uma linha por chave no lote
+            conflict = [entity.owner] + list(entity.natural_key)
+            pairs = list({tuple(row.get(name) for name in conflict): (source, row) for source, row in pairs}.values())
+            for group in _same_keys(pairs):
+                ids = db.session.execute(_upsert(table, conflict, list(group[0][1]), returning=True),
+                                         [row for _, row in group]).scalars().all()
+                self.remember(entity, [(source, local) for (source, _), local in zip(group, ids) if source is not None])
+                counts['restored'] += len(ids)
+            return
+
+        known = self.known_ids(entity, [source for source, _ in pairs if source is not None])
+        matched = [(source, dict(row, id=known[source])) for source, row in pairs if source in known]
+        new = [(source, row) for source, row in pairs if source not in known]
+        for group in _same_keys(matched):
+            # Já restaurado antes: atualiza no lugar (só se o registro ainda for do usuário)
+            db.session.execute(_upsert(table, ['id'], list(group[0][1]), where=table.c[entity.owner] == self.user.id),
+                               [row for _, row in group])
+        self.id_maps.setdefault(entity.name, {}).update((source, row['id']) for source, row in matched)
+        counts['matched'] += len(matched)
+        for group in _same_keys(new):
+            ids = db.session.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True),
+                                     [row for _, row in group]).scalars().all()
+            self.remember(entity, [(source, local) for (source, _), local in zip(group, ids) if source is not None])
+        counts['restored'] += len(pairs)
+
+    def report(self, entity: ArchiveEntity, done: int, entity_total: int):
+        if self.progress is None:
+            return
+        try:
+            self.progress({'entity': entity.name, 'processed': done, 'entity_total': entity_total,
+                           'overall_processed': self.processed, 'overall_total': self.total,
+                           'percent': round(100 * self.processed / self.total, 1) if self.total else 100.0})
+        except Exception as e:
+            logger.warning("Falha ao reportar o progresso da restauração: %s", e)
+
+
+def restore_archive(user, fileobj: BinaryIO, progress: Callable[[Dict[str, Any]], None] = None) -> Dict[str, Any]:
+    """
+    Restaura um backup .lexflow para o usuário, lendo-o em streaming, em uma única transação.
+    Cada lote de IMPORT_BATCH_SIZE registros vira um INSERT ... ON CONFLICT (SQLite/PostgreSQL):
+    - registros já restaurados antes (tabela backup_id_maps), ou que ainda existem quando o
+      backup é do próprio usuário nesta mesma instalação (`instance_id` do manifesto), são
+      atualizados no lugar;
+    - os novos ganham IDs locais, e as referências (ex: tasks.project_id) são remapeadas;
+    - configurações, perfis e revisões diárias são mesclados pela chave única (dono + data).
+    `progress` recebe o andamento a cada lote. Retorna, por entidade, os registros gravados
+    (`restored`), quantos deles já existiam e foram atualizados (`matched`) e os ignorados.
+    """
+    restore = _Restore(user, progress)
+    manifest = None
+    try:
+        for manifest, entity, records in iter_archive(fileobj):
+            if not restore.total:
+                restore.own = (manifest.get('instance_id') == instance_id() and
+                               (manifest.get('user') or {}).get('id') == user.id)
+                restore.total = sum((item or {}).get('count', 0) for item in manifest.get('entities', {}).values())
+            entity_total = (manifest.get('entities', {}).get(entity.name) or {}).get('count', 0)
+            counts = restore.summary.setdefault(entity.name, {'restored': 0, 'matched': 0, 'skipped': 0})
+            done = 0
+            for batch in _batches(records, IMPORT_BATCH_SIZE):
+                restore.write_batch(entity, batch, counts)
+                done += len(batch)
+                restore.processed += len(batch)
+                restore.report(entity, done, entity_total)
+        if manifest is None:
+            raise BackupFormatError("Arquivo de backup vazio")
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    _index_restored(restore.id_maps)
+    return {'schema_version': manifest.get('schema_version'), 'created_at': manifest.get('created_at'),
+            'entities': restore.summary}
+
+
+def _index_restored(id_maps: Dict[str, Dict[int, int]]):
+    """Os inserts em lote não passam pelos eventos do ORM: indexa na busca semântica o que foi importado."""
+    from src.services.semantic_index import semantic_index
+    for entity in archive_entities():
+        ids = sorted(id_maps.get(entity.name, {}).values())
+        if not ids:
+            continue
+        try:
+            semantic_index.index_records(entity.model, ids)
+        except Exception as e:
+            logger.warning("Falha ao indexar %s importados: %s", entity.name, e)
@@ -0,0 +1,218 @@
+# src/services/categorizer.py
+"""
+Motor de categorização por palavras-chave.
+
+O léxico (categoria -> termos com peso) é compilado uma única vez em uma
+expressão regular com fronteiras de palavra. O texto é normalizado sem acentos,
+então "Código", "codigo" e "CÓDIGO" casam com o mesmo termo, e "api" não casa
+mais dentro de "rapidamente". Termos terminados em '*' casam por prefixo
+(ex: "program*" casa com "programar" e "programação").
+"""
+
+import bisect
+import math
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, List, Tuple
+
+# Categoria usada quando nenhum termo do léxico é encontrado
+DEFAULT_CATEGORY = 'geral'
+
+# Títulos são curtos e descritivos, então pesam mais que o corpo do texto
+TITLE_WEIGHT = 1.5
+
+# Cada termo conta no máximo este número de vezes por item
+MAX_TERM_HITS = 2
+
+DEFAULT_LEXICON: Dict[str, Dict[str, float]] = {
+    'técnica': {
+        'código': 1.0, 'program*': 1.0, 'bug': 1.0, 'api': 1.0, 'desenvolvimento': 0.8,
+        'deploy': 1.0, 'refator*': 1.0, 'banco de dados': 0.9, 'servidor': 0.7, 'frontend': 0.9,
+        'backend': 0.9, 'commit': 0.8
+    },
+    'estudo': {
+        'estud*': 1.0, 'aprender': 1.0, 'curso': 1.0, 'vídeo': 0.7, 'livro': 0.8,
+        'aula': 0.9, 'leitura': 0.7, 'revisar matéria': 1.0, 'prova': 0.8
+    },
+    'trabalho': {
+        'reunião': 1.0, 'call': 0.8, 'apresentação': 0.8, 'projeto': 0.6, 'cliente': 0.9,
+        'relatório': 0.8, 'entrega': 0.6, 'e-mail': 0.5
+    },
+    'pessoal': {
+        'pessoal': 0.8, 'família': 1.0, 'saúde': 1.0, 'exercício': 1.0, 'academia': 0.9,
+        'médico': 0.9, 'mercado': 0.7, 'casa': 0.5
+    }
+}
+
+
+def normalize_text(text: str) -> str:
+    """Remove acentos e converte para minúsculas."""
+    if not text or text.isascii():
+        return (text or '').lower()
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def validate_lexicon(lexicon: Any) -> Dict[str, Dict[str, float]]:
+    """
+    Valida e normaliza um léxico vindo da API.
+    Aceita {categoria: {termo: peso}} ou {categoria: [termos]} (peso 1.0).
+    Lança ValueError se o formato for inválido.
+    """
+    if not isinstance(lexicon, dict) or not lexicon:
+        raise ValueError('O léxico deve ser um objeto {categoria: termos}')
+
+    validated = {}
+    for category, terms in lexicon.items():
+        if not isinstance(category, str) or not category.strip():
+            raise ValueError('Nomes de categoria devem ser textos não vazios')
+        if isinstance(terms, list):
+            terms = {term: 1.0 for term in terms}
+        if not isinstance(terms, dict) or not terms:
+            raise ValueError(f"A categoria '{category}' deve ter ao menos um termo")
+
+        validated_terms = {}
+        for term, weight in terms.items():
+            if not isinstance(term, str) or not term.strip('* '):
+                raise ValueError(f"Termo inválido na categoria '{category}'")
+            if not isinstance(weight, (int, float)) or weight <= 0:
+                raise ValueError(f"Peso inválido para o termo '{term}'")
+            validated_terms[term.strip()] = float(weight)
+        validated[category.strip()] = validated_terms
+    return validated
+
+
+class Categorizer:
+    """Categorizador compilado a partir de um léxico. Instâncias são imutáveis e thread-safe."""
+
+    def __init__(self, lexicon: Dict[str, Dict[str, float]] = None):
+        self.lexicon = lexicon or DEFAULT_LEXICON
+        self.categories = list(self.lexicon.keys())
+
+        # termo normalizado -> [(categoria, peso)]
+        self._exact: Dict[str, List[Tuple[str, float]]] = {}
+        self._prefixes: Dict[str, List[Tuple[str, float]]] = {}
+        for category, terms in self.lexicon.items():
+            for term, weight in terms.items():
+                normalized = ' '.join(normalize_text(term).split())
+                if normalized.endswith('*'):
+                    target = self._prefixes.setdefault(normalized.rstrip('*'), [])
+                else:
+                    target = self._exact.setdefault(normalized, [])
+                target.append((category, weight))
+
+        # Prefixos mais longos são testados primeiro
+        self._prefix_order = sorted(self._prefixes, key=len, reverse=True)
+
+        alternatives = [
+            (term, re.escape(term).replace(r'\ ', r'\s+')) for term in self._exact
+        ] + [
+            (prefix, re.escape(prefix).replace(r'\ ', r'\s+') + r'\w*') for prefix in self._prefixes
+        ]
+        alternatives.sort(key=lambda pair: len(pair[0]), reverse=True)
+        # Limites por lookaround (e não \b): termos que começam ou terminam em símbolo ("c++", ".net") também casam
+        self._pattern = re.compile(r'(?<!\w)(?:' + '|'.join(pattern for _, pattern in alternatives) + r')(?!\w)')
+
+    def _weights_for(self, matched: str) -> List[Tuple[str, float]]:
+        matched = ' '.join(matched.split())
+        if matched in self._exact:
+            return self._exact[matched]
+        for prefix in self._prefix_order:
+            if matched.startswith(prefix):
+                return self._prefixes[prefix]
+        return []
+
+    @staticmethod
+    def _confidence(scores: Dict[str, float]) -> Tuple[str, float]:
+        """Escolhe a categoria vencedora e calcula a confiança a partir dos scores."""
+        if not scores:
+            return DEFAULT_CATEGORY, 0.5
+        category, best = max(scores.items(), key=lambda pair: pair[1])
+        share = best / sum(scores.values())      # quão dominante é a categoria vencedora
+        strength = 1 - math.exp(-best)           # quanta evidência existe (satura em 1)
+        return category, round(0.5 + 0.49 * share * strength, 2)
+
+    def categorize_many(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Categoriza vários itens ({'title', 'text'}) em uma única varredura.
+        Todos os títulos e textos são concatenados e percorridos uma vez pela expressão compilada;
+        cada ocorrência é atribuída ao seu item pela posição.
+        """
+        segments, offsets, owners, weights = [], [], [], []
+        position = 0
+        for index, item in enumerate(items):
+            for field, field_weight in (('title', TITLE_WEIGHT), ('text', 1.0)):
+                segment = normalize_text(str(item.get(field) or ''))
+                offsets.append(position)
+                owners.append(index)
+                weights.append(field_weight)
+                segments.append(segment)
+                position += len(segment) + 1  # +1 pelo separador '\n'
+
+        scores: List[Dict[str, float]] = [{} for _ in items]
+        hits: List[Dict[str, int]] = [{} for _ in items]
+        for match in self._pattern.finditer('\n'.join(segments)):
+            segment_index = bisect.bisect_right(offsets, match.start()) - 1
+            item_index = owners[segment_index]
+            term = match.group()
+            count = hits[item_index].get(term, 0)
+            if count >= MAX_TERM_HITS:
+                continue
+            hits[item_index][term] = count + 1
+            for category, weight in self._weights_for(term):
+                item_scores = scores[item_index]
+                item_scores[category] = item_scores.get(category, 0.0) + weight * weights[segment_index]
+
+        results = []
+        for item_scores, item_hits in zip(scores, hits):
+            category, confidence = self._confidence(item_scores)
+            results.append({
+                'category': category,
+                'confidence': confidence,
+                'matched_terms': sorted(item_hits),
+                'scores': {name: round(value, 2) for name, value in item_scores.items()}
+            })
+        return results
+
+    def categorize(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Categoriza um único item."""
+        return self.categorize_many([item])[0]
+
+
+# --- Cache de categorizadores compilados por tenant ---
+
+_default_categorizer = Categorizer()
+_tenant_cache: Dict[Any, Categorizer] = {}
+_cache_lock = threading.Lock()
+_MAX_CACHED_TENANTS = 256
+
+
+def get_categorizer(tenant_id: int = None) -> Categorizer:
+    """
+    Retorna o categorizador do tenant, compilado uma única vez por versão do léxico.
+    Tenants sem léxico próprio usam o léxico padrão.
+    """
+    if tenant_id is None:
+        return _default_categorizer
+
+    from src.models.category_lexicon import CategoryLexicon
+    row = CategoryLexicon.query.filter_by(tenant_id=tenant_id).with_entities(CategoryLexicon.updated_at).first()
+    if not row:
+        return _default_categorizer
+
+    cache_key = (tenant_id, row.updated_at)
+    categorizer = _tenant_cache.get(cache_key)
+    if categorizer:
+        return categorizer
+
+    lexicon = CategoryLexicon.query.filter_by(tenant_id=tenant_id).first()
+    categorizer = Categorizer(lexicon.lexicon)
+    with _cache_lock:
+        # Descarta versões antigas do mesmo tenant e limita o tamanho do cache
+        for key in [key for key in _tenant_cache if key[0] == tenant_id]:
+            del _tenant_cache[key]
+        if len(_tenant_cache) >= _MAX_CACHED_TENANTS:
+            _tenant_cache.pop(next(iter(_tenant_cache)))
+        _tenant_cache[cache_key] = categorizer
+    return categorizer
@@ -1,11 +1,129 @@
+import io
 import os
 import json
-import requests
+import logging
+import tempfile
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Any, Tuple, Union
 import base64
+import hashlib
+import requests
 from cryptography.fernet import Fernet
 
+from src.services.export_stream import EXPORT_BATCH_SIZE, ExportFile, export_file_name
+from src.services.http_transport import get_transport
+
+logger = logging.getLogger(__name__)
+
+# Tamanho do bloco usado no content_hash do Dropbox
+DROPBOX_HASH_BLOCK = 4 * 1024 * 1024
+
+# --- Uploads em partes (retomáveis) ---
+
+# Acima disso, upload_file usa sessões de upload (o PUT simples do OneDrive aceita no máximo 4 MB)
+SIMPLE_UPLOAD_LIMIT = 4 * 1024 * 1024
+# As partes precisam ser múltiplas de 256 KiB (Drive) e de 320 KiB (OneDrive): 1,25 MiB atende aos dois
+CHUNK_GRANULARITY = 1280 * 1024
+DEFAULT_CHUNK_SIZE = 8 * CHUNK_GRANULARITY  # 10 MiB
+# Quantas vezes uma mesma parte pode ser retomada após falha antes de desistir
+MAX_RESUME_ATTEMPTS = 5
+
+UploadSource = Union[bytes, BinaryIO, Iterable[bytes]]
+
+
+class UploadError(Exception):
+    """Falha definitiva em um upload em partes (após esgotar as retomadas)."""
+
+
+def upload_chunk_size(chunk_size: Optional[int] = None) -> int:
+    """Tamanho de parte configurado (CLOUD_UPLOAD_CHUNK_SIZE), arredondado para a granularidade aceita."""
+    size = chunk_size or int(os.environ.get('CLOUD_UPLOAD_CHUNK_SIZE', DEFAULT_CHUNK_SIZE))
+    return max(CHUNK_GRANULARITY, size - size % CHUNK_GRANULARITY)
+
+
+def iter_chunks(source: UploadSource, chunk_size: int) -> Iterator[bytes]:
+    """
+    Lê a origem (bytes, arquivo ou gerador de bytes) em partes de exatamente `chunk_size`
+    (a última pode ser menor), mantendo em memória no máximo uma parte.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    if hasattr(source, 'read'):
+        while True:
+            chunk = source.read(chunk_size)
+            # Leituras de streams brutos podem vir incompletas antes do fim
+            while chunk and len(chunk) < chunk_size:
+                more = source.read(chunk_size - len(chunk))
+                if not more:
+                    break
+                chunk += more
+            if not chunk:
+                return
+            yield chunk
+        return
+
+    buffer = bytearray()
+    for piece in source:
+        buffer += piece
+        while len(buffer) >= chunk_size:
+            yield bytes(buffer[:chunk_size])
+            del buffer[:chunk_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+def spool_source(source: UploadSource, size: Optional[int] = None) -> Tuple[BinaryIO, int]:
+    """
+    Garante uma origem com tamanho conhecido (exigido pelas sessões do OneDrive).
+    Geradores são gravados em um arquivo temporário, sem acumular o conteúdo em memória.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source), len(source)
+    if hasattr(source, 'read'):
+        if size is None:
+            position = source.tell()
+            size = source.seek(0, os.SEEK_END) - position
+            source.seek(position)
+        return source, size
+    spooled = tempfile.SpooledTemporaryFile(max_size=DEFAULT_CHUNK_SIZE)
+    for piece in source:
+        spooled.write(piece)
+    size = spooled.tell()
+    spooled.seek(0)
+    return spooled, size
+
+
+# --- Listagem paginada e feed de alterações ---
+
+# Itens por página nas listagens (o máximo aceito pelos três provedores fica acima disso)
+LIST_PAGE_SIZE = int(os.environ.get('CLOUD_LIST_PAGE_SIZE', '500'))
+
+
+class CursorExpired(Exception):
+    """O cursor de alterações guardado não vale mais (o provedor pede uma nova varredura)."""
+
+
+class ChangeFeed:
+    """
+    Alterações remotas desde um cursor, buscadas página a página enquanto são iteradas.
+    Cada item é {'id', 'name', 'removed', 'checksum'}; ao fim da iteração, `cursor`
+    guarda o cursor para a próxima consulta.
+    """
+
+    def __init__(self, pages: Iterator[Dict[str, Any]]):
+        self._pages = pages
+        self.cursor: Optional[str] = None
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        self.cursor = yield from self._pages
+
+
+def _response_json(response) -> Dict[str, Any]:
+    try:
+        return response.json()
+    except ValueError:
+        return {'error': f"HTTP {response.status_code}: {response.text[:200]}"}
+
 class CloudStorageService:
     """Classe base para serviços de armazenamento em nuvem"""
     
@@ -26,27 +144,118 @@ class CloudStorageService:
             return self.cipher.decrypt(encrypted_token.encode()).decode()
         return encrypted_token
     
-    def upload_file(self, file_path: str, content: bytes) -> Dict[str, Any]:
-        """Upload de arquivo - deve ser implementado pelas subclasses"""
+    def upload_file(self, file_name: str, content: bytes, access_token: str,
+                    folder: str = None) -> Dict[str, Any]:
+        """
+        Upload de arquivo - deve ser implementado pelas subclasses.
+        `folder` é a referência devolvida por `CloudSyncManager.ensure_lex_flow_folder`
+        (ID da pasta no Google Drive, caminho no Dropbox e no OneDrive).
+        """
+        raise NotImplementedError
+
+    def upload_stream(self, file_name: str, source: UploadSource, access_token: str,
+                      folder: str = None, size: Optional[int] = None,
+                      chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Upload em partes por sessão retomável, lendo `source` (arquivo ou gerador de bytes)
+        uma parte por vez. Se uma parte falhar, consulta o provedor e continua do último
+        byte confirmado. Lança UploadError se não conseguir concluir.
+        """
         raise NotImplementedError
+
+    def _upload_large(self, file_name: str, content: bytes, access_token: str, folder: str = None) -> Dict[str, Any]:
+        """Conteúdo acima de SIMPLE_UPLOAD_LIMIT vai por sessão de upload (mesmo formato de retorno do upload_file)."""
+        try:
+            return self.upload_stream(file_name, content, access_token, folder, size=len(content))
+        except (UploadError, requests.RequestException) as e:
+            return {'error': str(e)}
     
-    def download_file(self, file_id: str) -> bytes:
+    def download_file(self, file_id: str, access_token: str) -> bytes:
         """Download de arquivo - deve ser implementado pelas subclasses"""
         raise NotImplementedError
+
+    def _download_response(self, file_id: str, access_token: str, stream: bool = False) -> requests.Response:
+        """Resposta HTTP do download (com `stream=True` o corpo é lido sob demanda)."""
+        raise NotImplementedError
+
+    def download_to(self, file_id: str, access_token: str, fileobj: BinaryIO,
+                    chunk_size: int = 1024 * 1024) -> int:
+        """
+        Baixa o arquivo em streaming para `fileobj`, um bloco por vez, sem carregá-lo
+        inteiro na memória. Retorna o número de bytes gravados.
+        """
+        response = self._download_response(file_id, access_token, stream=True)
+        try:
+            if response.status_code != 200:
+                raise RuntimeError(f"Download falhou: HTTP {response.status_code}: {response.text[:200]}")
+            written = 0
+            for block in response.iter_content(chunk_size):
+                fileobj.write(block)
+                written += len(block)
+            return written
+        finally:
+            response.close()
     
     def list_files(self, folder_id: str = None) -> List[Dict[str, Any]]:
         """Lista arquivos - deve ser implementado pelas subclasses"""
         raise NotImplementedError
+
+    def latest_cursor(self, access_token: str, folder: Dict[str, str]) -> str:
+        """Cursor que marca o estado atual da pasta (`folder` = {'id', 'ref'}), para `changes` a partir de agora."""
+        raise NotImplementedError
+
+    def changes(self, access_token: str, folder: Dict[str, str], cursor: str) -> ChangeFeed:
+        """Alterações na pasta desde `cursor`. Lança CursorExpired se o cursor não vale mais."""
+        raise NotImplementedError
     
-    def delete_file(self, file_id: str) -> bool:
+    def delete_file(self, file_id: str, access_token: str) -> bool:
         """Deleta arquivo - deve ser implementado pelas subclasses"""
         raise NotImplementedError
 
+    def get_folder(self, folder_id: str, access_token: str) -> Optional[Dict[str, str]]:
+        """
+        Pasta pelo ID: {'id', 'ref'} (`ref` é o que os uploads recebem em `folder`), ou None
+        se ela não existe mais. Outros erros viram RuntimeError.
+        """
+        raise NotImplementedError
+
+    def find_folder(self, name: str, access_token: str) -> Optional[Dict[str, str]]:
+        """Pasta `name` na raiz do usuário ({'id', 'ref'}), ou None."""
+        raise NotImplementedError
+
+    def create_named_folder(self, name: str, access_token: str) -> Dict[str, str]:
+        """Cria a pasta `name` na raiz do usuário e retorna {'id', 'ref'}."""
+        raise NotImplementedError
+
+    def resolve_folder(self, name: str, access_token: str, cached: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """
+        Pasta `name` ({'id', 'ref'}). Com a referência guardada de uma sincronização anterior,
+        basta uma consulta pelo ID; a busca pelo nome (e a criação) só acontece se ela sumiu.
+        """
+        if cached and cached.get('id'):
+            folder = self.get_folder(cached['id'], access_token)
+            if folder is not None:
+                return folder
+            logger.info("Pasta %s (%s) não existe mais no provedor; procurando pelo nome", name, cached['id'])
+        return self.find_folder(name, access_token) or self.create_named_folder(name, access_token)
+
+    def content_checksum(self, content: Union[bytes, BinaryIO]) -> Optional[str]:
+        """
+        Checksum que o provedor calcula para o conteúdo (None se o provedor não expõe um).
+        Aceita bytes ou um arquivo, lido em blocos a partir da posição atual.
+        """
+        return None
+
+    def remote_checksum(self, file_id: str, access_token: str) -> Optional[str]:
+        """Checksum atual do arquivo remoto; None se não existir mais ou não for suportado."""
+        return None
+
 class GoogleDriveService(CloudStorageService):
     """Serviço para integração com Google Drive"""
     
     def __init__(self, encryption_key: str = None):
         super().__init__(encryption_key)
+        self.http = get_transport('google_drive')
         self.base_url = "https://www.googleapis.com/drive/v3"
         self.upload_url = "https://www.googleapis.com/upload/drive/v3"
     
@@ -76,7 +285,7 @@ class GoogleDriveService(CloudStorageService):
             'grant_type': 'authorization_code'
         }
         
-        response = requests.post(token_url, data=data)
+        response = self.http.post(token_url, data=data, operation='token')
         return response.json()
     
     def refresh_access_token(self, refresh_token: str, client_id: str, 
@@ -90,12 +299,15 @@ class GoogleDriveService(CloudStorageService):
             'grant_type': 'refresh_token'
         }
         
-        response = requests.post(token_url, data=data)
+        response = self.http.post(token_url, data=data, operation='token_refresh')
         return response.json()
     
     def upload_file(self, file_name: str, content: bytes, access_token: str, 
                    folder_id: str = None) -> Dict[str, Any]:
         """Upload de arquivo para Google Drive"""
+        if len(content) > SIMPLE_UPLOAD_LIMIT:
+            return self._upload_large(file_name, content, access_token, folder_id)
+
         headers = {
             'Authorization': f'Bearer {access_token}',
             'Content-Type': 'application/json'
@@ -115,40 +327,232 @@ class GoogleDriveService(CloudStorageService):
             'media': (file_name, content, 'application/octet-stream')
         }
         
-        response = requests.post(
-            f"{self.upload_url}/files?uploadType=multipart",
+        response = self.http.post(
+            f"{self.upload_url}/files?uploadType=multipart&fields=id,name,md5Checksum",
             headers={'Authorization': f'Bearer {access_token}'},
-            files=files
+            files=files,
+            operation='upload'
         )
         
         return response.json()
     
+    def upload_stream(self, file_name: str, source: UploadSource, access_token: str,
+                      folder_id: str = None, size: Optional[int] = None,
+                      chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """Upload retomável do Google Drive (uploadType=resumable)."""
+        chunk_size = upload_chunk_size(chunk_size)
+        metadata = {'name': file_name}
+        if folder_id:
+            metadata['parents'] = [folder_id]
+        headers = {
+            'Authorization': f'Bearer {access_token}',
+            'X-Upload-Content-Type': 'application/octet-stream'
+        }
+        if size is not None:
+            headers['X-Upload-Content-Length'] = str(size)
+
+        response = self.http.post(
+            f"{self.upload_url}/files?uploadType=resumable&fields=id,name,md5Checksum",
+            headers=headers,
+            json=metadata,
+            operation='upload_session'
+        )
+        session_url = response.headers.get('Location')
+        if response.status_code != 200 or not session_url:
+            raise UploadError(f"Não foi possível abrir a sessão de upload: {_response_json(response)}")
+
+        offset = 0
+        for chunk in iter_chunks(source, chunk_size):
+            # Sem tamanho informado, a última parte é a que vem incompleta
+            last = len(chunk) < chunk_size or (size is not None and offset + len(chunk) >= size)
+            result = self._put_drive_chunk(session_url, chunk, offset, offset + len(chunk) if last else None)
+            offset += len(chunk)
+            if result is not None:
+                return result
+        # O conteúdo terminou exatamente no fim de uma parte: informa o tamanho total para concluir
+        result = self._put_drive_chunk(session_url, b'', offset, offset)
+        if result is None:
+            raise UploadError("O Drive não concluiu o upload após a última parte")
+        return result
+
+    def _drive_session_status(self, session_url: str, total: Optional[int]):
+        """Consulta a sessão: (bytes confirmados, None) ou (total, metadados) se já concluída."""
+        response = self.http.put(
+            session_url,
+            headers={'Content-Range': f"bytes */{total if total is not None else '*'}"},
+            operation='upload_status'
+        )
+        if response.status_code in (200, 201):
+            return total, response.json()
+        if response.status_code != 308:
+            raise UploadError(f"Sessão de upload inválida: {_response_json(response)}")
+        confirmed = response.headers.get('Range')  # ex: 'bytes=0-1048575'
+        return (int(confirmed.rsplit('-', 1)[1]) + 1 if confirmed else 0), None
+
+    def _put_drive_chunk(self, session_url: str, chunk: bytes, offset: int,
+                         total: Optional[int]) -> Optional[Dict[str, Any]]:
+        """Envia uma parte; retorna os metadados do arquivo se o upload terminou, senão None."""
+        sent = 0
+        for attempt in range(MAX_RESUME_ATTEMPTS + 1):
+            body = chunk[sent:]
+            start = offset + sent
+            total_label = total if total is not None else '*'
+            content_range = f"bytes {start}-{start + len(body) - 1}/{total_label}" if body else f"bytes */{total_label}"
+            try:
+                response = self.http.put(session_url, headers={'Content-Range': content_range}, data=body,
+                                         operation='upload_chunk', idempotent=False)
+                if response.status_code in (200, 201):
+                    return response.json()
+                if response.status_code == 308:
+                    confirmed = response.headers.get('Range')
+                    acknowledged = int(confirmed.rsplit('-', 1)[1]) + 1 if confirmed else 0
+                    if acknowledged >= offset + len(chunk):
+                        return None
+                    error = f"parte confirmada até o byte {acknowledged}"
+                else:
+                    error = _response_json(response)
+            except requests.RequestException as e:
+                error = e
+
+            logger.warning("Upload no Drive interrompido no byte %d (tentativa %d): %s", start, attempt + 1, error)
+            acknowledged, metadata = self._drive_session_status(session_url, total)
+            if metadata is not None:
+                return metadata
+            if acknowledged < offset:
+                raise UploadError("O Drive perdeu partes já confirmadas; o upload precisa recomeçar")
+            sent = acknowledged - offset
+        raise UploadError(f"Upload no Drive falhou no byte {offset + sent}")
+
     def download_file(self, file_id: str, access_token: str) -> bytes:
         """Download de arquivo do Google Drive"""
+        return self._download_response(file_id, access_token).content
+
+    def _download_response(self, file_id: str, access_token: str, stream: bool = False) -> requests.Response:
         headers = {'Authorization': f'Bearer {access_token}'}
-        response = requests.get(
+        return self.http.get(
             f"{self.base_url}/files/{file_id}?alt=media",
-            headers=headers
+            headers=headers,
+            operation='download', stream=stream
         )
-        return response.content
     
+    def delete_file(self, file_id: str, access_token: str) -> bool:
+        """Remove o arquivo do Google Drive (um arquivo que já não existe conta como removido)."""
+        response = self.http.delete(
+            f"{self.base_url}/files/{file_id}",
+            headers={'Authorization': f'Bearer {access_token}'},
+            operation='delete'
+        )
+        return response.status_code in (200, 204, 404)
+
     def list_files(self, access_token: str, folder_id: str = None, 
                   query: str = None) -> List[Dict[str, Any]]:
-        """Lista arquivos do Google Drive"""
+        """Lista arquivos do Google Drive (todas as páginas)"""
+        return list(self.iter_files(access_token, folder_id, query))
+
+    def iter_files(self, access_token: str, folder_id: str = None, query: str = None,
+                   fields: str = 'id,name,mimeType,size,createdTime,modifiedTime,parents',
+                   page_size: int = LIST_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+        """Arquivos do Google Drive, buscando a próxima página (nextPageToken) só quando necessário."""
         headers = {'Authorization': f'Bearer {access_token}'}
-        
-        params = {
-            'fields': 'files(id,name,mimeType,size,createdTime,modifiedTime,parents)'
-        }
-        
+        params = {'fields': f'nextPageToken,files({fields})', 'pageSize': page_size}
         if query:
             params['q'] = query
         elif folder_id:
-            params['q'] = f"'{folder_id}' in parents"
-        
-        response = requests.get(f"{self.base_url}/files", headers=headers, params=params)
-        return response.json().get('files', [])
+            params['q'] = f"'{folder_id}' in parents and trashed=false"
+
+        while True:
+            response = self.http.get(f"{self.base_url}/files", headers=headers, params=params, operation='list')
+            if response.status_code != 200:
+                raise RuntimeError(f"Falha ao listar arquivos: {_response_json(response)}")
+            page = response.json()
+            yield from page.get('files', [])
+            if not page.get('nextPageToken'):
+                return
+            params['pageToken'] = page['nextPageToken']
+
+    def latest_cursor(self, access_token: str, folder: Dict[str, str]) -> str:
+        response = self.http.get(
+            f"{self.base_url}/changes/startPageToken",
+            headers={'Authorization': f'Bearer {access_token}'},
+            operation='changes'
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Falha ao obter o cursor de alterações: {_response_json(response)}")
+        return response.json()['startPageToken']
+
+    def changes(self, access_token: str, folder: Dict[str, str], cursor: str) -> ChangeFeed:
+        """API `changes` do Drive (em todo o Drive do app), filtrada pelos arquivos da pasta."""
+        def pages():
+            params = {
+                'pageToken': cursor, 'pageSize': LIST_PAGE_SIZE, 'spaces': 'drive',
+                'fields': 'nextPageToken,newStartPageToken,changes(fileId,removed,file(name,parents,trashed,md5Checksum))'
+            }
+            while True:
+                response = self.http.get(f"{self.base_url}/changes", headers={'Authorization': f'Bearer {access_token}'},
+                                         params=params, operation='changes')
+                if response.status_code in (400, 404, 410):
+                    raise CursorExpired(_response_json(response))
+                if response.status_code != 200:
+                    raise RuntimeError(f"Falha ao consultar alterações: {_response_json(response)}")
+                page = response.json()
+                for change in page.get('changes', []):
+                    file = change.get('file') or {}
+                    if file and folder['id'] not in (file.get('parents') or []):
+                        continue
+                    yield {'id': change['fileId'], 'name': file.get('name'),
+                           'removed': bool(change.get('removed') or file.get('trashed')),
+                           'checksum': file.get('md5Checksum')}
+                if page.get('newStartPageToken'):
+                    return page['newStartPageToken']
+                params['pageToken'] = page['nextPageToken']
+        return ChangeFeed(pages())
+
+    def content_checksum(self, content: Union[bytes, BinaryIO]) -> Optional[str]:
+        """O Drive expõe o MD5 do conteúdo em `md5Checksum`."""
+        digest = hashlib.md5()
+        for block in iter_chunks(content, DROPBOX_HASH_BLOCK):
+            digest.update(block)
+        return digest.hexdigest()
+
+    def remote_checksum(self, file_id: str, access_token: str) -> Optional[str]:
+        response = self.http.get(
+            f"{self.base_url}/files/{file_id}",
+            headers={'Authorization': f'Bearer {access_token}'},
+            params={'fields': 'md5Checksum,trashed'},
+            operation='metadata'
+        )
+        if response.status_code == 404:
+            return None
+        metadata = response.json()
+        return None if metadata.get('trashed') else metadata.get('md5Checksum')
     
+    def get_folder(self, folder_id: str, access_token: str) -> Optional[Dict[str, str]]:
+        response = self.http.get(
+            f"{self.base_url}/files/{folder_id}",
+            headers={'Authorization': f'Bearer {access_token}'},
+            params={'fields': 'id,trashed'},
+            operation='metadata'
+        )
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise RuntimeError(f"Falha ao consultar a pasta: {_response_json(response)}")
+        metadata = response.json()
+        return None if metadata.get('trashed') else {'id': metadata['id'], 'ref': metadata['id']}
+
+    def find_folder(self, name: str, access_token: str) -> Optional[Dict[str, str]]:
+        files = self.list_files(
+            access_token,
+            query=f"name='{name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
+        )
+        return {'id': files[0]['id'], 'ref': files[0]['id']} if files else None
+
+    def create_named_folder(self, name: str, access_token: str) -> Dict[str, str]:
+        folder = self.create_folder(name, access_token)
+        if 'id' not in folder:
+            raise RuntimeError(f"Falha ao criar a pasta {name}: {folder}")
+        return {'id': folder['id'], 'ref': folder['id']}
+
     def create_folder(self, folder_name: str, access_token: str, 
                      parent_folder_id: str = None) -> Dict[str, Any]:
         """Cria pasta no Google Drive"""
@@ -165,10 +569,11 @@ class GoogleDriveService(CloudStorageService):
         if parent_folder_id:
             metadata['parents'] = [parent_folder_id]
         
-        response = requests.post(
+        response = self.http.post(
             f"{self.base_url}/files",
             headers=headers,
-            json=metadata
+            json=metadata,
+            operation='create_folder'
         )
         
         return response.json()
@@ -178,6 +583,7 @@ class DropboxService(CloudStorageService):
     
     def __init__(self, encryption_key: str = None):
         super().__init__(encryption_key)
+        self.http = get_transport('dropbox')
         self.base_url = "https://api.dropboxapi.com/2"
         self.content_url = "https://content.dropboxapi.com/2"
     
@@ -204,7 +610,7 @@ class DropboxService(CloudStorageService):
             'redirect_uri': redirect_uri
         }
         
-        response = requests.post(token_url, data=data)
+        response = self.http.post(token_url, data=data, operation='token')
         return response.json()
     
     def refresh_access_token(self, refresh_token: str, client_id: str, 
@@ -218,11 +624,16 @@ class DropboxService(CloudStorageService):
             'client_secret': client_secret
         }
         
-        response = requests.post(token_url, data=data)
+        response = self.http.post(token_url, data=data, operation='token_refresh')
         return response.json()
     
-    def upload_file(self, file_path: str, content: bytes, access_token: str) -> Dict[str, Any]:
+    def upload_file(self, file_name: str, content: bytes, access_token: str,
+                    folder_path: str = "") -> Dict[str, Any]:
         """Upload de arquivo para Dropbox"""
+        if len(content) > SIMPLE_UPLOAD_LIMIT:
+            return self._upload_large(file_name, content, access_token, folder_path)
+
+        file_path = f"{folder_path.rstrip('/')}/{file_name}"
         headers = {
             'Authorization': f'Bearer {access_token}',
             'Dropbox-API-Arg': json.dumps({
@@ -233,56 +644,231 @@ class DropboxService(CloudStorageService):
             'Content-Type': 'application/octet-stream'
         }
         
-        response = requests.post(
+        response = self.http.post(
             f"{self.content_url}/files/upload",
             headers=headers,
-            data=content
+            data=content,
+            operation='upload', idempotent=True
         )
         
         return response.json()
     
+    def _upload_session_call(self, endpoint: str, access_token: str, arg: Dict[str, Any], data: bytes = b''):
+        return self.http.post(
+            f"{self.content_url}/files/upload_session/{endpoint}",
+            headers={
+                'Authorization': f'Bearer {access_token}',
+                'Dropbox-API-Arg': json.dumps(arg),
+                'Content-Type': 'application/octet-stream'
+            },
+            data=data,
+            operation=f'upload_{endpoint}', idempotent=False
+        )
+
+    def upload_stream(self, file_name: str, source: UploadSource, access_token: str,
+                      folder_path: str = "", size: Optional[int] = None,
+                      chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """Upload em partes do Dropbox (upload_session/start, append_v2 e finish)."""
+        chunk_size = upload_chunk_size(chunk_size)
+        response = self._upload_session_call('start', access_token, {'close': False})
+        if response.status_code != 200:
+            raise UploadError(f"Não foi possível abrir a sessão de upload: {_response_json(response)}")
+        session_id = response.json()['session_id']
+
+        offset = 0
+        for chunk in iter_chunks(source, chunk_size):
+            offset = self._append_dropbox_chunk(session_id, access_token, chunk, offset)
+
+        commit = {'path': f"{folder_path.rstrip('/')}/{file_name}", 'mode': 'overwrite', 'autorename': True}
+        response = self._upload_session_call(
+            'finish', access_token, {'cursor': {'session_id': session_id, 'offset': offset}, 'commit': commit}
+        )
+        if response.status_code != 200:
+            raise UploadError(f"Não foi possível concluir o upload: {_response_json(response)}")
+        return response.json()
+
+    def _append_dropbox_chunk(self, session_id: str, access_token: str, chunk: bytes, offset: int) -> int:
+        """Anexa uma parte à sessão e retorna o novo offset, retomando pelo `correct_offset` informado pelo Dropbox."""
+        sent = 0
+        probe = False
+        for attempt in range(MAX_RESUME_ATTEMPTS + 1):
+            if sent >= len(chunk):
+                return offset + len(chunk)
+            cursor = {'session_id': session_id, 'offset': offset + sent}
+            # Após uma falha sem resposta confiável, um append vazio descobre quantos bytes o Dropbox já gravou
+            body = b'' if probe else chunk[sent:]
+            try:
+                response = self._upload_session_call('append_v2', access_token, {'cursor': cursor, 'close': False}, body)
+                if response.status_code == 200:
+                    if not probe:
+                        return offset + len(chunk)
+                    probe = False
+                    continue
+                error = _response_json(response)
+                detail = error.get('error')
+                correct = detail.get('correct_offset') if isinstance(detail, dict) else None
+                if correct is not None:
+                    if correct < offset:
+                        raise UploadError("O Dropbox perdeu partes já confirmadas; o upload precisa recomeçar")
+                    sent, probe = correct - offset, False
+                    continue
+            except requests.RequestException as e:
+                error = e
+            logger.warning("Upload no Dropbox interrompido no byte %d (tentativa %d): %s", offset + sent, attempt + 1, error)
+            probe = True
+        raise UploadError(f"Upload no Dropbox falhou no byte {offset + sent}")
+
     def download_file(self, file_path: str, access_token: str) -> bytes:
         """Download de arquivo do Dropbox"""
+        return self._download_response(file_path, access_token).content
+
+    def _download_response(self, file_path: str, access_token: str, stream: bool = False) -> requests.Response:
         headers = {
             'Authorization': f'Bearer {access_token}',
             'Dropbox-API-Arg': json.dumps({'path': file_path})
         }
-        
-        response = requests.post(
+        return self.http.post(
             f"{self.content_url}/files/download",
-            headers=headers
+            headers=headers,
+            operation='download', idempotent=True, stream=stream
         )
-        
-        return response.content
     
+    def delete_file(self, file_path: str, access_token: str) -> bool:
+        """Remove o arquivo do Dropbox (aceita caminho ou 'id:...')."""
+        response = self.http.post(
+            f"{self.base_url}/files/delete_v2",
+            headers={'Authorization': f'Bearer {access_token}', 'Content-Type': 'application/json'},
+            json={'path': file_path},
+            operation='delete', idempotent=True
+        )
+        if response.status_code == 409:  # path_lookup/not_found: já removido
+            return 'not_found' in response.text
+        return response.status_code == 200
+
     def list_files(self, access_token: str, folder_path: str = "") -> List[Dict[str, Any]]:
-        """Lista arquivos do Dropbox"""
-        headers = {
-            'Authorization': f'Bearer {access_token}',
-            'Content-Type': 'application/json'
-        }
-        
-        data = {
+        """Lista arquivos do Dropbox (todas as páginas)"""
+        return list(self.iter_files(access_token, folder_path))
+
+    def _list_folder(self, access_token: str, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        response = self.http.post(
+            f"{self.base_url}/files/{endpoint}",
+            headers={'Authorization': f'Bearer {access_token}', 'Content-Type': 'application/json'},
+            json=data,
+            operation='list', idempotent=True
+        )
+        if response.status_code == 409 and 'reset' in response.text:
+            raise CursorExpired(_response_json(response))
+        if response.status_code != 200:
+            raise RuntimeError(f"Falha ao listar arquivos: {_response_json(response)}")
+        return response.json()
+
+    def _iter_pages(self, access_token: str, page: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Entradas de list_folder seguindo `has_more` com list_folder/continue; retorna o cursor final."""
+        while True:
+            yield from page.get('entries', [])
+            if not page.get('has_more'):
+                return page.get('cursor')
+            page = self._list_folder(access_token, 'list_folder/continue', {'cursor': page['cursor']})
+
+    def iter_files(self, access_token: str, folder_path: str = "",
+                   page_size: int = LIST_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+        """Arquivos do Dropbox, buscando a próxima página só quando necessário."""
+        first = self._list_folder(access_token, 'list_folder', {
             'path': folder_path,
             'recursive': False,
             'include_media_info': False,
-            'include_deleted': False
-        }
-        
-        response = requests.post(
-            f"{self.base_url}/files/list_folder",
-            headers=headers,
-            json=data
+            'include_deleted': False,
+            'limit': page_size
+        })
+        yield from self._iter_pages(access_token, first)
+
+    def latest_cursor(self, access_token: str, folder: Dict[str, str]) -> str:
+        return self._list_folder(access_token, 'list_folder/get_latest_cursor', {
+            'path': folder['ref'], 'recursive': False, 'include_deleted': True
+        })['cursor']
+
+    def changes(self, access_token: str, folder: Dict[str, str], cursor: str) -> ChangeFeed:
+        """list_folder/continue a partir do cursor guardado (arquivos removidos vêm como '.tag': 'deleted')."""
+        def pages():
+            first = self._list_folder(access_token, 'list_folder/continue', {'cursor': cursor})
+            entries = self._iter_pages(access_token, first)
+            while True:
+                try:
+                    entry = next(entries)
+                except StopIteration as done:
+                    return done.value
+                if entry.get('.tag') == 'folder':
+                    continue
+                yield {'id': entry.get('id'), 'name': entry.get('name'), 'removed': entry.get('.tag') == 'deleted',
+                       'checksum': entry.get('content_hash')}
+        return ChangeFeed(pages())
+
+    def _folder_metadata(self, path: str, access_token: str) -> Optional[Dict[str, str]]:
+        """Metadados da pasta (por caminho ou 'id:...'); None se não existe ou não é pasta."""
+        response = self.http.post(
+            f"{self.base_url}/files/get_metadata",
+            headers={'Authorization': f'Bearer {access_token}', 'Content-Type': 'application/json'},
+            json={'path': path},
+            operation='metadata', idempotent=True
         )
-        
-        result = response.json()
-        return result.get('entries', [])
+        if response.status_code == 409 and 'not_found' in response.text:
+            return None
+        if response.status_code != 200:
+            raise RuntimeError(f"Falha ao consultar a pasta: {_response_json(response)}")
+        metadata = response.json()
+        if metadata.get('.tag') != 'folder':
+            return None
+        # O caminho atual acompanha a pasta se o usuário a renomear ou mover
+        return {'id': metadata['id'], 'ref': metadata['path_display']}
+
+    def get_folder(self, folder_id: str, access_token: str) -> Optional[Dict[str, str]]:
+        return self._folder_metadata(folder_id, access_token)
+
+    def find_folder(self, name: str, access_token: str) -> Optional[Dict[str, str]]:
+        return self._folder_metadata(f"/{name}", access_token)
+
+    def create_named_folder(self, name: str, access_token: str) -> Dict[str, str]:
+        response = self.http.post(
+            f"{self.base_url}/files/create_folder_v2",
+            headers={'Authorization': f'Bearer {access_token}', 'Content-Type': 'application/json'},
+            json={'path': f"/{name}", 'autorename': False},
+            operation='create_folder', idempotent=True
+        )
+        if response.status_code == 409 and 'conflict' in response.text:
+            # Criada por outra sincronização ao mesmo tempo
+            folder = self.find_folder(name, access_token)
+            if folder:
+                return folder
+        if response.status_code != 200:
+            raise RuntimeError(f"Falha ao criar a pasta {name}: {_response_json(response)}")
+        metadata = response.json()['metadata']
+        return {'id': metadata['id'], 'ref': metadata['path_display']}
+
+    def content_checksum(self, content: Union[bytes, BinaryIO]) -> Optional[str]:
+        """
+        `content_hash` do Dropbox: SHA-256 da concatenação dos SHA-256 de cada bloco de 4 MB.
+        https://www.dropbox.com/developers/reference/content-hash
+        """
+        block_hashes = b''.join(hashlib.sha256(block).digest() for block in iter_chunks(content, DROPBOX_HASH_BLOCK))
+        return hashlib.sha256(block_hashes).hexdigest()
+
+    def remote_checksum(self, file_id: str, access_token: str) -> Optional[str]:
+        response = self.http.post(
+            f"{self.base_url}/files/get_metadata",
+            headers={'Authorization': f'Bearer {access_token}', 'Content-Type': 'application/json'},
+            json={'path': file_id},
+            operation='metadata', idempotent=True
+        )
+        if response.status_code == 409:  # path/not_found
+            return None
+        return response.json().get('content_hash')
 
 class OneDriveService(CloudStorageService):
     """Serviço para integração com Microsoft OneDrive"""
     
     def __init__(self, encryption_key: str = None):
         super().__init__(encryption_key)
+        self.http = get_transport('onedrive')
         self.base_url = "https://graph.microsoft.com/v1.0"
     
     def get_auth_url(self, client_id: str, redirect_uri: str) -> str:
@@ -310,7 +896,7 @@ class OneDriveService(CloudStorageService):
             'grant_type': 'authorization_code'
         }
         
-        response = requests.post(token_url, data=data)
+        response = self.http.post(token_url, data=data, operation='token')
         return response.json()
     
     def refresh_access_token(self, refresh_token: str, client_id: str, 
@@ -324,12 +910,15 @@ class OneDriveService(CloudStorageService):
             'grant_type': 'refresh_token'
         }
         
-        response = requests.post(token_url, data=data)
+        response = self.http.post(token_url, data=data, operation='token_refresh')
         return response.json()
     
     def upload_file(self, file_name: str, content: bytes, access_token: str, 
                    folder_path: str = "") -> Dict[str, Any]:
         """Upload de arquivo para OneDrive"""
+        if len(content) > SIMPLE_UPLOAD_LIMIT:
+            return self._upload_large(file_name, content, access_token, folder_path)
+
         headers = {
             'Authorization': f'Bearer {access_token}',
             'Content-Type': 'application/octet-stream'
@@ -341,37 +930,255 @@ class OneDriveService(CloudStorageService):
         else:
             upload_path = file_name
         
-        response = requests.put(
+        response = self.http.put(
             f"{self.base_url}/me/drive/root:/{upload_path}:/content",
             headers=headers,
-            data=content
+            data=content,
+            operation='upload'
         )
         
         return response.json()
     
+    def upload_stream(self, file_name: str, source: UploadSource, access_token: str,
+                      folder_path: str = "", size: Optional[int] = None,
+                      chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """Upload em partes do OneDrive (createUploadSession); o tamanho total precisa ser conhecido."""
+        chunk_size = upload_chunk_size(chunk_size)
+        source, size = spool_source(source, size)
+        if size == 0:
+            return self.upload_file(file_name, b'', access_token, folder_path)
+
+        upload_path = f"{folder_path}/{file_name}" if folder_path else file_name
+        response = self.http.post(
+            f"{self.base_url}/me/drive/root:/{upload_path}:/createUploadSession",
+            headers={'Authorization': f'Bearer {access_token}'},
+            json={'item': {'@microsoft.graph.conflictBehavior': 'replace'}},
+            operation='upload_session'
+        )
+        upload_url = response.json().get('uploadUrl') if response.status_code == 200 else None
+        if not upload_url:
+            raise UploadError(f"Não foi possível abrir a sessão de upload: {_response_json(response)}")
+
+        offset = 0
+        result = None
+        for chunk in iter_chunks(source, chunk_size):
+            result = self._put_onedrive_chunk(upload_url, chunk, offset, size)
+            offset += len(chunk)
+        if result is None:
+            raise UploadError("O OneDrive não concluiu o upload após a última parte")
+        return result
+
+    def _onedrive_next_offset(self, upload_url: str) -> int:
+        """Primeiro byte ainda esperado pela sessão (nextExpectedRanges: ['26-'])."""
+        response = self.http.get(upload_url, operation='upload_status')
+        ranges = response.json().get('nextExpectedRanges') or []
+        if response.status_code != 200 or not ranges:
+            raise UploadError(f"Sessão de upload inválida: {_response_json(response)}")
+        return int(ranges[0].split('-')[0])
+
+    def _put_onedrive_chunk(self, upload_url: str, chunk: bytes, offset: int, size: int) -> Optional[Dict[str, Any]]:
+        """Envia uma parte (a URL da sessão já é autenticada); retorna o item ao concluir o arquivo."""
+        sent = 0
+        for attempt in range(MAX_RESUME_ATTEMPTS + 1):
+            body = chunk[sent:]
+            start = offset + sent
+            try:
+                response = self.http.put(
+                    upload_url,
+                    headers={'Content-Range': f"bytes {start}-{start + len(body) - 1}/{size}"},
+                    data=body,
+                    operation='upload_chunk', idempotent=False
+                )
+                if response.status_code in (200, 201):
+                    return response.json()
+                if response.status_code == 202:
+                    return None
+                error = _response_json(response)
+            except requests.RequestException as e:
+                error = e
+
+            logger.warning("Upload no OneDrive interrompido no byte %d (tentativa %d): %s", start, attempt + 1, error)
+            acknowledged = self._onedrive_next_offset(upload_url)
+            if acknowledged < offset:
+                raise UploadError("O OneDrive perdeu partes já confirmadas; o upload precisa recomeçar")
+            if acknowledged >= offset + len(chunk):
+                return None
+            sent = acknowledged - offset
+        raise UploadError(f"Upload no OneDrive falhou no byte {offset + sent}")
+
     def download_file(self, file_id: str, access_token: str) -> bytes:
         """Download de arquivo do OneDrive"""
+        return self._download_response(file_id, access_token).content
+
+    def _download_response(self, file_id: str, access_token: str, stream: bool = False) -> requests.Response:
         headers = {'Authorization': f'Bearer {access_token}'}
-        
-        response = requests.get(
+        return self.http.get(
             f"{self.base_url}/me/drive/items/{file_id}/content",
-            headers=headers
+            headers=headers,
+            operation='download', stream=stream
         )
-        
-        return response.content
     
-    def list_files(self, access_token: str, folder_id: str = None) -> List[Dict[str, Any]]:
-        """Lista arquivos do OneDrive"""
+    def delete_file(self, file_id: str, access_token: str) -> bool:
+        """Remove o item do OneDrive (vai para a lixeira do usuário)."""
+        response = self.http.delete(
+            f"{self.base_url}/me/drive/items/{file_id}",
+            headers={'Authorization': f'Bearer {access_token}'},
+            operation='delete'
+        )
+        return response.status_code in (204, 404)
+
+    @staticmethod
+    def _folder_ref(item: Dict[str, Any]) -> Dict[str, str]:
+        """{'id', 'ref'} de um item de pasta; `ref` é o caminho a partir da raiz (ex: 'Lex Flow')."""
+        # parentReference.path: '/drive/root:' na raiz, '/drive/root:/Documentos' em subpastas
+        parent = (item.get('parentReference') or {}).get('path', '').partition('root:')[2].strip('/')
+        return {'id': item['id'], 'ref': f"{parent}/{item['name']}" if parent else item['name']}
+
+    def _folder_item(self, url: str, access_token: str) -> Optional[Dict[str, str]]:
+        response = self.http.get(
+            url,
+            headers={'Authorization': f'Bearer {access_token}'},
+            params={'select': 'id,name,folder,parentReference'},
+            operation='metadata'
+        )
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise RuntimeError(f"Falha ao consultar a pasta: {_response_json(response)}")
+        item = response.json()
+        return self._folder_ref(item) if 'folder' in item else None
+
+    def get_folder(self, folder_id: str, access_token: str) -> Optional[Dict[str, str]]:
+        return self._folder_item(f"{self.base_url}/me/drive/items/{folder_id}", access_token)
+
+    def find_folder(self, name: str, access_token: str) -> Optional[Dict[str, str]]:
+        return self._folder_item(f"{self.base_url}/me/drive/root:/{name}", access_token)
+
+    def create_named_folder(self, name: str, access_token: str) -> Dict[str, str]:
+        response = self.http.post(
+            f"{self.base_url}/me/drive/root/children",
+            headers={'Authorization': f'Bearer {access_token}', 'Content-Type': 'application/json'},
+            json={'name': name, 'folder': {}, '@microsoft.graph.conflictBehavior': 'fail'},
+            operation='create_folder'
+        )
+        if response.status_code == 409:
+            # Criada por outra sincronização ao mesmo tempo
+            folder = self.find_folder(name, access_token)
+            if folder:
+                return folder
+        if response.status_code not in (200, 201):
+            raise RuntimeError(f"Falha ao criar a pasta {name}: {_response_json(response)}")
+        return self._folder_ref(response.json())
+
+    def list_files(self, access_token: str, folder_id: str = None,
+                   folder_path: str = None) -> List[Dict[str, Any]]:
+        """Lista arquivos do OneDrive (por ID da pasta ou pelo caminho a partir da raiz)"""
+        return list(self.iter_files(access_token, folder_id, folder_path))
+
+    def _iter_pages(self, access_token: str, url: str, params: Dict[str, Any] = None,
+                    operation: str = 'list') -> Iterator[Dict[str, Any]]:
+        """Itens de uma coleção do Graph seguindo @odata.nextLink; retorna o @odata.deltaLink, se houver."""
         headers = {'Authorization': f'Bearer {access_token}'}
-        
+        while True:
+            response = self.http.get(url, headers=headers, params=params, operation=operation)
+            if response.status_code == 410:
+                raise CursorExpired(_response_json(response))
+            if response.status_code != 200:
+                raise RuntimeError(f"Falha ao listar arquivos: {_response_json(response)}")
+            page = response.json()
+            yield from page.get('value', [])
+            if not page.get('@odata.nextLink'):
+                return page.get('@odata.deltaLink')
+            url, params = page['@odata.nextLink'], None  # O nextLink já traz os parâmetros
+
+    def iter_files(self, access_token: str, folder_id: str = None, folder_path: str = None,
+                   page_size: int = LIST_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+        """Arquivos do OneDrive, buscando a próxima página só quando necessário."""
         if folder_id:
             url = f"{self.base_url}/me/drive/items/{folder_id}/children"
+        elif folder_path:
+            url = f"{self.base_url}/me/drive/root:/{folder_path.strip('/')}:/children"
         else:
             url = f"{self.base_url}/me/drive/root/children"
-        
-        response = requests.get(url, headers=headers)
-        result = response.json()
-        return result.get('value', [])
+        params = {'$select': 'id,name,size,file,folder,lastModifiedDateTime,createdDateTime', '$top': page_size}
+        yield from self._iter_pages(access_token, url, params)
+
+    def latest_cursor(self, access_token: str, folder: Dict[str, str]) -> str:
+        pages = self._iter_pages(access_token, f"{self.base_url}/me/drive/items/{folder['id']}/delta",
+                                 {'token': 'latest'}, operation='changes')
+        while True:
+            try:
+                next(pages)
+            except StopIteration as done:
+                return done.value
+
+    def changes(self, access_token: str, folder: Dict[str, str], cursor: str) -> ChangeFeed:
+        """Consulta delta a partir do deltaLink guardado (itens removidos trazem a faceta 'deleted')."""
+        def pages():
+            items = self._iter_pages(access_token, cursor, {'$select': 'id,name,file,folder,deleted'}, operation='changes')
+            while True:
+                try:
+                    item = next(items)
+                except StopIteration as done:
+                    return done.value
+                if 'folder' in item or item.get('id') == folder['id']:
+                    continue
+                yield {'id': item['id'], 'name': item.get('name'), 'removed': 'deleted' in item, 'checksum': None}
+        return ChangeFeed(pages())
+
+# Entidades com sincronização incremental (deltas + snapshots)
+DELTA_ENTITIES = ('tasks', 'projects')
+# A cada N deltas, o estado completo é reenviado como snapshot e os deltas antigos descartados
+COMPACT_EVERY = int(os.environ.get('CLOUD_SYNC_COMPACT_EVERY', '20'))
+# Margem para alterações gravadas por transações que terminaram depois do início da sincronização
+WATERMARK_OVERLAP = timedelta(seconds=5)
+SYNC_FORMAT_VERSION = '2.0'
+# Pasta dos arquivos do Lex Flow na raiz do provedor
+LEX_FLOW_FOLDER = 'Lex Flow'
+# Campos que mudam a cada exportação sem alterar o conteúdo e ficam fora do hash
+HASH_EXCLUDED_KEYS = ('exported_at', 'delta_seq')
+
+
+def artifact_hash(data: Dict[str, Any]) -> str:
+    """SHA-256 do JSON canônico (chaves ordenadas, sem espaços) sem os campos voláteis."""
+    body = {key: value for key, value in data.items() if key not in HASH_EXCLUDED_KEYS}
+    canonical = json.dumps(body, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _entity_query(entity: str, user_id: int):
+    from src.models.project import Project, Task
+    if entity == 'tasks':
+        return Task, Task.query.filter(Task.created_by == user_id)
+    return Project, Project.query.filter(Project.owner_id == user_id)
+
+
+def _entity_owner(obj: Any):
+    """(entidade, dono) de um registro sincronizado, ou None."""
+    from src.models.project import Project, Task
+    if isinstance(obj, Task):
+        return 'tasks', obj.created_by
+    if isinstance(obj, Project):
+        return 'projects', obj.owner_id
+    return None
+
+
+def _record_tombstones(session, flush_context, instances):
+    """Antes de cada flush, registra as tarefas/projetos removidos para o próximo delta."""
+    from src.models.cloud_sync import SyncTombstone
+    for obj in list(session.deleted):
+        owner = _entity_owner(obj)
+        if owner and obj.id is not None and owner[1] is not None:
+            session.add(SyncTombstone(user_id=owner[1], entity=owner[0], entity_id=obj.id))
+
+
+def init_app(app):
+    """Registra o gancho que anota exclusões para a sincronização incremental."""
+    from sqlalchemy import event
+    from src import db
+    if not event.contains(db.session, 'before_flush', _record_tombstones):
+        event.listen(db.session, 'before_flush', _record_tombstones)
+
 
 class CloudSyncManager:
     """Gerenciador de sincronização entre diferentes provedores de nuvem"""
@@ -387,98 +1194,456 @@ class CloudSyncManager:
         """Retorna instância do provedor especificado"""
         return self.providers.get(provider_name)
     
-    def sync_user_data(self, user_id: int, provider: str, access_token: str) -> Dict[str, Any]:
-        """Sincroniza dados do usuário com o provedor especificado"""
-        service = self.get_provider(provider)
-        if not service:
-            return {'error': 'Provider not supported'}
-        
+    def sync_user_data(self, cloud_sync, access_token: str, force_snapshot: bool = False,
+                       executor=None) -> Dict[str, Any]:
+        """
+        Sincroniza dados do usuário com o provedor da conexão `cloud_sync`.
+        Tarefas e projetos são enviados de forma incremental (ver `sync_connections` e `plan_entity`); o estado
+        da sincronização é atualizado em `cloud_sync.sync_watermarks` (o commit fica com quem chamou).
+        """
+        return self.sync_connections([(cloud_sync, access_token)], force_snapshot, executor)[cloud_sync.provider]
+
+    def sync_connections(self, connections: List[Tuple[Any, str]], force_snapshot: bool = False,
+                         executor=None) -> Dict[str, Dict[str, Any]]:
+        """
+        Sincroniza várias conexões (cloud_sync, access_token) de uma vez: os arquivos de todos
+        os provedores são enviados em paralelo pelo `SyncExecutor`. As consultas e a gravação
+        do estado acontecem nesta thread; um arquivo que falhou não avança o seu estado e é
+        reenviado na próxima sincronização. Retorna o resultado por provedor.
+        """
+        from src.services.sync_executor import ArtifactTask, Once, sync_executor
+        executor = executor or sync_executor
+
+        results, plans, tasks = {}, [], []
+        for cloud_sync, access_token in connections:
+            provider = cloud_sync.provider
+            service = self.get_provider(provider)
+            if not service:
+                results[provider] = {'error': 'Provider not supported'}
+                continue
+            try:
+                planned = self.plan_connection(cloud_sync, force_snapshot)
+            except Exception as e:
+                results[provider] = {'success': False, 'error': str(e), 'provider': provider}
+                continue
+            # Resolvidas na primeira thread que precisar; gravadas na conexão depois dos uploads
+            folder = Once(lambda service=service, access_token=access_token, cached=self.cached_folder(cloud_sync):
+                          service.resolve_folder(LEX_FLOW_FOLDER, access_token, cached))
+            remote = Once(lambda service=service, access_token=access_token, folder=folder,
+                          state=(cloud_sync.sync_watermarks or {}).get('remote'):
+                          self.scan_remote(service, access_token, folder.get(), state))
+            hashes = dict(cloud_sync.artifact_hashes or {})
+            for artifact, plan in planned.items():
+                if plan.get('file_name') is None:
+                    continue  # Nada a enviar (sem alterações ou não implementado)
+                upload = (lambda service=service, access_token=access_token, folder=folder, remote=remote, plan=plan,
+                          entry=hashes.get(plan['file_name']):
+                          self.upload_plan(service, access_token, folder.get()['ref'], plan, entry, remote))
+                tasks.append(ArtifactTask(provider=provider, artifact=artifact, run=upload))
+            plans.append((cloud_sync, planned, folder, remote))
+
         try:
-            # Criar estrutura de pastas do Lex Flow
-            lex_flow_folder = self.ensure_lex_flow_folder(service, access_token)
-            
-            # Sincronizar diferentes tipos de dados
-            sync_results = {
-                'tasks': self.sync_tasks(service, access_token, lex_flow_folder, user_id),
-                'projects': self.sync_projects(service, access_token, lex_flow_folder, user_id),
-                'notes': self.sync_notes(service, access_token, lex_flow_folder, user_id),
-                'settings': self.sync_settings(service, access_token, lex_flow_folder, user_id)
-            }
-            
-            return {
-                'success': True,
+            finished = {(task.provider, task.artifact): task for task in executor.run(tasks)}
+        finally:
+            for _, planned, _, _ in plans:
+                self.release_plans(planned)
+
+        for cloud_sync, planned, folder, remote in plans:
+            provider = cloud_sync.provider
+            if folder.done:
+                self.remember_folder(cloud_sync, folder.get())
+            sync_results, failed = {}, []
+            for artifact, plan in planned.items():
+                task = finished.get((provider, artifact))
+                if task is not None and not task.ok:
+                    failed.append(artifact)
+                    sync_results[artifact] = {'error': task.error, 'attempts': task.attempts}
+                    continue
+                outcome = task.result if task is not None else plan.get('outcome', {})
+                sync_results[artifact] = self.apply_plan(cloud_sync, artifact, plan, outcome)
+                if task is not None:
+                    sync_results[artifact].update(attempts=task.attempts, duration=round(task.duration, 3))
+
+            result = {
+                'success': not failed,
                 'provider': provider,
                 'sync_results': sync_results,
+                'upload_bytes': sum(item.get('upload_bytes', 0) for item in sync_results.values()),
                 'synced_at': datetime.utcnow().isoformat()
             }
-            
-        except Exception as e:
-            return {
-                'success': False,
-                'error': str(e),
-                'provider': provider
-            }
-    
-    def ensure_lex_flow_folder(self, service: CloudStorageService, access_token: str) -> str:
-        """Garante que a pasta Lex Flow existe no provedor"""
-        # Implementação específica para cada provedor
-        if isinstance(service, GoogleDriveService):
-            # Verificar se pasta já existe
-            files = service.list_files(access_token, query="name='Lex Flow' and mimeType='application/vnd.google-apps.folder'")
-            if files:
-                return files[0]['id']
-            else:
-                # Criar pasta
-                folder = service.create_folder('Lex Flow', access_token)
-                return folder['id']
-        
-        # Para outros provedores, implementar lógica similar
-        return "lex_flow"
-    
-    def sync_tasks(self, service: CloudStorageService, access_token: str, 
-                  folder_id: str, user_id: int) -> Dict[str, Any]:
-        """Sincroniza tarefas do usuário"""
-        # Buscar tarefas do banco de dados
-        from src.models.project import Task
-        tasks = Task.query.filter_by(created_by=user_id).all()
-        
-        # Converter para JSON
-        tasks_data = {
-            'tasks': [task.to_dict() for task in tasks],
-            'exported_at': datetime.utcnow().isoformat(),
-            'version': '1.0'
-        }
-        
-        # Upload para nuvem
-        content = json.dumps(tasks_data, indent=2).encode('utf-8')
-        result = service.upload_file('tasks.json', content, access_token, folder_id)
-        
+            if failed:
+                result.update(failed=failed, error=f"Falha ao enviar: {', '.join(failed)}")
+            elif remote.done and remote.get().get('cursor'):
+                # Com falhas o cursor não avança: as alterações remotas são conferidas de novo na próxima vez
+                watermarks = dict(cloud_sync.sync_watermarks or {})
+                watermarks['remote'] = {'folder': remote.get()['folder'], 'cursor': remote.get()['cursor']}
+                cloud_sync.sync_watermarks = watermarks
+            results[provider] = result
+        return results
+
+    def plan_connection(self, cloud_sync, force_snapshot: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Monta (a partir do banco) o que cada arquivo da conexão precisa enviar."""
+        plans = {entity: self.plan_entity(cloud_sync, entity, force_snapshot) for entity in DELTA_ENTITIES}
+        plans['notes'] = {'outcome': self.sync_notes(None, None, None, cloud_sync.user_id)}
+        plans['settings'] = self.plan_settings(cloud_sync)
+        return plans
+
+    def backup_user_data(self, cloud_sync, access_token: str, keep: int = None) -> Dict[str, Any]:
+        """
+        Envia um backup completo `.lexflow` (ver src/services/backup_archive.py) com nome
+        datado, sem sobrescrever os anteriores, e apaga do provedor os mais antigos que as
+        `keep` versões mais recentes. O histórico fica em `cloud_sync.sync_watermarks['backups']`.
+        """
+        from src.models.user import User
+        from src.services.backup_archive import BACKUP_KEEP, backup_file_name, build_archive
+
+        service = self.get_provider(cloud_sync.provider)
+        if not service:
+            return {'error': 'Provider not supported'}
+        user = User.query.get(cloud_sync.user_id)
+        if not user:
+            return {'error': 'User not found'}
+        keep = max(1, keep or BACKUP_KEEP)
+
+        archive = build_archive(user)
+        try:
+            folder = self.ensure_lex_flow_folder(service, access_token, cloud_sync)
+            file_name = backup_file_name()
+            result = self._upload_export(service, access_token, folder, file_name, archive)
+        finally:
+            archive.close()
+
+        watermarks = dict(cloud_sync.sync_watermarks or {})
+        backups = list(watermarks.get('backups') or []) + [{
+            'file_name': file_name, 'ref': result.get('id'), 'size': archive.size, 'records': archive.count,
+            'sha256': archive.sha256, 'created_at': archive.manifest['created_at']
+        }]
+        expired, backups = backups[:-keep], backups[-keep:]
+        self._discard_remote(service, access_token, [backup['ref'] for backup in expired if backup.get('ref')])
+        watermarks['backups'] = backups
+        cloud_sync.sync_watermarks = watermarks
         return {
-            'file_name': 'tasks.json',
-            'task_count': len(tasks),
-            'upload_result': result
-        }
-    
-    def sync_projects(self, service: CloudStorageService, access_token: str, 
-                     folder_id: str, user_id: int) -> Dict[str, Any]:
-        """Sincroniza projetos do usuário"""
-        from src.models.project import Project
-        projects = Project.query.filter_by(owner_id=user_id).all()
-        
-        projects_data = {
-            'projects': [project.to_dict() for project in projects],
-            'exported_at': datetime.utcnow().isoformat(),
-            'version': '1.0'
+            'success': True,
+            'provider': cloud_sync.provider,
+            'backup': backups[-1],
+            'rotated': [backup['file_name'] for backup in expired],
+            'versions': len(backups)
         }
-        
-        content = json.dumps(projects_data, indent=2).encode('utf-8')
-        result = service.upload_file('projects.json', content, access_token, folder_id)
-        
+
+    def find_backups(self, service: CloudStorageService, access_token: str, folder: str) -> List[Dict[str, Any]]:
+        """Backups .lexflow presentes na pasta Lex Flow do provedor, do mais antigo ao mais recente."""
+        from src.services.backup_archive import ARCHIVE_EXTENSION
+
+        if isinstance(service, GoogleDriveService):
+            entries = service.list_files(
+                access_token, query=f"'{folder}' in parents and name contains '{ARCHIVE_EXTENSION}' and trashed=false"
+            )
+        elif isinstance(service, DropboxService):
+            entries = service.list_files(access_token, folder)
+        else:
+            entries = service.list_files(access_token, folder_path=folder)
+        backups = [
+            {'file_name': entry['name'], 'ref': entry.get('id') or entry.get('path_lower')}
+            for entry in entries if entry.get('name', '').endswith(ARCHIVE_EXTENSION)
+        ]
+        # O nome leva a data (lexflow-backup-AAAAMMDDTHHMMSSZ), então a ordem alfabética é a cronológica
+        return sorted(backups, key=lambda backup: backup['file_name'])
+
+    def restore_user_data(self, cloud_sync, access_token: str, file_name: str = None,
+                          progress=None) -> Dict[str, Any]:
+        """
+        Baixa um backup .lexflow do provedor em streaming (para um arquivo temporário) e o
+        restaura com `restore_archive`. Sem `file_name`, usa o mais recente: primeiro pelo
+        histórico em `sync_watermarks['backups']`, depois listando a pasta Lex Flow.
+        """
+        from src.models.user import User
+        from src.services.backup_archive import restore_archive
+
+        service = self.get_provider(cloud_sync.provider)
+        if not service:
+            return {'error': 'Provider not supported'}
+        user = User.query.get(cloud_sync.user_id)
+        if not user:
+            return {'error': 'User not found'}
+
+        known = [backup for backup in (cloud_sync.sync_watermarks or {}).get('backups') or [] if backup.get('ref')]
+        candidates = [backup for backup in known if file_name in (None, backup['file_name'])]
+        if not candidates:
+            folder = self.ensure_lex_flow_folder(service, access_token, cloud_sync)
+            candidates = [backup for backup in self.find_backups(service, access_token, folder)
+                          if file_name in (None, backup['file_name'])]
+        if not candidates:
+            return {'error': 'Backup not found'}
+        backup = candidates[-1]
+
+        with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+            size = service.download_to(backup['ref'], access_token, spool)
+            spool.seek(0)
+            summary = restore_archive(user, spool, progress=progress)
+        logger.info("Backup %s (%d bytes) restaurado de %s para o usuário %s",
+                    backup['file_name'], size, cloud_sync.provider, user.id)
+        return {'success': True, 'provider': cloud_sync.provider, 'backup': backup['file_name'],
+                'size': size, 'restored': summary}
+
+    @staticmethod
+    def cached_folder(cloud_sync) -> Optional[Dict[str, str]]:
+        """Pasta Lex Flow resolvida em uma sincronização anterior (`sync_settings['folder']`)."""
+        return ((cloud_sync.sync_settings or {}) if cloud_sync is not None else {}).get('folder')
+
+    @staticmethod
+    def remember_folder(cloud_sync, folder: Dict[str, str]):
+        """Guarda a pasta resolvida em `sync_settings` (só grava se mudou)."""
+        settings = cloud_sync.sync_settings or {}
+        if settings.get('folder') != folder:
+            cloud_sync.sync_settings = dict(settings, folder=folder)
+
+    def ensure_lex_flow_folder(self, service: CloudStorageService, access_token: str, cloud_sync=None) -> str:
+        """
+        Garante que a pasta Lex Flow existe no provedor e retorna a referência usada nos
+        uploads (ID no Google Drive, caminho no Dropbox e no OneDrive). Com `cloud_sync`,
+        a pasta fica guardada na conexão e nas próximas vezes só é conferida pelo ID.
+        """
+        folder = service.resolve_folder(LEX_FLOW_FOLDER, access_token, self.cached_folder(cloud_sync))
+        if cloud_sync is not None:
+            self.remember_folder(cloud_sync, folder)
+        return folder['ref']
+
+    # --- Sincronização incremental ---
+
+    @staticmethod
+    def _upload_json(service: CloudStorageService, access_token: str, folder_id: str,
+                     file_name: str, data: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        content = json.dumps(data, separators=(',', ':'), default=str).encode('utf-8')
+        result = service.upload_file(file_name, content, access_token, folder_id)
+        if not isinstance(result, dict) or 'error' in result:
+            raise RuntimeError(f"Falha no upload de {file_name}: {result}")
+        return result, content
+
+    @staticmethod
+    def _upload_export(service: CloudStorageService, access_token: str, folder_id: str,
+                       file_name: str, export: ExportFile) -> Dict[str, Any]:
+        """Envia um arquivo gerado em streaming; acima do limite do upload simples, vai em partes direto do arquivo."""
+        if export.size <= SIMPLE_UPLOAD_LIMIT:
+            result = service.upload_file(file_name, export.read_all(), access_token, folder_id)
+        else:
+            result = service.upload_stream(file_name, export.rewind(), access_token, folder_id, size=export.size)
+        if not isinstance(result, dict) or 'error' in result:
+            raise RuntimeError(f"Falha no upload de {file_name}: {result}")
+        return result
+
+    def _upload_artifact(self, service: CloudStorageService, access_token: str, folder_id: str,
+                         entry: Optional[Dict[str, Any]], file_name: str, data: Dict[str, Any] = None,
+                         export: ExportFile = None, remote=None) -> Dict[str, Any]:
+        """
+        Envia um arquivo de estado completo (snapshot, configurações) só se o conteúdo mudou.
+        O conteúdo é `data` (serializado aqui) ou um `export` já gravado em streaming.
+        `entry` é o registro anterior de `cloud_sync.artifact_hashes` para o arquivo. Um arquivo
+        apagado ou alterado fora do app é reenviado: isso é conferido pelo feed de alterações da
+        pasta (`remote`) ou, sem ele, consultando o checksum do arquivo no provedor. Retorna {'skipped', 'upload_bytes', 'upload_result'}
+        e, se houve envio, o novo registro em 'hash_entry' (gravado por `_remember_hash`).
+        """
+        entry = entry or {}
+        digest = export.sha256 if export is not None else artifact_hash(data)
+
+        if entry.get('sha256') == digest:
+            remote_matches = True
+            changes = remote.get()['changes'] if remote is not None else None
+            if changes is not None and entry.get('ref'):
+                remote_matches = not self._changed_remotely(changes.get(entry['ref']) or changes.get(file_name), entry)
+            elif entry.get('checksum') and entry.get('ref'):
+                try:
+                    remote_matches = service.remote_checksum(entry['ref'], access_token) == entry['checksum']
+                except Exception as e:
+                    logger.warning("Não foi possível conferir o checksum remoto de %s: %s", file_name, e)
+            if remote_matches:
+                return {'skipped': True, 'upload_bytes': 0}
+
+        if export is not None:
+            result = self._upload_export(service, access_token, folder_id, file_name, export)
+            size, checksum = export.size, service.content_checksum(export.rewind())
+        else:
+            result, content = self._upload_json(service, access_token, folder_id, file_name, data)
+            size, checksum = len(content), service.content_checksum(content)
+        if entry.get('ref') and entry['ref'] != result.get('id'):
+            self._discard_remote(service, access_token, [entry['ref']])
         return {
-            'file_name': 'projects.json',
-            'project_count': len(projects),
-            'upload_result': result
+            'skipped': False, 'upload_bytes': size, 'upload_result': result,
+            'hash_entry': {'sha256': digest, 'ref': result.get('id'), 'checksum': checksum}
         }
+
+    @staticmethod
+    def _changed_remotely(change: Optional[Dict[str, Any]], entry: Dict[str, Any]) -> bool:
+        """
+        Se a alteração remota invalida o arquivo enviado: removido, ou com outro checksum.
+        Os próprios uploads do app também aparecem no feed, mas com o checksum registrado.
+        """
+        if change is None:
+            return False
+        if change.get('removed'):
+            return True
+        return bool(entry.get('checksum') and change.get('checksum') and change['checksum'] != entry['checksum'])
+
+    def scan_remote(self, service: CloudStorageService, access_token: str, folder: Dict[str, str],
+                    state: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Alterações na pasta do provedor desde a última sincronização, pelo cursor guardado em
+        `sync_watermarks['remote']` (uma consulta paginada, em vez de um checksum por arquivo).
+        Retorna {'folder', 'cursor', 'changes'}; `changes` (por ID e por nome do arquivo) é None
+        na primeira vez, com cursor expirado ou se o provedor falhar; aí cada arquivo é conferido
+        pelo checksum.
+        """
+        state = state if state and state.get('folder') == folder['id'] else {}
+        try:
+            if state.get('cursor'):
+                try:
+                    feed = service.changes(access_token, folder, state['cursor'])
+                    changes = {}
+                    for change in feed:
+                        for key in (change.get('id'), change.get('name')):
+                            if key:
+                                changes[key] = change
+                    return {'folder': folder['id'], 'cursor': feed.cursor, 'changes': changes}
+                except CursorExpired:
+                    logger.info("Cursor de alterações de %s expirou; conferindo arquivo por arquivo", folder['id'])
+            return {'folder': folder['id'], 'cursor': service.latest_cursor(access_token, folder), 'changes': None}
+        except NotImplementedError:
+            return {'folder': folder['id'], 'cursor': None, 'changes': None}
+        except Exception as e:
+            logger.warning("Não foi possível consultar as alterações remotas de %s: %s", folder['id'], e)
+            return {'folder': folder['id'], 'cursor': state.get('cursor'), 'changes': None}
+
+    @staticmethod
+    def _remember_hash(cloud_sync, file_name: str, outcome: Dict[str, Any]) -> Dict[str, Any]:
+        """Grava o hash do arquivo enviado em `cloud_sync.artifact_hashes` e o retira do resultado."""
+        outcome = dict(outcome)
+        entry = outcome.pop('hash_entry', None)
+        if entry:
+            hashes = dict(cloud_sync.artifact_hashes or {})
+            hashes[file_name] = entry
+            cloud_sync.artifact_hashes = hashes
+        return outcome
+
+    @staticmethod
+    def _discard_remote(service: CloudStorageService, access_token: str, refs: List[str]):
+        """Remove arquivos substituídos pela compactação, se o provedor suportar remoção."""
+        for ref in refs:
+            try:
+                service.delete_file(ref, access_token)
+            except NotImplementedError:
+                return
+            except Exception as e:
+                logger.warning("Não foi possível remover o arquivo antigo %s: %s", ref, e)
+
+    @staticmethod
+    def release_plans(plans: Dict[str, Dict[str, Any]]):
+        """Fecha os arquivos temporários das exportações planejadas."""
+        for plan in plans.values():
+            if plan.get('export') is not None:
+                plan['export'].close()
+
+    def plan_entity(self, cloud_sync, entity: str, force_snapshot: bool = False) -> Dict[str, Any]:
+        """
+        Consulta o banco e monta o arquivo da entidade: só o que mudou desde o último watermark
+        da conexão, como um delta append-only (`tasks.delta.000042.json`: registros alterados e
+        IDs removidos). Na primeira sincronização, a cada COMPACT_EVERY deltas ou com
+        `force_snapshot`, monta o estado completo (`tasks.json`), que substitui os deltas anteriores.
+        """
+        from src.models.cloud_sync import SyncTombstone
+
+        state = dict((cloud_sync.sync_watermarks or {}).get(entity) or {})
+        model, query = _entity_query(entity, cloud_sync.user_id)
+        cutoff = datetime.utcnow()
+        previous = datetime.fromisoformat(state['watermark']) if state.get('watermark') else None
+        delta_seq = state.get('delta_seq', 0)
+        plan = {'state': state, 'cutoff': cutoff}
+
+        compact = (force_snapshot or previous is None
+                   or delta_seq - state.get('snapshot_seq', 0) >= COMPACT_EVERY)
+        if compact:
+            # Registros lidos em lotes e gravados direto no arquivo temporário (sem lista em memória)
+            rows = query.order_by(model.id).yield_per(EXPORT_BATCH_SIZE)
+            export = ExportFile().write(entity, (row.to_dict() for row in rows), header={
+                'delta_seq': delta_seq, 'exported_at': cutoff.isoformat(), 'version': SYNC_FORMAT_VERSION
+            }, volatile=HASH_EXCLUDED_KEYS)
+            plan.update(mode='snapshot', file_name=export_file_name(entity), count=export.count, export=export)
+            return plan
+
+        since = previous - WATERMARK_OVERLAP
+        changed = query.filter(model.updated_at > since)
+        deleted = sorted({entity_id for (entity_id,) in SyncTombstone.query.with_entities(SyncTombstone.entity_id).filter(
+            SyncTombstone.user_id == cloud_sync.user_id, SyncTombstone.entity == entity,
+            SyncTombstone.deleted_at > since
+        )})
+        if not deleted and not changed.with_entities(model.id).limit(1).first():
+            plan.update(mode='unchanged', outcome={'mode': 'unchanged', 'count': 0})
+            return plan
+
+        delta_seq += 1
+        export = ExportFile().write('upserted', (row.to_dict() for row in changed.order_by(model.id).yield_per(EXPORT_BATCH_SIZE)), header={
+            'entity': entity, 'seq': delta_seq, 'since': previous.isoformat(), 'until': cutoff.isoformat(),
+            'deleted': deleted, 'version': SYNC_FORMAT_VERSION
+        })
+        plan.update(mode='delta', file_name=export_file_name(f"{entity}.delta.{delta_seq:06d}"), delta_seq=delta_seq,
+                    count=export.count, deleted=len(deleted), export=export)
+        return plan
+
+    def upload_plan(self, service: CloudStorageService, access_token: str, folder_id: str,
+                    plan: Dict[str, Any], entry: Optional[Dict[str, Any]] = None, remote=None) -> Dict[str, Any]:
+        """
+        Parte de rede: envia o arquivo planejado (sem acessar o banco, pode rodar em outra thread).
+        `remote` é o `Once` com as alterações remotas da pasta (ver `scan_remote`).
+        """
+        file_name = plan['file_name']
+        if plan['mode'] == 'delta':
+            result = self._upload_export(service, access_token, folder_id, file_name, plan['export'])
+            return {'mode': 'delta', 'file_name': file_name, 'count': plan['count'], 'deleted': plan['deleted'],
+                    'upload_bytes': plan['export'].size, 'upload_result': result}
+
+        upload = self._upload_artifact(service, access_token, folder_id, entry, file_name,
+                                       plan.get('data'), plan.get('export'), remote)
+        if plan['mode'] == 'snapshot':
+            self._discard_remote(service, access_token, plan['state'].get('delta_refs', []))
+            return dict(upload, mode='snapshot', file_name=file_name, count=plan['count'])
+        return dict(upload, file_name=file_name)
+
+    def apply_plan(self, cloud_sync, artifact: str, plan: Dict[str, Any], outcome: Dict[str, Any]) -> Dict[str, Any]:
+        """Grava na conexão o estado resultante de um envio bem-sucedido e retorna o resultado para a API."""
+        if plan.get('file_name'):
+            outcome = self._remember_hash(cloud_sync, plan['file_name'], outcome)
+        if artifact not in DELTA_ENTITIES:
+            return outcome
+
+        state = dict(plan['state'])
+        if plan['mode'] == 'snapshot':
+            state.update(snapshot_seq=state.get('delta_seq', 0), delta_refs=[])
+        elif plan['mode'] == 'delta':
+            state['delta_refs'] = state.get('delta_refs', []) + [outcome['upload_result'].get('id')]
+            state['delta_seq'] = plan['delta_seq']
+        state.update(watermark=plan['cutoff'].isoformat(), delta_seq=state.get('delta_seq', 0))
+        watermarks = dict(cloud_sync.sync_watermarks or {})
+        watermarks[artifact] = state
+        # Reatribui o dicionário para que o SQLAlchemy perceba a mudança na coluna JSON
+        cloud_sync.sync_watermarks = watermarks
+        if plan['mode'] == 'snapshot':
+            self._prune_tombstones(cloud_sync.user_id, artifact)
+        return outcome
+
+    @staticmethod
+    def _prune_tombstones(user_id: int, entity: str):
+        """Apaga exclusões já enviadas por todas as conexões do usuário."""
+        from src.models.cloud_sync import CloudSync, SyncTombstone
+
+        marks = []
+        for (watermarks,) in CloudSync.query.with_entities(CloudSync.sync_watermarks).filter_by(user_id=user_id):
+            mark = ((watermarks or {}).get(entity) or {}).get('watermark')
+            if not mark:
+                return  # Alguma conexão ainda não sincronizou essa entidade
+            marks.append(datetime.fromisoformat(mark))
+        if marks:
+            SyncTombstone.query.filter(
+                SyncTombstone.user_id == user_id, SyncTombstone.entity == entity,
+                SyncTombstone.deleted_at <= min(marks) - WATERMARK_OVERLAP
+            ).delete(synchronize_session=False)
     
     def sync_notes(self, service: CloudStorageService, access_token: str, 
                   folder_id: str, user_id: int) -> Dict[str, Any]:
@@ -490,26 +1655,16 @@ class CloudSyncManager:
             'status': 'not_implemented'
         }
     
-    def sync_settings(self, service: CloudStorageService, access_token: str, 
-                     folder_id: str, user_id: int) -> Dict[str, Any]:
-        """Sincroniza configurações do usuário"""
+    def plan_settings(self, cloud_sync) -> Dict[str, Any]:
         from src.models.user import User
-        user = User.query.get(user_id)
-        
+        user = User.query.get(cloud_sync.user_id)
+
         if user:
             settings_data = {
                 'user_preferences': {},  # Implementar quando tivermos preferências
                 'exported_at': datetime.utcnow().isoformat(),
                 'version': '1.0'
             }
-            
-            content = json.dumps(settings_data, indent=2).encode('utf-8')
-            result = service.upload_file('settings.json', content, access_token, folder_id)
-            
-            return {
-                'file_name': 'settings.json',
-                'upload_result': result
-            }
-        
-        return {'error': 'User not found'}
+            return {'mode': 'settings', 'file_name': 'settings.json', 'data': settings_data}
 
+        return {'outcome': {'error': 'User not found'}}
@@ -0,0 +1,129 @@
+# src/services/export_stream.py
+"""
+Serialização em streaming dos arquivos exportados para a nuvem.
+
+Os registros são gravados um a um, em JSON compacto (ou NDJSON com gzip), em um
+SpooledTemporaryFile: exportações pequenas ficam em memória, as grandes vão para o
+disco. Nenhuma lista com todos os registros é montada, então o pico de memória não
+cresce com o número de tarefas. Junto com o arquivo são calculados o tamanho e um hash
+do conteúdo canônico (registros com chaves ordenadas, sem os campos voláteis, como em
+`artifact_hash`), usado para pular o upload de arquivos que não mudaram.
+
+Formato (CLOUD_EXPORT_FORMAT):
+- 'json' (padrão): {"tasks":[...],"delta_seq":12,"version":"2.0",...}, idêntico ao que
+  `json.dumps` geraria com o dicionário inteiro;
+- 'ndjson.gz': uma linha com o cabeçalho ({"key":"tasks",...}) e uma linha por registro.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+EXPORT_FORMAT = os.environ.get('CLOUD_EXPORT_FORMAT', 'json')
+EXPORT_FORMATS = ('json', 'ndjson.gz')
+# Acima disso o arquivo temporário sai da memória e vai para o disco
+SPOOL_MAX_BYTES = int(os.environ.get('CLOUD_EXPORT_SPOOL_BYTES', str(8 * 1024 * 1024)))
+# Tamanho dos lotes lidos do banco (Query.yield_per)
+EXPORT_BATCH_SIZE = int(os.environ.get('CLOUD_EXPORT_BATCH_SIZE', '500'))
+
+_COMPACT = {'separators': (',', ':'), 'default': str}
+
+
+def _canonical(value: Any) -> bytes:
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8')
+
+
+def export_file_name(base: str, export_format: str = None) -> str:
+    """Nome do arquivo no provedor para o formato escolhido (ex: 'tasks' -> 'tasks.json')."""
+    return f"{base}.{export_format or EXPORT_FORMAT}"
+
+
+class SpooledArtifact:
+    """Conteúdo gerado em um SpooledTemporaryFile, com tamanho, hash e número de registros."""
+
+    def __init__(self):
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        self.size = 0
+        self.count = 0
+        self.sha256: Optional[str] = None
+
+    def rewind(self):
+        self.file.seek(0)
+        return self.file
+
+    def read_all(self) -> bytes:
+        """Conteúdo inteiro (só para arquivos pequenos, abaixo do limite de upload simples)."""
+        return self.rewind().read()
+
+    def iter_bytes(self, chunk_size: int = 64 * 1024):
+        """Lê o conteúdo em blocos (ex: resposta HTTP em streaming); fecha o arquivo ao terminar."""
+        try:
+            self.rewind()
+            while True:
+                chunk = self.file.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            self.close()
+
+    def close(self):
+        self.file.close()
+
+
+class ExportFile(SpooledArtifact):
+    """Arquivo exportado para a sincronização (ver `write`)."""
+
+    def __init__(self, export_format: str = None):
+        super().__init__()
+        self.export_format = export_format or EXPORT_FORMAT
+        if self.export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Formato de exportação inválido: {self.export_format}")
+
+    def write(self, key: str, rows: Iterable[Dict[str, Any]], header: Dict[str, Any],
+              volatile: Sequence[str] = ()) -> 'ExportFile':
+        """
+        Grava `rows` sob a chave `key`, seguidos (JSON) ou precedidos (NDJSON) pelos campos
+        de `header`. Os campos listados em `volatile` (ex: exported_at) ficam fora do hash.
+        """
+        digest = hashlib.sha256()
+        digest.update(_canonical({name: value for name, value in header.items() if name not in volatile}))
+        digest.update(key.encode('utf-8'))
+
+        if self.export_format == 'json':
+            out = self.file
+            out.write(b'{' + json.dumps(key).encode('utf-8') + b':[')
+            for row in rows:
+                out.write((b',' if self.count else b'') + json.dumps(row, **_COMPACT).encode('utf-8'))
+                digest.update(_canonical(row))
+                self.count += 1
+            out.write(b']')
+            for name, value in header.items():
+                out.write(b',' + json.dumps(name).encode('utf-8') + b':' + json.dumps(value, **_COMPACT).encode('utf-8'))
+            out.write(b'}')
+        else:
+            # mtime=0 deixa o gzip determinístico (o checksum do provedor não muda à toa)
+            with gzip.GzipFile(fileobj=self.file, mode='wb', mtime=0) as out:
+                out.write(json.dumps(dict(header, key=key), **_COMPACT).encode('utf-8') + b'\n')
+                for row in rows:
+                    out.write(json.dumps(row, **_COMPACT).encode('utf-8') + b'\n')
+                    digest.update(_canonical(row))
+                    self.count += 1
+
+        self.sha256 = digest.hexdigest()
+        self.size = self.file.tell()
+        self.file.seek(0)
+        return self
+
+
+def read_export(content: bytes) -> Dict[str, Any]:
+    """Lê de volta um arquivo exportado (JSON ou NDJSON com gzip) como dicionário."""
+    if content[:2] == b'\x1f\x8b':
+        lines = gzip.decompress(content).splitlines()
+        header = json.loads(lines[0])
+        key = header.pop('key')
+        return dict(header, **{key: [json.loads(line) for line in lines[1:] if line]})
+    return json.loads(content)
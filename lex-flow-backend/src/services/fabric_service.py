@@ -1,23 +1,22 @@
 ﻿# /opt/lex-flow-backend/src/services/fabric_service.py
 
 import os
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict
 import dotenv
-import google.generativeai as genai
+from src.services.ai_batch import estimate_tokens
+from src.services.ai_providers import DEFAULT_GEMINI_MODEL, providers
+from src.services import telemetry
+from src.services.prompt_context import DEFAULT_BUDGET, PROMPT_BUDGETS, fit_text
 
 dotenv.load_dotenv()
 
-# --- Configuração do Cliente Gemini ---
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-gemini_model = None
-if GEMINI_API_KEY:
-    try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        gemini_model = genai.GenerativeModel('gemini-1.5-flash')
-        print("✅ Serviço de IA configurado para usar Google Gemini.")
-    except Exception as e:
-        print(f"❌ Erro ao configurar o Google Gemini: {e}")
-else:
-    print("⚠️ Chave de API do Gemini (GEMINI_API_KEY) não encontrada no .env.")
+# O modelo Gemini é criado no primeiro uso pelo registro compartilhado (ver ai_providers)
+GEMINI_MODEL = DEFAULT_GEMINI_MODEL
 
 # --- Dicionário de Prompts (Nossos "Patterns" ou "Lentes") ---
 PROMPTS = {
@@ -38,23 +37,95 @@ PROMPTS = {
     """
 }
 
-def _run_gemini(prompt: str) -> str:
+class FabricError(Exception):
+    """Erro ao executar um pattern (pattern desconhecido, modelo indisponível ou falha na API)."""
+
+
+def _generate(prompt: str, operation: str = "fabric") -> str:
+    gemini_model = providers.gemini(GEMINI_MODEL)
     if not gemini_model:
-        return "Erro: O modelo Gemini não foi inicializado. Verifique sua chave de API."
+        raise FabricError("Erro: O modelo Gemini não foi inicializado. Verifique sua chave de API.")
     try:
         safety_settings=[{"category":"HARM_CATEGORY_HARASSMENT","threshold":"BLOCK_NONE"},{"category":"HARM_CATEGORY_HATE_SPEECH","threshold":"BLOCK_NONE"},{"category":"HARM_CATEGORY_SEXUALLY_EXPLICIT","threshold":"BLOCK_NONE"},{"category":"HARM_CATEGORY_DANGEROUS_CONTENT","threshold":"BLOCK_NONE"}]
-        response = gemini_model.generate_content(prompt, safety_settings=safety_settings)
+        with telemetry.track_llm_call('gemini', operation, prompt) as call:
+            response = gemini_model.generate_content(prompt, safety_settings=safety_settings)
+            call.record_response(response, response.text)
         return response.text
     except Exception as e:
-        return f"Erro na comunicação com a API do Gemini: {str(e)}"
+        raise FabricError(f"Erro na comunicação com a API do Gemini: {str(e)}")
 
-def run_pattern(pattern_name: str, framework_context: str, daily_context: str, question: str = "") -> str:
+def _run_gemini(prompt: str) -> str:
+    try:
+        return _generate(prompt)
+    except FabricError as e:
+        return str(e)
+
+def build_pattern_prompt(pattern_name: str, framework_context: str, daily_context: str, question: str = "") -> str:
     if pattern_name not in PROMPTS:
-        return "Erro: Pattern desconhecido."
+        raise FabricError("Erro: Pattern desconhecido.")
     base_prompt = PROMPTS[pattern_name]
+    # Limita o contexto ao orçamento do pattern: o framework mantém o início e as reflexões, as mais recentes (fim)
+    budget = PROMPT_BUDGETS.get(pattern_name, DEFAULT_BUDGET)
+    framework_context = fit_text(framework_context, budget // 3)
+    daily_context = fit_text(daily_context, budget - estimate_tokens(framework_context), keep='tail')
     full_prompt = (f"{base_prompt}\n\n"
                    f"--- CONSTITUIÇÃO PESSOAL (FRAMEWORK TELOS) ---\n{framework_context}\n\n"
                    f"--- REFLEXÕES DIÁRIAS ---\n{daily_context}\n\n")
     if pattern_name == 'chat':
         full_prompt += f"--- PERGUNTA DO USUÁRIO ---\n{question}"
-    return _run_gemini(full_prompt)
\ No newline at end of file
+    return full_prompt
+
+def run_pattern(pattern_name: str, framework_context: str, daily_context: str, question: str = "") -> str:
+    try:
+        return _generate(build_pattern_prompt(pattern_name, framework_context, daily_context, question),
+                         f"fabric:{pattern_name}")
+    except FabricError as e:
+        return str(e)
+
+# --- Execução assíncrona com memoização ---
+# Resultados ficam em memória por (usuário, pattern, versão dos dados, pergunta):
+# enquanto o framework e as reflexões não mudam, o modelo não é chamado de novo.
+PATTERN_TIMEOUT_SECONDS = float(os.getenv("FABRIC_PATTERN_TIMEOUT", "45"))
+PATTERN_CACHE_TTL = timedelta(hours=24)
+PATTERN_CACHE_MAX_ENTRIES = 1000
+_pattern_cache = OrderedDict()
+_pattern_cache_lock = threading.Lock()
+
+def _pattern_cache_get(key):
+    with _pattern_cache_lock:
+        entry = _pattern_cache.get(key)
+        if not entry:
+            return None
+        if datetime.utcnow() - entry['timestamp'] > PATTERN_CACHE_TTL:
+            del _pattern_cache[key]
+            return None
+        _pattern_cache.move_to_end(key)
+        return entry['result']
+
+def _pattern_cache_set(key, result):
+    with _pattern_cache_lock:
+        _pattern_cache[key] = {'result': result, 'timestamp': datetime.utcnow()}
+        _pattern_cache.move_to_end(key)
+        while len(_pattern_cache) > PATTERN_CACHE_MAX_ENTRIES:
+            _pattern_cache.popitem(last=False)
+
+async def run_pattern_cached(user_id: int, pattern_name: str, data_version: str,
+                             load_context: Callable[[], Dict[str, str]], question: str = "",
+                             timeout: float = PATTERN_TIMEOUT_SECONDS) -> Dict[str, Any]:
+    """
+    Executa um pattern com cache por (usuário, pattern, versão dos dados, pergunta).
+    `load_context` só é chamado quando não há resultado em cache e deve retornar
+    {'framework_context', 'daily_context'}. Lança FabricError ou asyncio.TimeoutError.
+    """
+    question_hash = hashlib.sha1(question.encode('utf-8')).hexdigest() if question else ''
+    cache_key = (user_id, pattern_name, data_version, question_hash)
+    cached = _pattern_cache_get(cache_key)
+    telemetry.record_cache('fabric_patterns', cached is not None)
+    if cached is not None:
+        return {'result': cached, 'cached': True}
+
+    context = load_context()
+    prompt = build_pattern_prompt(pattern_name, context['framework_context'], context['daily_context'], question)
+    result = await asyncio.wait_for(asyncio.to_thread(_generate, prompt, f"fabric:{pattern_name}"), timeout=timeout)
+    _pattern_cache_set(cache_key, result)
+    return {'result': result, 'cached': False}
@@ -0,0 +1,189 @@
+# src/services/http_transport.py
+"""
+Camada HTTP compartilhada pelos provedores de nuvem.
+
+- Um `requests.Session` por provedor, com pool de conexões (reaproveita TCP+TLS entre chamadas).
+- Timeouts de conexão e de leitura sempre definidos: um provedor travado não prende o worker.
+- Retentativas com backoff exponencial e jitter em 429/5xx e falhas de conexão, respeitando
+  o cabeçalho Retry-After. Timeouts de leitura, conexões interrompidas depois do envio e
+  respostas 5xx só são refeitos em chamadas idempotentes, para não duplicar uploads que o
+  provedor pode ter recebido; falhas antes do envio (conexão recusada, DNS, timeout de
+  conexão), 429 e 503 com Retry-After (a chamada foi recusada, não processada) são refeitos
+  em qualquer método.
+- Latência, status e retentativas de cada chamada vão para /metrics (ver telemetry.py).
+
+Configuração por ambiente: CLOUD_HTTP_CONNECT_TIMEOUT, CLOUD_HTTP_READ_TIMEOUT,
+CLOUD_HTTP_MAX_RETRIES, CLOUD_HTTP_POOL_SIZE, CLOUD_HTTP_BACKOFF_BASE, CLOUD_HTTP_BACKOFF_MAX.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from src.services import telemetry
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.environ.get(name, default))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Segundos de espera indicados pelo Retry-After (número de segundos ou data HTTP)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+
+def failed_before_sending(error: requests.RequestException) -> bool:
+    """A falha aconteceu antes de a requisição sair (timeout de conexão, conexão recusada, DNS)."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if isinstance(error, requests.Timeout):
+        return False
+    reason = error.args[0] if error.args else None
+    reason = getattr(reason, 'reason', reason)  # MaxRetryError embrulha a causa
+    return isinstance(reason, NewConnectionError)
+
+
+class HTTPTransport:
+    """Sessão com pool, timeouts e retentativas de um provedor."""
+
+    def __init__(self, provider: str, connect_timeout: float = None, read_timeout: float = None,
+                 max_retries: int = None, pool_size: int = None, backoff_base: float = None,
+                 backoff_max: float = None, sleep: Callable[[float], None] = time.sleep):
+        self.provider = provider
+        self.connect_timeout = connect_timeout if connect_timeout is not None else _env_float('CLOUD_HTTP_CONNECT_TIMEOUT', 5)
+        self.read_timeout = read_timeout if read_timeout is not None else _env_float('CLOUD_HTTP_READ_TIMEOUT', 60)
+        self.max_retries = max_retries if max_retries is not None else int(os.environ.get('CLOUD_HTTP_MAX_RETRIES', '4'))
+        self.pool_size = pool_size or int(os.environ.get('CLOUD_HTTP_POOL_SIZE', '10'))
+        self.backoff_base = backoff_base if backoff_base is not None else _env_float('CLOUD_HTTP_BACKOFF_BASE', 0.5)
+        self.backoff_max = backoff_max if backoff_max is not None else _env_float('CLOUD_HTTP_BACKOFF_MAX', 30)
+        self.sleep = sleep
+        self._session: Optional[requests.Session] = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    # Retentativas ficam a cargo de `request`, que conhece o Retry-After e registra métricas
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=0)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Espera antes da próxima tentativa: jitter completo sobre o backoff exponencial, nunca abaixo do Retry-After."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def request(self, method: str, url: str, operation: str = 'request', idempotent: Optional[bool] = None,
+                **kwargs) -> requests.Response:
+        """
+        Executa a chamada com timeout e retentativas. Retorna a última resposta (mesmo de erro,
+        para o chamador tratar como antes); relança a exceção se todas as tentativas falharem na rede.
+        """
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        kwargs.setdefault('timeout', (self.connect_timeout, self.read_timeout))
+        labels = dict(telemetry.context_labels(), provider=self.provider, operation=operation)
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            retry_after = None
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                telemetry.http_request_duration.observe(time.perf_counter() - started, **labels)
+                reason = 'read_timeout' if isinstance(e, requests.ReadTimeout) else 'connection'
+                telemetry.http_requests.inc(status=reason, **labels)
+                # Um timeout de leitura ou uma conexão interrompida depois do envio podem significar
+                # que o servidor já processou a chamada
+                retryable = idempotent or failed_before_sending(e)
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                logger.warning("%s %s falhou (%s), tentativa %d: %s", self.provider, operation, reason, attempt + 1, e)
+            else:
+                telemetry.http_request_duration.observe(time.perf_counter() - started, **labels)
+                telemetry.http_requests.inc(status=str(response.status_code), **labels)
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                refused = response.status_code == 429 or (response.status_code == 503 and retry_after is not None)
+                if not (idempotent or refused):
+                    # Um 5xx em um POST é tão ambíguo quanto um timeout de leitura: a chamada pode ter sido feita
+                    return response
+                if retry_after is not None and retry_after > self.backoff_max:
+                    # O provedor pediu uma pausa maior do que vale esperar dentro da requisição
+                    return response
+                reason = str(response.status_code)
+                response.close()
+
+            delay = self.backoff(attempt, retry_after)
+            telemetry.http_retries.inc(reason=reason, **labels)
+            self.sleep(delay)
+            attempt += 1
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request('DELETE', url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+_transports: Dict[str, HTTPTransport] = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(provider: str) -> HTTPTransport:
+    """Transporte compartilhado (uma sessão por provedor, por processo)."""
+    transport = _transports.get(provider)
+    if transport is None:
+        with _transports_lock:
+            transport = _transports.get(provider)
+            if transport is None:
+                transport = _transports[provider] = HTTPTransport(provider)
+    return transport
@@ -5,19 +5,26 @@ Suporte para Obsidian, Trello, Notion, GitHub e Capacities
 
 import os
 import json
+import logging
 import requests
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import base64
 from urllib.parse import urlencode
 
+from src.services.http_transport import get_transport
+
+logger = logging.getLogger(__name__)
+
 class IntegrationsService:
-    def __init__(self):
-        self.github_token = os.getenv('GITHUB_TOKEN')
-        self.trello_key = os.getenv('TRELLO_API_KEY')
-        self.trello_token = os.getenv('TRELLO_TOKEN')
-        self.notion_token = os.getenv('NOTION_TOKEN')
-        self.capacities_token = os.getenv('CAPACITIES_TOKEN')
+    def __init__(self, credentials: Dict[str, str] = None):
+        # Credenciais salvas pelo usuário (Integration.configs['credentials']); sem elas, as do ambiente
+        credentials = credentials or {}
+        self.github_token = credentials.get('github_token') or os.getenv('GITHUB_TOKEN')
+        self.trello_key = credentials.get('trello_key') or os.getenv('TRELLO_API_KEY')
+        self.trello_token = credentials.get('trello_token') or os.getenv('TRELLO_TOKEN')
+        self.notion_token = credentials.get('notion_token') or os.getenv('NOTION_TOKEN')
+        self.capacities_token = credentials.get('capacities_token') or os.getenv('CAPACITIES_TOKEN')
         
         # URLs base das APIs
         self.github_api = "https://api.github.com"
@@ -130,7 +137,7 @@ class IntegrationsService:
         
         try:
             url = f"{self.github_api}/repos/{repo_full_name}/issues"
-            response = requests.post(url, headers=headers, json=data)
+            response = get_transport('github').post(url, operation='create_issue', headers=headers, json=data)
             response.raise_for_status()
             
             issue = response.json()
@@ -146,6 +153,47 @@ class IntegrationsService:
             print(f"Erro ao criar issue GitHub: {e}")
             return {}
     
+    def github_update_issue(self, repo_full_name: str, number: int, title: str, body: str = "",
+                            labels: List[str] = None, state: str = None) -> Dict:
+        """Atualiza uma issue do GitHub"""
+        if not self.github_token:
+            return {}
+            
+        headers = {
+            'Authorization': f'token {self.github_token}',
+            'Accept': 'application/vnd.github.v3+json',
+            'Content-Type': 'application/json'
+        }
+        
+        data = {
+            'title': title,
+            'body': body
+        }
+        
+        if labels is not None:
+            data['labels'] = labels
+        if state:
+            data['state'] = state
+        
+        try:
+            url = f"{self.github_api}/repos/{repo_full_name}/issues/{number}"
+            response = get_transport('github').request('PATCH', url, operation='update_issue', idempotent=True,
+                                                       headers=headers, json=data)
+            response.raise_for_status()
+            
+            issue = response.json()
+            return {
+                'id': issue['id'],
+                'number': issue['number'],
+                'title': issue['title'],
+                'url': issue['html_url'],
+                'updated_at': issue['updated_at']
+            }
+            
+        except Exception as e:
+            logger.warning("Erro ao atualizar issue GitHub: %s", e)
+            return {}
+    
     # ==================== TRELLO INTEGRATION ====================
     
     def trello_get_user_boards(self) -> List[Dict]:
@@ -228,7 +276,7 @@ class IntegrationsService:
             if due_date:
                 data['due'] = due_date
             
-            response = requests.post(url, data=data)
+            response = get_transport('trello').post(url, operation='create_card', data=data)
             response.raise_for_status()
             
             card = response.json()
@@ -243,6 +291,40 @@ class IntegrationsService:
             print(f"Erro ao criar card Trello: {e}")
             return {}
     
+    def trello_update_card(self, card_id: str, name: str, desc: str = "", due_date: str = None,
+                           due_complete: bool = None) -> Dict:
+        """Atualiza um card do Trello"""
+        if not (self.trello_key and self.trello_token):
+            return {}
+            
+        try:
+            url = f"{self.trello_api}/cards/{card_id}"
+            data = {
+                'key': self.trello_key,
+                'token': self.trello_token,
+                'name': name,
+                'desc': desc,
+                'due': due_date or ''
+            }
+            
+            if due_complete is not None:
+                data['dueComplete'] = 'true' if due_complete else 'false'
+            
+            response = get_transport('trello').put(url, operation='update_card', data=data)
+            response.raise_for_status()
+            
+            card = response.json()
+            return {
+                'id': card['id'],
+                'name': card['name'],
+                'url': card['url'],
+                'updated_at': datetime.now().isoformat()
+            }
+            
+        except Exception as e:
+            logger.warning("Erro ao atualizar card Trello: %s", e)
+            return {}
+    
     # ==================== NOTION INTEGRATION ====================
     
     def notion_get_databases(self) -> List[Dict]:
@@ -333,7 +415,7 @@ class IntegrationsService:
                 'properties': properties
             }
             
-            response = requests.post(url, headers=headers, json=data)
+            response = get_transport('notion').post(url, operation='create_page', headers=headers, json=data)
             response.raise_for_status()
             
             page = response.json()
@@ -347,6 +429,34 @@ class IntegrationsService:
             print(f"Erro ao criar página Notion: {e}")
             return {}
     
+    def notion_update_page(self, page_id: str, properties: Dict) -> Dict:
+        """Atualiza as propriedades de uma página do Notion"""
+        if not self.notion_token:
+            return {}
+            
+        headers = {
+            'Authorization': f'Bearer {self.notion_token}',
+            'Notion-Version': '2022-06-28',
+            'Content-Type': 'application/json'
+        }
+        
+        try:
+            url = f"{self.notion_api}/pages/{page_id}"
+            response = get_transport('notion').request('PATCH', url, operation='update_page', idempotent=True,
+                                                       headers=headers, json={'properties': properties})
+            response.raise_for_status()
+            
+            page = response.json()
+            return {
+                'id': page['id'],
+                'url': page['url'],
+                'last_edited_time': page['last_edited_time']
+            }
+            
+        except Exception as e:
+            logger.warning("Erro ao atualizar página Notion: %s", e)
+            return {}
+    
     def _extract_notion_properties(self, properties: Dict) -> Dict:
         """Extrai propriedades de uma página Notion"""
         extracted = {}
@@ -526,8 +636,8 @@ class IntegrationsService:
     
     # ==================== SYNC METHODS ====================
     
-    def sync_task_to_github_issue(self, task: Dict, repo_full_name: str) -> Dict:
-        """Sincroniza uma tarefa como issue do GitHub"""
+    def sync_task_to_github_issue(self, task: Dict, repo_full_name: str, issue_number: int = None) -> Dict:
+        """Sincroniza uma tarefa como issue do GitHub (atualiza a issue `issue_number`, se informada)"""
         title = task.get('title', 'Nova tarefa')
         body = f"**Descrição:** {task.get('description', '')}\n\n"
         body += f"**Prioridade:** {task.get('priority', 'Média')}\n"
@@ -541,10 +651,13 @@ class IntegrationsService:
         if task.get('category'):
             labels.append(task['category'].lower())
         
+        if issue_number:
+            state = 'closed' if task.get('completed') else 'open'
+            return self.github_update_issue(repo_full_name, issue_number, title, body, labels, state)
         return self.github_create_issue(repo_full_name, title, body, labels)
     
-    def sync_task_to_trello_card(self, task: Dict, list_id: str) -> Dict:
-        """Sincroniza uma tarefa como card do Trello"""
+    def sync_task_to_trello_card(self, task: Dict, list_id: str, card_id: str = None) -> Dict:
+        """Sincroniza uma tarefa como card do Trello (atualiza o card `card_id`, se informado)"""
         name = task.get('title', 'Nova tarefa')
         desc = f"**Descrição:** {task.get('description', '')}\n\n"
         desc += f"**Prioridade:** {task.get('priority', 'Média')}\n"
@@ -554,10 +667,12 @@ class IntegrationsService:
         
         due_date = task.get('due_date')
         
+        if card_id:
+            return self.trello_update_card(card_id, name, desc, due_date, bool(task.get('completed')))
         return self.trello_create_card(list_id, name, desc, due_date)
     
-    def sync_task_to_notion_page(self, task: Dict, database_id: str) -> Dict:
-        """Sincroniza uma tarefa como página do Notion"""
+    def sync_task_to_notion_page(self, task: Dict, database_id: str, page_id: str = None) -> Dict:
+        """Sincroniza uma tarefa como página do Notion (atualiza a página `page_id`, se informada)"""
         properties = {
             'Name': {
                 'title': [
@@ -596,6 +711,8 @@ class IntegrationsService:
                 }
             }
         
+        if page_id:
+            return self.notion_update_page(page_id, properties)
         return self.notion_create_page(database_id, properties)
     
     def get_integration_stats(self) -> Dict:
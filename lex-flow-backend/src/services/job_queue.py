@@ -0,0 +1,237 @@
+# src/services/job_queue.py
+"""
+Fila de trabalhos em segundo plano apoiada no próprio banco de dados.
+
+Trabalhos demorados (insights de IA, sincronizações com a nuvem) são gravados na
+tabela `background_jobs` e executados por um worker, liberando a requisição HTTP
+logo após o enfileiramento. Não há broker externo:
+
+- um job é reivindicado com um UPDATE condicional (status='queued' -> 'running'),
+  então vários workers (threads ou processos) podem disputar a mesma fila;
+- cada usuário tem um limite de jobs simultâneos (JOB_MAX_RUNNING_PER_USER);
+- falhas são refeitas com backoff exponencial até `max_attempts`;
+- jobs presos em 'running' (worker que morreu) voltam para a fila após JOB_STALE_SECONDS;
+- ao terminar, o usuário é avisado pelo Socket.IO na sala `user_<id>`.
+
+Os handlers são registrados com o decorador `job_handler('tipo')` nos módulos que os definem.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import func
+
+from src import db
+from src.models.background_job import BackgroundJob
+from src.services import telemetry
+
+logger = logging.getLogger(__name__)
+
+MAX_RUNNING_PER_USER = int(os.environ.get('JOB_MAX_RUNNING_PER_USER', '2'))
+BACKOFF_BASE_SECONDS = float(os.environ.get('JOB_BACKOFF_BASE_SECONDS', '10'))
+BACKOFF_MAX_SECONDS = 15 * 60
+STALE_AFTER_SECONDS = int(os.environ.get('JOB_STALE_SECONDS', '900'))
+POLL_INTERVAL_SECONDS = float(os.environ.get('JOB_POLL_INTERVAL', '1.0'))
+
+# Quantos jobs elegíveis são avaliados por tentativa de reivindicação
+_CLAIM_WINDOW = 20
+
+# tipo do job -> função(user_id, payload) que retorna um resultado serializável em JSON
+JOB_HANDLERS: Dict[str, Callable[[int, Dict[str, Any]], Any]] = {}
+
+
+def job_handler(kind: str):
+    """Registra a função como handler dos jobs do tipo `kind`."""
+    def decorator(func_: Callable[[int, Dict[str, Any]], Any]):
+        JOB_HANDLERS[kind] = func_
+        return func_
+    return decorator
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Espera antes da próxima tentativa: base * 2^(tentativas-1), com jitter de até 20%."""
+    delay = min(BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)), BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(1.0, 1.2)
+
+
+class JobQueue:
+    """Enfileira, reivindica e executa jobs da tabela `background_jobs`."""
+
+    def __init__(self, app=None, socketio=None):
+        self.app = None
+        self.socketio = None
+        self._threads = []
+        self._stop_event = threading.Event()
+        if app is not None:
+            self.init_app(app, socketio)
+
+    def init_app(self, app, socketio=None):
+        self.app = app
+        self.socketio = socketio
+        app.job_queue = self
+        if socketio is not None:
+            self._register_socket_events(socketio)
+
+    def _register_socket_events(self, socketio):
+        from flask_socketio import emit, join_room
+        from src.models.user import User
+
+        @socketio.on('subscribe_jobs')
+        def handle_subscribe_jobs(data):
+            """Cliente entra na sala do usuário para receber o fim dos seus jobs."""
+            user = User.verify_token((data or {}).get('token', ''))
+            if not user:
+                emit('error', {'message': 'Token inválido'})
+                return
+            join_room(f"user_{user.id}")
+            emit('jobs_subscribed', {'user_id': user.id})
+
+    # --- Produção ---
+
+    def enqueue(self, user_id: int, kind: str, payload: Optional[Dict[str, Any]] = None,
+                max_attempts: int = 3) -> BackgroundJob:
+        """Grava um novo job na fila e retorna o registro (já commitado)."""
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Tipo de job desconhecido: {kind}")
+        job = BackgroundJob(user_id=user_id, kind=kind, payload=payload or {}, max_attempts=max_attempts)
+        db.session.add(job)
+        db.session.commit()
+        return job
+
+    # --- Consumo ---
+
+    def requeue_stale(self) -> int:
+        """Devolve para a fila jobs que ficaram em 'running' além do limite (worker interrompido)."""
+        cutoff = datetime.utcnow() - timedelta(seconds=STALE_AFTER_SECONDS)
+        count = BackgroundJob.query.filter(
+            BackgroundJob.status == 'running', BackgroundJob.started_at < cutoff
+        ).update({'status': 'queued', 'run_after': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        if count:
+            logger.warning("%d job(s) presos em execução voltaram para a fila", count)
+        return count
+
+    def claim_next(self) -> Optional[BackgroundJob]:
+        """
+        Reivindica o próximo job elegível respeitando o limite por usuário.
+        O UPDATE condicional garante que só um worker fique com cada job.
+        """
+        now = datetime.utcnow()
+        candidates = db.session.query(BackgroundJob.id, BackgroundJob.user_id).filter(
+            BackgroundJob.status == 'queued', BackgroundJob.run_after <= now
+        ).order_by(BackgroundJob.run_after, BackgroundJob.created_at).limit(_CLAIM_WINDOW).all()
+        if not candidates:
+            return None
+
+        user_ids = {candidate.user_id for candidate in candidates}
+        running = dict(db.session.query(BackgroundJob.user_id, func.count(BackgroundJob.id)).filter(
+            BackgroundJob.status == 'running', BackgroundJob.user_id.in_(user_ids)
+        ).group_by(BackgroundJob.user_id).all())
+
+        for candidate in candidates:
+            if running.get(candidate.user_id, 0) >= MAX_RUNNING_PER_USER:
+                continue
+            claimed = BackgroundJob.query.filter_by(id=candidate.id, status='queued').update({
+                'status': 'running',
+                'started_at': now,
+                'attempts': BackgroundJob.attempts + 1
+            }, synchronize_session=False)
+            db.session.commit()
+            if claimed:
+                return db.session.get(BackgroundJob, candidate.id)
+        return None
+
+    def run_job(self, job: BackgroundJob) -> BackgroundJob:
+        """Executa o handler do job e grava o resultado ou agenda uma nova tentativa."""
+        handler = JOB_HANDLERS.get(job.kind)
+        telemetry.set_endpoint(f"job:{job.kind}")
+        try:
+            if handler is None:
+                raise LookupError(f"Nenhum handler registrado para '{job.kind}'")
+            result = handler(job.user_id, job.payload or {})
+            job.status = 'completed'
+            job.result = result
+            job.error = None
+            job.finished_at = datetime.utcnow()
+            # O commit fica no try: se o resultado não puder ser gravado, o job não fica preso em 'running'
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(BackgroundJob, job.id)
+            job.error = str(e)
+            if handler is not None and job.attempts < job.max_attempts:
+                job.status = 'queued'
+                job.run_after = datetime.utcnow() + timedelta(seconds=backoff_seconds(job.attempts))
+                logger.warning("Job %s (%s) falhou na tentativa %d: %s", job.id, job.kind, job.attempts, e)
+            else:
+                job.status = 'failed'
+                job.finished_at = datetime.utcnow()
+                logger.error("Job %s (%s) falhou definitivamente: %s", job.id, job.kind, e)
+            db.session.commit()
+
+        if job.status in ('completed', 'failed'):
+            self.notify(job)
+        return job
+
+    def notify(self, job: BackgroundJob):
+        """Avisa o usuário (sala `user_<id>`) que o job terminou."""
+        if self.socketio is None:
+            return
+        try:
+            self.socketio.emit('job_completed', job.to_dict(include_result=False), room=f"user_{job.user_id}")
+        except Exception as e:
+            logger.warning("Falha ao notificar o fim do job %s: %s", job.id, e)
+
+    def emit_to_user(self, user_id: int, event: str, data: Dict[str, Any]):
+        """Envia um evento (ex: progresso de uma operação longa) à sala `user_<id>`."""
+        if self.socketio is None:
+            return
+        try:
+            self.socketio.emit(event, data, room=f"user_{user_id}")
+        except Exception as e:
+            logger.warning("Falha ao emitir '%s' para o usuário %s: %s", event, user_id, e)
+
+    def work_once(self) -> bool:
+        """Processa um job, se houver. Retorna True se algum job foi executado."""
+        job = self.claim_next()
+        if job is None:
+            return False
+        self.run_job(job)
+        return True
+
+    def work(self, poll_interval: float = POLL_INTERVAL_SECONDS, stop_event: Optional[threading.Event] = None):
+        """Laço do worker: processa jobs enquanto houver e dorme quando a fila está vazia."""
+        stop_event = stop_event or self._stop_event
+        last_stale_check = 0.0
+        while not stop_event.is_set():
+            with self.app.app_context():
+                try:
+                    if time.monotonic() - last_stale_check > 60:
+                        self.requeue_stale()
+                        last_stale_check = time.monotonic()
+                    if self.work_once():
+                        continue
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error("Erro no worker de jobs: %s", e)
+                finally:
+                    db.session.remove()
+            stop_event.wait(poll_interval)
+
+    def start_background_workers(self, threads: int = 1):
+        """Inicia workers em threads daemon dentro do próprio processo web (modo local)."""
+        for index in range(threads):
+            thread = threading.Thread(target=self.work, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+job_queue = JobQueue()
@@ -0,0 +1,323 @@
+# src/services/json_extract.py
+"""
+Extração tolerante de JSON em respostas de modelos de IA.
+
+Os modelos costumam cercar o JSON com texto ("Claro! Aqui está: ```json ...```"),
+usar aspas tipográficas ou deixar vírgulas sobrando. Em vez de cortar a resposta
+por posição e torcer para o `json.loads` funcionar, o extrator:
+
+1. percorre o texto (inteiro ou em pedaços, conforme chega do stream) e localiza
+   o primeiro objeto/array JSON balanceado, ignorando o que vem antes e depois;
+2. se o trecho não for JSON válido, corrige vírgulas finais, aspas tipográficas,
+   quebras de linha dentro de strings e literais do Python (True/False/None);
+3. se o stream terminar no meio do JSON, fecha o documento no último elemento completo;
+4. valida o resultado contra o esquema do endpoint, descartando itens de listas
+   que não se encaixam em vez de perder a resposta inteira.
+"""
+
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+OPENING = {'{': '}', '[': ']'}
+CLOSING = {'}', ']'}
+# Aspas tipográficas aceitas como delimitadores de string
+SMART_QUOTES = {'“', '”', '„', '‟', '″'}
+PYTHON_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+
+
+class JSONExtractionError(ValueError):
+    """Nenhum JSON válido (ou compatível com o esquema) foi encontrado na resposta."""
+
+
+def repair_json(text: str) -> str:
+    """Corrige problemas comuns: vírgulas finais, aspas tipográficas, quebras de linha em strings e True/False/None."""
+    output: List[str] = []
+    in_string = False
+    string_quote = ''
+    escaped = False
+    index, length = 0, len(text)
+    while index < length:
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+                output.append(char)
+            elif char == '\\':
+                escaped = True
+                output.append(char)
+            elif char == '"' or (char in SMART_QUOTES and string_quote != '"'):
+                in_string = False
+                output.append('"')
+            elif char == '\n':
+                output.append('\\n')
+            elif char in '\r\t':
+                output.append('\\r' if char == '\r' else '\\t')
+            else:
+                output.append(char)
+            index += 1
+            continue
+
+        if char == '"' or char in SMART_QUOTES:
+            in_string = True
+            string_quote = char
+            output.append('"')
+        elif char == ',':
+            # Vírgula seguida (após espaços) de '}' ou ']' é descartada
+            lookahead = index + 1
+            while lookahead < length and text[lookahead].isspace():
+                lookahead += 1
+            if lookahead >= length or text[lookahead] not in CLOSING:
+                output.append(char)
+        elif char.isalpha():
+            end = index
+            while end < length and (text[end].isalnum() or text[end] == '_'):
+                end += 1
+            word = text[index:end]
+            output.append(PYTHON_LITERALS.get(word, word))
+            index = end
+            continue
+        else:
+            output.append(char)
+        index += 1
+    return ''.join(output)
+
+
+def _loads(candidate: str) -> Tuple[bool, Any]:
+    try:
+        return True, json.loads(candidate)
+    except ValueError:
+        pass
+    try:
+        return True, json.loads(repair_json(candidate))
+    except ValueError:
+        return False, None
+
+
+class StreamingJSONExtractor:
+    """
+    Localiza valores JSON balanceados em um texto recebido em pedaços.
+
+    `feed(chunk)` retorna os eventos concluídos naquele pedaço:
+    - ('item', valor): um elemento de um array dentro do documento (permite renderizar cedo);
+    - ('document', valor): um objeto/array de nível superior completo.
+    `finish()` tenta recuperar um documento truncado ao fim do stream.
+    """
+
+    def __init__(self, emit_items: bool = True):
+        self.emit_items = emit_items
+        self.buffer = ''
+        self.documents: List[Any] = []
+        self.truncated = False
+        self._position = 0
+        self._reset()
+
+    def _reset(self):
+        self._stack: List[Tuple[str, int]] = []   # (caractere de abertura, posição no buffer)
+        self._in_string = False
+        self._string_quote = ''
+        self._escaped = False
+        self._start = -1
+        # Último ponto em que o documento pode ser fechado: (posição, pilha naquele ponto)
+        self._last_safe: Optional[Tuple[int, List[str]]] = None
+
+    @property
+    def in_document(self) -> bool:
+        return bool(self._stack)
+
+    def _mark_safe(self, position: int):
+        # Só fronteiras entre elementos de arrays (ou do nível superior) evitam objetos pela metade
+        if len(self._stack) == 1 or self._stack[-1][0] == '[':
+            self._last_safe = (position, [opener for opener, _ in self._stack])
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        events: List[Tuple[str, Any]] = []
+        self.buffer += chunk or ''
+        buffer = self.buffer
+        while self._position < len(buffer):
+            char = buffer[self._position]
+            position = self._position
+            self._position += 1
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"' or (char in SMART_QUOTES and self._string_quote != '"'):
+                    self._in_string = False
+                continue
+
+            if not self._stack:
+                if char in OPENING:
+                    self._start = position
+                    self._stack.append((char, position))
+                continue
+
+            if char == '"' or char in SMART_QUOTES:
+                self._in_string = True
+                self._string_quote = char
+            elif char in OPENING:
+                self._stack.append((char, position))
+            elif char in CLOSING:
+                opener, opened_at = self._stack.pop()
+                if OPENING[opener] != char:
+                    # Estrutura quebrada: descarta e procura o próximo JSON a partir daqui
+                    self._position = self._start + 1
+                    self._reset()
+                    continue
+                if not self._stack:
+                    ok, value = _loads(buffer[self._start:position + 1])
+                    if ok:
+                        self.documents.append(value)
+                        events.append(('document', value))
+                        self._reset()
+                    else:
+                        self._position = self._start + 1
+                        self._reset()
+                    continue
+                if self.emit_items and self._stack[-1][0] == '[':
+                    ok, value = _loads(buffer[opened_at:position + 1])
+                    if ok:
+                        events.append(('item', value))
+                self._mark_safe(position + 1)
+            elif char == ',':
+                self._mark_safe(position)
+        return events
+
+    def finish(self) -> List[Tuple[str, Any]]:
+        """Fecha um documento truncado no último elemento completo, se possível."""
+        if not self._stack or self._last_safe is None:
+            return []
+        cut, openers = self._last_safe
+        closers = ''.join(OPENING[opener] for opener in reversed(openers))
+        ok, value = _loads(self.buffer[self._start:cut] + closers)
+        self._reset()
+        if not ok:
+            return []
+        self.truncated = True
+        self.documents.append(value)
+        return [('document', value)]
+
+
+# --- Esquemas por endpoint (subconjunto simples de JSON Schema: type, required, properties, items) ---
+
+_STRING_OR_NUMBER = {'type': ['string', 'number']}
+
+SCHEMAS: Dict[str, Dict[str, Any]] = {
+    'task_suggestions': {
+        'type': 'object', 'required': ['suggestions'],
+        'properties': {'suggestions': {'type': 'array', 'items': {
+            'type': 'object', 'required': ['title'],
+            'properties': {'title': {'type': 'string'}, 'description': {'type': 'string'},
+                           'estimated_time': _STRING_OR_NUMBER}
+        }}}
+    },
+    'productivity_insights': {
+        'type': 'object',
+        'properties': {
+            'overall_score': {'type': 'number'},
+            'strengths': {'type': 'array', 'items': {'type': 'string'}},
+            'areas_for_improvement': {'type': 'array', 'items': {'type': 'string'}},
+            'recommendations': {'type': 'array', 'items': {'type': 'object', 'required': ['title']}},
+            'trends': {'type': 'object'}
+        }
+    },
+    'study_recommendations': {
+        'type': 'object', 'required': ['recommendations'],
+        'properties': {'recommendations': {'type': 'array', 'items': {
+            'type': 'object', 'required': ['title'],
+            'properties': {'title': {'type': 'string'}, 'relevance_score': {'type': 'number'},
+                           'topics': {'type': 'array', 'items': {'type': 'string'}}}
+        }}}
+    },
+    'schedule_optimization': {
+        'type': 'object', 'required': ['optimized_schedule'],
+        'properties': {
+            'optimized_schedule': {'type': 'array', 'items': {
+                'type': 'object', 'required': ['time_slot', 'activity'],
+                'properties': {'time_slot': {'type': 'string'}, 'activity': {'type': 'string'}}
+            }},
+            'improvements': {'type': 'array', 'items': {'type': 'string'}},
+            'productivity_score': {'type': 'number'}
+        }
+    },
+    'batch': {
+        'type': 'object', 'required': ['results'],
+        'properties': {'results': {'type': 'array', 'items': {'type': 'object', 'required': ['id']}}}
+    }
+}
+
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    'object': lambda value: isinstance(value, dict),
+    'array': lambda value: isinstance(value, list),
+    'string': lambda value: isinstance(value, str),
+    'number': lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    'boolean': lambda value: isinstance(value, bool)
+}
+
+
+def _matches_type(value: Any, expected: Any) -> bool:
+    types = expected if isinstance(expected, list) else [expected]
+    return any(_TYPE_CHECKS[name](value) for name in types)
+
+
+def conform(value: Any, schema: Dict[str, Any], path: str = '$') -> Tuple[Any, List[str]]:
+    """
+    Valida `value` contra o esquema. Itens de arrays inválidos são descartados (e anotados);
+    retorna (valor ajustado, avisos). Lança JSONExtractionError se o valor em si não servir.
+    """
+    if 'type' in schema and not _matches_type(value, schema['type']):
+        raise JSONExtractionError(f"{path}: esperado {schema['type']}, recebido {type(value).__name__}")
+
+    warnings: List[str] = []
+    if isinstance(value, dict):
+        for key in schema.get('required', []):
+            if key not in value:
+                raise JSONExtractionError(f"{path}: campo obrigatório '{key}' ausente")
+        adjusted = dict(value)
+        for key, subschema in schema.get('properties', {}).items():
+            if key in adjusted:
+                adjusted[key], sub_warnings = conform(adjusted[key], subschema, f"{path}.{key}")
+                warnings.extend(sub_warnings)
+        return adjusted, warnings
+
+    if isinstance(value, list) and 'items' in schema:
+        kept = []
+        for index, item in enumerate(value):
+            try:
+                item, sub_warnings = conform(item, schema['items'], f"{path}[{index}]")
+            except JSONExtractionError as e:
+                warnings.append(f"item descartado: {e}")
+                continue
+            kept.append(item)
+            warnings.extend(sub_warnings)
+        return kept, warnings
+
+    return value, warnings
+
+
+def select_document(documents: List[Any], schema: Optional[Any] = None) -> Any:
+    """Primeiro documento compatível com o esquema (nome em SCHEMAS ou dict); lança JSONExtractionError se nenhum servir."""
+    if isinstance(schema, str):
+        schema = SCHEMAS[schema]
+
+    errors = []
+    for document in documents:
+        if schema is None:
+            return document
+        try:
+            value, _ = conform(document, schema)
+            return value
+        except JSONExtractionError as e:
+            errors.append(str(e))
+    if errors:
+        raise JSONExtractionError('; '.join(errors))
+    raise JSONExtractionError('Nenhum JSON encontrado na resposta')
+
+
+def extract_json(text: str, schema: Optional[Any] = None) -> Any:
+    """Extrai do texto completo o primeiro valor JSON compatível com o esquema."""
+    extractor = StreamingJSONExtractor(emit_items=False)
+    extractor.feed(text or '')
+    extractor.finish()
+    return select_document(extractor.documents, schema)
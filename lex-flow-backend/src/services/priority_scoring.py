@@ -0,0 +1,202 @@
+# src/services/priority_scoring.py
+"""
+Motor vetorizado de scores de prioridade para tarefas.
+
+As tarefas são convertidas em vetores NumPy (dias até o prazo, código de
+prioridade, estimativa em minutos e se a categoria é prioritária) e o score de
+todas é calculado em uma única passada. A urgência decai exponencialmente com a
+folga até o prazo, e os top-k são obtidos por seleção parcial (argpartition),
+sem ordenar a lista inteira.
+"""
+
+import math
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Códigos de prioridade aceitos (em português e inglês, como enviados pelo front-end)
+PRIORITY_CODES = {
+    'baixa': 0, 'low': 0,
+    'média': 1, 'media': 1, 'medium': 1,
+    'alta': 2, 'high': 2,
+    'urgente': 3, 'urgent': 3
+}
+PRIORITY_LABELS = ['baixa', 'média', 'alta', 'urgente']
+DEFAULT_PRIORITY_CODE = 1
+
+DEFAULT_WEIGHTS = {
+    'base': 50.0,
+    # Pontos de urgência quando o prazo é agora (ou já passou)
+    'urgency': 40.0,
+    # A cada 'urgency_half_life_days' de folga, a urgência cai pela metade
+    'urgency_half_life_days': 3.0,
+    # Pontos por código de prioridade: baixa, média, alta, urgente
+    'importance': [-10.0, 0.0, 30.0, 40.0],
+    # Tarefas rápidas sobem, tarefas longas descem
+    'quick_task_minutes': 30.0,
+    'quick_task_bonus': 15.0,
+    'long_task_minutes': 120.0,
+    'long_task_penalty': 15.0,
+    'default_estimate_minutes': 60.0,
+    # Bônus para categorias marcadas como prioritárias pelo usuário
+    'category_match': 10.0
+}
+
+
+@lru_cache(maxsize=4096)
+def _parse_due_timestamp(value: str) -> float:
+    """Converte uma data ISO em timestamp UTC (NaN se inválida). Datas se repetem muito, então o cache ajuda."""
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return math.nan
+    if parsed.tzinfo is not None:
+        return parsed.timestamp()
+    return (parsed - datetime(1970, 1, 1)).total_seconds()
+
+
+def _to_timestamp(value: Any) -> float:
+    if value is None or value == '':
+        return math.nan
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            return value.timestamp()
+        return (value - datetime(1970, 1, 1)).total_seconds()
+    return _parse_due_timestamp(str(value))
+
+
+def _priority_code(value: Any) -> int:
+    return PRIORITY_CODES.get(str(value or '').strip().lower(), DEFAULT_PRIORITY_CODE)
+
+
+class PriorityScoringEngine:
+    """Calcula scores de prioridade (0-100) para listas de tarefas de forma vetorizada."""
+
+    def __init__(self, weights: Optional[Dict[str, Any]] = None):
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self._importance = np.asarray(self.weights['importance'], dtype=np.float64)
+
+    # --- Núcleo vetorizado ---
+
+    def urgency_points(self, due_in_days: np.ndarray) -> np.ndarray:
+        """Urgência com decaimento exponencial; prazos vencidos recebem a urgência máxima e sem prazo recebe 0."""
+        slack = np.clip(due_in_days, 0.0, None)
+        decay = np.exp2(-slack / self.weights['urgency_half_life_days'])
+        return np.where(np.isnan(due_in_days), 0.0, self.weights['urgency'] * decay)
+
+    def effort_points(self, estimates: np.ndarray) -> np.ndarray:
+        estimates = np.where(np.isnan(estimates), self.weights['default_estimate_minutes'], estimates)
+        points = np.zeros_like(estimates)
+        points[estimates < self.weights['quick_task_minutes']] = self.weights['quick_task_bonus']
+        points[estimates > self.weights['long_task_minutes']] = -self.weights['long_task_penalty']
+        return points
+
+    def score_arrays(self, due_in_days: np.ndarray, priority_codes: np.ndarray,
+                     estimates: np.ndarray, category_match: np.ndarray) -> np.ndarray:
+        """
+        Calcula os scores a partir dos vetores de entrada (todos com o mesmo tamanho):
+        - due_in_days: dias até o prazo (negativo se vencido, NaN se sem prazo)
+        - priority_codes: índices em PRIORITY_LABELS
+        - estimates: estimativa em minutos (NaN usa a estimativa padrão)
+        - category_match: booleanos indicando categoria prioritária
+        """
+        codes = np.clip(priority_codes.astype(np.intp), 0, len(self._importance) - 1)
+        scores = (
+            self.weights['base']
+            + self.urgency_points(due_in_days)
+            + self._importance[codes]
+            + self.effort_points(estimates.astype(np.float64))
+            + self.weights['category_match'] * category_match.astype(np.float64)
+        )
+        return np.clip(scores, 0.0, 100.0)
+
+    @staticmethod
+    def top_k(scores: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+        """Índices dos k maiores scores em ordem decrescente (seleção parcial + ordenação só dos k)."""
+        n = scores.shape[0]
+        if k is None or k >= n:
+            return np.argsort(-scores, kind='stable')
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+    # --- Conversão de entradas ---
+
+    @staticmethod
+    def build_arrays(tasks: Iterable[Dict[str, Any]], priority_categories: Iterable[str],
+                     now: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+        """Converte tarefas (dicts com due_date/priority/estimated_time/category) em vetores."""
+        now_ts = _to_timestamp(now or datetime.utcnow())
+        categories = {category.lower() for category in priority_categories}
+
+        due, codes, estimates, matches = [], [], [], []
+        for task in tasks:
+            due.append(_to_timestamp(task.get('due_date')))
+            codes.append(_priority_code(task.get('priority')))
+            estimate = task.get('estimated_time')
+            try:
+                estimates.append(float(estimate) if estimate not in (None, '') else math.nan)
+            except (TypeError, ValueError):
+                estimates.append(math.nan)
+            matches.append(str(task.get('category') or '').lower() in categories)
+
+        return {
+            'due_in_days': (np.asarray(due, dtype=np.float64) - now_ts) / 86400.0,
+            'priority_codes': np.asarray(codes, dtype=np.intp),
+            'estimates': np.asarray(estimates, dtype=np.float64),
+            'category_match': np.asarray(matches, dtype=bool)
+        }
+
+    # --- API de alto nível ---
+
+    def score_tasks(self, tasks: List[Dict[str, Any]], priority_categories: Iterable[str] = (),
+                    k: Optional[int] = None, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Pontua tarefas (dicts) e retorna os resultados ordenados por score (top-k se informado)."""
+        arrays = self.build_arrays(tasks, priority_categories, now)
+        scores = self.score_arrays(**arrays)
+        urgency = self.urgency_points(arrays['due_in_days'])
+
+        results = []
+        for index in self.top_k(scores, k):
+            due_in_days = arrays['due_in_days'][index]
+            estimate = arrays['estimates'][index]
+            results.append({
+                'index': int(index),
+                'priority_score': round(float(scores[index]), 1),
+                'factors': {
+                    'urgency': round(float(urgency[index]), 1),
+                    'due_in_days': None if np.isnan(due_in_days) else round(float(due_in_days), 2),
+                    'importance': PRIORITY_LABELS[arrays['priority_codes'][index]],
+                    'effort': None if np.isnan(estimate) else float(estimate),
+                    'category_match': bool(arrays['category_match'][index])
+                }
+            })
+        return results
+
+    def score_project(self, project_id: int, priority_categories: Iterable[str] = (),
+                      k: Optional[int] = None, include_completed: bool = False) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Pontua as tarefas de um projeto direto do banco, carregando só as colunas necessárias.
+        Retorna (resultados, total de tarefas pontuadas); com `k`, só os k primeiros resultados.
+        """
+        from src import db
+        from src.models.project import Task
+
+        query = db.session.query(
+            Task.id, Task.title, Task.status, Task.category,
+            Task.priority, Task.due_date, Task.estimated_time
+        ).filter(Task.project_id == project_id)
+        if not include_completed:
+            query = query.filter(Task.status != 'completed')
+        rows = query.all()
+
+        results = self.score_tasks([row._asdict() for row in rows], priority_categories, k)
+        for result in results:
+            row = rows[result.pop('index')]
+            result['id'] = row.id
+            result['title'] = row.title
+            result['status'] = row.status
+        return results, len(rows)
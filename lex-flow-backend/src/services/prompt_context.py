@@ -0,0 +1,205 @@
+# src/services/prompt_context.py
+"""
+Construtor de contexto com orçamento de tokens para os prompts de IA e do Fabric.
+
+Em vez de `json.dumps(..., indent=2)` de tudo o que o cliente enviou, o contexto é:
+- compactado (JSON sem indentação, chaves curtas com legenda, campos vazios removidos);
+- reduzido nas listas longas (itens recentes completos, antigos amostrados e/ou resumidos);
+- encolhido progressivamente até caber no orçamento do prompt.
+
+O tamanho final de cada prompt é registrado no log, para que o custo permaneça
+estável mesmo com o crescimento do histórico do usuário.
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from src.services.ai_batch import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Orçamento de tokens do contexto por tipo de prompt (sem contar as instruções fixas)
+PROMPT_BUDGETS = {
+    'task_suggestions': 1500,
+    'productivity_insights': 2500,
+    'study_recommendations': 1500,
+    'schedule_optimization': 2000,
+    # Patterns do Fabric (framework TELOS + reflexões diárias)
+    'summary': 6000,
+    'red_team': 6000,
+    'blindspots': 6000,
+    'encouragement': 4000,
+    'chat': 4000
+}
+DEFAULT_BUDGET = 2000
+
+# Chaves frequentes encurtadas no JSON enviado ao modelo (a legenda vai junto no contexto)
+KEY_ALIASES = {
+    'title': 't',
+    'description': 'd',
+    'priority': 'p',
+    'category': 'c',
+    'status': 's',
+    'estimated_time': 'et',
+    'due_date': 'due',
+    'created_at': 'ca',
+    'updated_at': 'ua',
+    'completed_at': 'done',
+    'duration_minutes': 'min',
+    'start_time': 'st',
+    'review_date': 'dt',
+    'content': 'txt'
+}
+
+# Metadados que não ajudam o modelo e só gastam tokens
+DROPPED_KEYS = {'id', 'user_id', 'tenant_id', 'project_id', 'created_by', 'owner_id'}
+
+
+def compact_json(value: Any) -> str:
+    """JSON sem espaços nem indentação."""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+class ContextBuilder:
+    """Monta contextos compactos que respeitam um orçamento de tokens."""
+
+    def __init__(self, budget_tokens: int = DEFAULT_BUDGET, recent_items: int = 10,
+                 max_string_chars: int = 500, older_samples: int = 10):
+        self.budget_tokens = budget_tokens
+        self.recent_items = recent_items
+        self.max_string_chars = max_string_chars
+        self.older_samples = older_samples
+        self._used_aliases: Dict[str, str] = {}
+
+    @classmethod
+    def for_prompt(cls, prompt_name: str, **kwargs) -> 'ContextBuilder':
+        return cls(budget_tokens=PROMPT_BUDGETS.get(prompt_name, DEFAULT_BUDGET), **kwargs)
+
+    # --- Compactação ---
+
+    def compact(self, value: Any, max_string_chars: Optional[int] = None) -> Any:
+        """Remove campos vazios e metadados, encurta chaves e trunca textos longos."""
+        limit = max_string_chars or self.max_string_chars
+        if isinstance(value, dict):
+            compacted = {}
+            for key, item in value.items():
+                if key in DROPPED_KEYS or item in (None, '', [], {}):
+                    continue
+                alias = KEY_ALIASES.get(key, key)
+                if alias != key:
+                    self._used_aliases[alias] = key
+                compacted[alias] = self.compact(item, limit)
+            return compacted
+        if isinstance(value, list):
+            return [self.compact(item, limit) for item in value]
+        if isinstance(value, str) and len(value) > limit:
+            return value[:limit].rsplit(' ', 1)[0] + '…'
+        return value
+
+    def reduce_list(self, items: List[Any], recent: Optional[int] = None,
+                    samples: Optional[int] = None) -> List[Any]:
+        """
+        Mantém os `recent` itens mais recentes (fim da lista) e uma amostra uniforme dos anteriores,
+        indicando quantos foram omitidos.
+        """
+        recent = self.recent_items if recent is None else recent
+        samples = self.older_samples if samples is None else samples
+        if len(items) <= recent + samples:
+            return list(items)
+
+        older, newer = items[:len(items) - recent], items[len(items) - recent:] if recent else []
+        sampled = [older[int(i * len(older) / samples)] for i in range(samples)] if samples else []
+        omitted = len(older) - len(sampled)
+        return sampled + [{'_omitidos': omitted}] + newer
+
+    # --- Montagem com orçamento ---
+
+    def _render(self, sections: Dict[str, Any], recent: int, samples: int, max_chars: int) -> str:
+        self._used_aliases = {}
+        lines = []
+        for name, value in sections.items():
+            if value in (None, '', [], {}):
+                continue
+            if isinstance(value, list):
+                value = self.reduce_list(value, recent, samples)
+            value = self.compact(value, max_chars)
+            lines.append(f"{name}: {value if isinstance(value, str) else compact_json(value)}")
+        if self._used_aliases:
+            legend = ', '.join(f"{alias}={key}" for alias, key in sorted(self._used_aliases.items()))
+            lines.insert(0, f"Legenda das chaves: {legend}")
+        return '\n'.join(lines)
+
+    def build(self, sections: Dict[str, Any], label: str = 'contexto') -> str:
+        """
+        Serializa as seções ({nome: valor}) dentro do orçamento.
+        Se não couber, reduz as listas, depois os textos e, por fim, corta o texto final.
+        """
+        recent, samples, max_chars = self.recent_items, self.older_samples, self.max_string_chars
+        original_tokens = estimate_tokens(compact_json(sections))
+
+        context = self._render(sections, recent, samples, max_chars)
+        while estimate_tokens(context) > self.budget_tokens and (recent > 1 or samples > 0 or max_chars > 80):
+            if samples > 0:
+                samples //= 2
+            elif recent > 1:
+                recent = max(1, recent // 2)
+            else:
+                max_chars = max(80, max_chars // 2)
+            context = self._render(sections, recent, samples, max_chars)
+
+        context = fit_text(context, self.budget_tokens)
+        logger.info(
+            "Prompt %s: %d tokens estimados (entrada original ~%d, orçamento %d)",
+            label, estimate_tokens(context), original_tokens, self.budget_tokens
+        )
+        return context
+
+
+def fit_text(text: str, budget_tokens: int, keep: str = 'head') -> str:
+    """Corta um texto para caber no orçamento, mantendo o início ('head') ou o fim ('tail')."""
+    max_chars = budget_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    if keep == 'tail':
+        return '…' + text[-(max_chars - 1):]
+    return text[:max_chars - 1] + '…'
+
+
+def _review_text(content: Any) -> str:
+    """Converte o conteúdo JSON de uma revisão TELOS em texto corrido."""
+    if isinstance(content, dict):
+        return ' '.join(f"{key}: {value}" for key, value in content.items() if value)
+    return str(content or '')
+
+
+def build_telos_context(pattern_name: str, framework_content: Any, reviews: List[Dict[str, Any]],
+                        recent_reviews: int = 7) -> Dict[str, str]:
+    """
+    Monta o contexto de um pattern do Fabric a partir do framework TELOS e das revisões
+    (em ordem cronológica). As revisões recentes entram completas; as antigas são resumidas
+    de forma extrativa e, se ainda não couberem, amostradas.
+    Retorna {'framework_context', 'daily_context'}.
+    """
+    from src.services.summarizer import ExtractiveSummarizer
+
+    budget = PROMPT_BUDGETS.get(pattern_name, DEFAULT_BUDGET)
+    framework_context = ContextBuilder(budget_tokens=budget // 3, max_string_chars=1500).build(
+        {'framework': framework_content}, label=f"fabric:{pattern_name}:framework"
+    )
+
+    summarizer = ExtractiveSummarizer()
+    cutoff = len(reviews) - recent_reviews
+    entries = []
+    for index, review in enumerate(reviews):
+        text = _review_text(review.get('content'))
+        if index < cutoff:
+            text = summarizer.summarize(text, max_length=240)['summary']
+        entries.append({'review_date': review.get('review_date'), 'content': text})
+
+    remaining = max(budget - estimate_tokens(framework_context), budget // 3)
+    daily_context = ContextBuilder(
+        budget_tokens=remaining, recent_items=recent_reviews, older_samples=30, max_string_chars=1200
+    ).build({'reflexoes': entries}, label=f"fabric:{pattern_name}:reviews")
+
+    return {'framework_context': framework_context, 'daily_context': daily_context}
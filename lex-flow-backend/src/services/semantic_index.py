@@ -0,0 +1,560 @@
+# src/services/semantic_index.py
+"""
+Índice semântico local para anotações, tarefas, revisões TELOS e vídeos de estudo.
+
+- Cada texto vira um vetor float32 normalizado. O embedder padrão usa o truque de
+  hashing (palavras e bigramas sem acento espalhados em 256 dimensões), que não
+  depende de modelo nenhum; com SEARCH_EMBEDDING_MODEL definido, um modelo local do
+  sentence-transformers é usado no lugar (dependência opcional).
+- Os vetores de cada tenant ficam em uma matriz float32 mapeada em memória
+  (`<SEARCH_INDEX_DIR>/<embedder>/tenant_<id>.f32`). A tabela `search_index_entries`
+  guarda qual registro ocupa cada linha.
+- O índice é atualizado de forma incremental: ganchos do SQLAlchemy coletam o que
+  mudou em cada flush e, após o commit, só os registros cujo texto mudou são
+  recalculados.
+- A busca é um produto matriz-vetor com NumPy seguido de seleção parcial dos top-k,
+  o que atende ~100 mil itens por tenant em poucos milissegundos.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import IntegrityError
+
+from src import db
+from src.models.search_index import SearchIndexEntry
+from src.services.categorizer import normalize_text
+from src.services.summarizer import STOPWORDS
+
+try:
+    import fcntl
+except ImportError:  # Windows: o crescimento do arquivo fica sem trava entre processos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = os.environ.get('SEARCH_INDEX_DIR') or os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), 'database', 'search_index'
+)
+HASHING_DIM = 256
+INITIAL_CAPACITY = 1024
+SNIPPET_CHARS = 200
+EMBED_BATCH_SIZE = 256
+
+KIND_CODES = {'quick_note': 1, 'task': 2, 'telos_review': 3, 'study_video': 4}
+# Tarefas pertencem a projetos do tenant; os demais tipos são privados do usuário
+SHARED_KINDS = {'task'}
+_SHARED_CODES = np.array(sorted(KIND_CODES[kind] for kind in SHARED_KINDS), dtype=np.int8)
+
+_WORD_RE = re.compile(r'\w+')
+
+
+# --- Embedders ---
+
+class HashingEmbedder:
+    """Vetores por hashing de palavras e bigramas (determinístico, sem modelo)."""
+
+    def __init__(self, dim: int = HASHING_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> List[str]:
+        words = [
+            word for word in _WORD_RE.findall(normalize_text(text))
+            if len(word) > 2 and word not in STOPWORDS
+        ]
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for index, text in enumerate(texts):
+            counts: Dict[str, int] = {}
+            for feature in self._features(text):
+                counts[feature] = counts.get(feature, 0) + 1
+            for feature, count in counts.items():
+                hashed = zlib.crc32(feature.encode('utf-8'))
+                sign = 1.0 if hashed & 0x80000000 else -1.0
+                weight = (1.0 + math.log(count)) * (0.5 if ' ' in feature else 1.0)
+                vectors[index, hashed % self.dim] += sign * weight
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+class SentenceTransformerEmbedder:
+    """Modelo local do sentence-transformers (carregado uma vez, no primeiro uso)."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = re.sub(r'[^\w.-]+', '_', model_name)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = self.model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder():
+    """Embedder configurado (SEARCH_EMBEDDING_MODEL) ou o de hashing."""
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                model_name = os.environ.get('SEARCH_EMBEDDING_MODEL')
+                embedder = None
+                if model_name:
+                    try:
+                        embedder = SentenceTransformerEmbedder(model_name)
+                    except Exception as e:
+                        logger.warning("Modelo de embeddings '%s' indisponível (%s); usando hashing.", model_name, e)
+                _embedder = embedder or HashingEmbedder()
+    return _embedder
+
+
+# --- Conteúdo indexado por tipo de registro ---
+
+def _sources() -> Dict[type, str]:
+    from src.models.project import Task
+    from src.models.quick_note import QuickNote
+    from src.models.study_video import StudyVideo
+    from src.models.telos import TelosReview
+    return {QuickNote: 'quick_note', Task: 'task', TelosReview: 'telos_review', StudyVideo: 'study_video'}
+
+
+def _json_text(content: Any) -> str:
+    if isinstance(content, dict):
+        return ' '.join(str(value) for value in content.values() if value)
+    return str(content or '')
+
+
+def document_text(kind: str, obj: Any) -> str:
+    """Texto que representa o registro no índice."""
+    if kind == 'quick_note':
+        return ' '.join([obj.content or '', obj.category or ''] + [str(tag) for tag in (obj.tags or [])])
+    if kind == 'task':
+        return f"{obj.title or ''}. {obj.description or ''} {obj.category or ''}"
+    if kind == 'telos_review':
+        return _json_text(obj.content)
+    if kind == 'study_video':
+        return f"{obj.title or ''}. {obj.notes or ''}"
+    return ''
+
+
+def document_title(kind: str, obj: Any) -> str:
+    if kind == 'quick_note':
+        return (obj.content or '')[:80]
+    if kind == 'task':
+        return obj.title
+    if kind == 'telos_review':
+        return f"Revisão de {obj.review_date.isoformat()}" if obj.review_date else 'Revisão'
+    if kind == 'study_video':
+        return obj.title or obj.video_url
+    return ''
+
+
+def document_snippet(kind: str, obj: Any) -> str:
+    """Trecho exibido nos resultados (sem os campos auxiliares usados só na indexação)."""
+    if kind == 'quick_note':
+        text = obj.content
+    elif kind == 'task':
+        text = obj.description or obj.title
+    elif kind == 'study_video':
+        text = obj.notes or obj.title
+    else:
+        text = document_text(kind, obj)
+    text = ' '.join((text or '').split())
+    return text[:SNIPPET_CHARS] + ('…' if len(text) > SNIPPET_CHARS else '')
+
+
+def _owner(kind: str, obj: Any) -> Tuple[int, Optional[int]]:
+    """(usuário dono, projeto) do registro; o tenant é resolvido a partir deles."""
+    if kind == 'task':
+        return obj.created_by, obj.project_id
+    return obj.user_id, None
+
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+# --- Matriz de vetores por tenant ---
+
+class TenantIndex:
+    """Matriz float32 mapeada em memória com os vetores de um tenant e os metadados de cada linha."""
+
+    def __init__(self, tenant_id: int, dim: int, directory: str):
+        self.tenant_id = tenant_id
+        self.dim = dim
+        self.path = os.path.join(directory, f"tenant_{tenant_id}.f32")
+        self.lock = threading.RLock()
+        self.matrix: Optional[np.memmap] = None
+        self.version = None
+        self.set_metadata(np.zeros(0, dtype=bool), np.zeros(0, dtype=np.int8),
+                          np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+    def set_metadata(self, valid: np.ndarray, kinds: np.ndarray, object_ids: np.ndarray, user_ids: np.ndarray):
+        self.valid, self.kinds, self.object_ids, self.user_ids = valid, kinds, object_ids, user_ids
+
+    def _capacity_for(self, rows: int) -> int:
+        capacity = INITIAL_CAPACITY
+        while capacity < rows:
+            capacity *= 2
+        return capacity
+
+    def ensure_rows(self, rows: int):
+        """Garante que o arquivo tenha ao menos `rows` linhas e que o mapeamento esteja atualizado."""
+        row_bytes = self.dim * 4
+        with self.lock:
+            mapped_rows = self.matrix.shape[0] if self.matrix is not None else 0
+            size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            if size < rows * row_bytes:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, 'ab') as handle:
+                    if fcntl:
+                        fcntl.flock(handle, fcntl.LOCK_EX)
+                    # Outro processo pode ter aumentado o arquivo enquanto esperávamos a trava
+                    current = os.fstat(handle.fileno()).st_size
+                    target = self._capacity_for(rows) * row_bytes
+                    if current < target:
+                        handle.truncate(target)
+                size = os.path.getsize(self.path)
+            file_rows = size // row_bytes
+            if file_rows and file_rows != mapped_rows:
+                self.matrix = np.memmap(self.path, dtype=np.float32, mode='r+', shape=(file_rows, self.dim))
+
+    def write(self, rows: Sequence[int], vectors: np.ndarray):
+        if not len(rows):
+            return
+        with self.lock:
+            self.ensure_rows(max(rows) + 1)
+            self.matrix[np.asarray(rows, dtype=np.intp)] = vectors
+
+    def search_vector(self, query: np.ndarray, user_id: int, k: int = 10,
+                      kind_codes: Optional[Iterable[int]] = None) -> List[Tuple[int, float]]:
+        """Top-k (linha, score) entre as linhas visíveis ao usuário."""
+        n = self.valid.shape[0]
+        if n == 0:
+            return []
+        with self.lock:
+            self.ensure_rows(n)
+            matrix = self.matrix
+        visible = self.valid & ((self.user_ids == user_id) | np.isin(self.kinds, _SHARED_CODES))
+        if kind_codes is not None:
+            visible &= np.isin(self.kinds, np.fromiter(kind_codes, dtype=np.int8))
+        candidates = np.flatnonzero(visible)
+        if candidates.size == 0:
+            return []
+
+        # Sem filtro relevante, o produto sobre a faixa contígua evita copiar linhas
+        if candidates.size > n // 2:
+            scores = matrix[:n] @ query
+            scores[~visible] = -np.inf
+        else:
+            scores = np.full(n, -np.inf, dtype=np.float32)
+            scores[candidates] = matrix[candidates] @ query
+
+        k = min(k, candidates.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(int(row), float(scores[row])) for row in top if scores[row] > 0]
+
+
+class SemanticIndex:
+    """Índice de todos os tenants: atualização incremental, reconstrução e busca."""
+
+    def __init__(self, directory: str = INDEX_DIR):
+        self.directory = directory
+        self._tenants: Dict[int, TenantIndex] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def embedder(self):
+        return get_embedder()
+
+    def tenant(self, tenant_id: int) -> TenantIndex:
+        index = self._tenants.get(tenant_id)
+        if index is None:
+            with self._lock:
+                index = self._tenants.get(tenant_id)
+                if index is None:
+                    directory = os.path.join(self.directory, self.embedder.name)
+                    index = self._tenants[tenant_id] = TenantIndex(tenant_id, self.embedder.dim, directory)
+        return index
+
+    # --- Metadados ---
+
+    def _refresh(self, connection, index: TenantIndex):
+        """Recarrega os metadados do tenant se alguma entrada mudou (também em outros processos)."""
+        table = SearchIndexEntry.__table__
+        version = tuple(connection.execute(
+            select(func.count(table.c.id), func.max(table.c.updated_at)).where(table.c.tenant_id == index.tenant_id)
+        ).one())
+        if version == index.version:
+            return
+        rows = connection.execute(
+            select(table.c.row, table.c.kind, table.c.object_id, table.c.user_id)
+            .where(table.c.tenant_id == index.tenant_id, table.c.deleted.is_(False))
+        ).all()
+        n = max((row.row for row in rows), default=-1) + 1
+        valid = np.zeros(n, dtype=bool)
+        kinds = np.zeros(n, dtype=np.int8)
+        object_ids = np.zeros(n, dtype=np.int64)
+        user_ids = np.zeros(n, dtype=np.int64)
+        for row in rows:
+            valid[row.row] = True
+            kinds[row.row] = KIND_CODES.get(row.kind, 0)
+            object_ids[row.row] = row.object_id
+            user_ids[row.row] = row.user_id
+        with index.lock:
+            index.set_metadata(valid, kinds, object_ids, user_ids)
+            index.version = version
+
+    # --- Atualização incremental ---
+
+    def _resolve_tenants(self, connection, changes: Dict[Tuple[str, int], Dict[str, Any]]):
+        from src.models.project import Project
+        from src.models.user import User
+
+        user_ids = {change['user_id'] for change in changes.values() if change.get('user_id')}
+        project_ids = {change['project_id'] for change in changes.values() if change.get('project_id')}
+        users = dict(connection.execute(
+            select(User.__table__.c.id, User.__table__.c.tenant_id).where(User.__table__.c.id.in_(user_ids))
+        ).all()) if user_ids else {}
+        projects = dict(connection.execute(
+            select(Project.__table__.c.id, Project.__table__.c.tenant_id).where(Project.__table__.c.id.in_(project_ids))
+        ).all()) if project_ids else {}
+        for change in changes.values():
+            if change.get('project_id'):
+                change['tenant_id'] = projects.get(change['project_id'])
+            elif change.get('user_id'):
+                change['tenant_id'] = users.get(change['user_id'])
+
+    def _allocate_row(self, connection, tenant_id: int, values: Dict[str, Any]) -> int:
+        table = SearchIndexEntry.__table__
+        for _ in range(5):
+            next_row = connection.execute(
+                select(func.coalesce(func.max(table.c.row), -1) + 1).where(table.c.tenant_id == tenant_id)
+            ).scalar()
+            try:
+                with connection.begin_nested():
+                    connection.execute(table.insert().values(tenant_id=tenant_id, row=next_row, **values))
+                return next_row
+            except IntegrityError:
+                continue  # Outro processo pegou a mesma linha; tenta a próxima
+        raise RuntimeError(f"Não foi possível alocar uma linha no índice do tenant {tenant_id}")
+
+    def apply_changes(self, changes: Dict[Tuple[str, int], Dict[str, Any]]):
+        """
+        Aplica as mudanças coletadas ({(tipo, id): {'op', 'user_id', 'project_id', 'text'}})
+        em uma transação própria. Só recalcula vetores de textos que mudaram.
+        """
+        table = SearchIndexEntry.__table__
+        now = datetime.utcnow()
+        with db.engine.begin() as connection:
+            self._resolve_tenants(connection, changes)
+            existing = {}
+            for kind in {kind for kind, _ in changes}:
+                ids = [object_id for change_kind, object_id in changes if change_kind == kind]
+                for entry in connection.execute(
+                    select(table.c.id, table.c.kind, table.c.object_id, table.c.tenant_id, table.c.row,
+                           table.c.content_hash, table.c.deleted)
+                    .where(table.c.kind == kind, table.c.object_id.in_(ids))
+                ).all():
+                    existing[(entry.kind, entry.object_id)] = entry
+
+            to_embed: List[Tuple[int, int, str]] = []  # (tenant, linha, texto)
+            for key, change in changes.items():
+                entry = existing.get(key)
+                if change['op'] == 'delete':
+                    if entry is not None and not entry.deleted:
+                        connection.execute(table.update().where(table.c.id == entry.id).values(deleted=True, updated_at=now))
+                    continue
+
+                tenant_id = change.get('tenant_id')
+                if tenant_id is None:
+                    continue
+                content_hash = _content_hash(change['text'])
+                values = {'user_id': change['user_id'], 'content_hash': content_hash, 'deleted': False, 'updated_at': now}
+                if entry is not None and entry.tenant_id == tenant_id:
+                    if entry.content_hash == content_hash and not entry.deleted:
+                        continue
+                    connection.execute(table.update().where(table.c.id == entry.id).values(**values))
+                    row = entry.row
+                else:
+                    if entry is not None:
+                        connection.execute(table.delete().where(table.c.id == entry.id))
+                    row = self._allocate_row(connection, tenant_id, dict(values, kind=key[0], object_id=key[1]))
+                to_embed.append((tenant_id, row, change['text']))
+
+            self._write_vectors(to_embed)
+
+    def _write_vectors(self, to_embed: List[Tuple[int, int, str]]):
+        by_tenant: Dict[int, List[Tuple[int, str]]] = {}
+        for tenant_id, row, text in to_embed:
+            by_tenant.setdefault(tenant_id, []).append((row, text))
+        for tenant_id, items in by_tenant.items():
+            index = self.tenant(tenant_id)
+            for start in range(0, len(items), EMBED_BATCH_SIZE):
+                batch = items[start:start + EMBED_BATCH_SIZE]
+                index.write([row for row, _ in batch], self.embedder.embed([text for _, text in batch]))
+
+    def index_records(self, model: type, ids: Sequence[int], batch_size: int = 500) -> int:
+        """Indexa registros gravados sem passar pela sessão do ORM (ex: importação de backup em lote)."""
+        kind = _sources().get(model)
+        if kind is None:
+            return 0
+        total = 0
+        for start in range(0, len(ids), batch_size):
+            changes = {}
+            for obj in db.session.query(model).filter(model.id.in_(ids[start:start + batch_size])):
+                user_id, project_id = _owner(kind, obj)
+                changes[(kind, obj.id)] = {'op': 'upsert', 'user_id': user_id, 'project_id': project_id,
+                                           'text': document_text(kind, obj)}
+            if changes:
+                self.apply_changes(changes)
+                total += len(changes)
+        return total
+
+    def rebuild_tenant(self, tenant_id: int) -> int:
+        """Reconstrói do zero o índice de um tenant (ex: após trocar o modelo de embeddings). Retorna o total indexado."""
+        from src.models.project import Project
+        from src.models.user import User
+
+        table = SearchIndexEntry.__table__
+        with db.engine.begin() as connection:
+            connection.execute(table.delete().where(table.c.tenant_id == tenant_id))
+        index = self.tenant(tenant_id)
+        with index.lock:
+            index.matrix = None
+            if os.path.exists(index.path):
+                os.remove(index.path)
+            index.version = None
+
+        total = 0
+        for model, kind in _sources().items():
+            if kind == 'task':
+                query = db.session.query(model).join(Project, Project.id == model.project_id).filter(Project.tenant_id == tenant_id)
+            else:
+                query = db.session.query(model).join(User, User.id == model.user_id).filter(User.tenant_id == tenant_id)
+            changes = {}
+            for obj in query.yield_per(500):
+                user_id, project_id = _owner(kind, obj)
+                changes[(kind, obj.id)] = {'op': 'upsert', 'user_id': user_id, 'project_id': project_id,
+                                           'text': document_text(kind, obj)}
+                if len(changes) >= 2000:
+                    self.apply_changes(changes)
+                    total += len(changes)
+                    changes = {}
+            if changes:
+                self.apply_changes(changes)
+                total += len(changes)
+        return total
+
+    # --- Busca ---
+
+    def search(self, tenant_id: int, user_id: int, query: str, k: int = 10,
+               kinds: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Retorna [{'kind', 'id', 'score'}] dos registros mais próximos da consulta."""
+        if not query or not query.strip():
+            return []
+        index = self.tenant(tenant_id)
+        with db.engine.connect() as connection:
+            self._refresh(connection, index)
+        kind_codes = [KIND_CODES[kind] for kind in kinds if kind in KIND_CODES] if kinds else None
+        query_vector = self.embedder.embed([query])[0]
+        names = {code: kind for kind, code in KIND_CODES.items()}
+        return [
+            {'kind': names[int(index.kinds[row])], 'id': int(index.object_ids[row]), 'score': round(score, 4)}
+            for row, score in index.search_vector(query_vector, user_id, k, kind_codes)
+        ]
+
+    def hydrate(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Acrescenta título e trecho de cada resultado, buscando os registros em uma consulta por tipo."""
+        models = {kind: model for model, kind in _sources().items()}
+        by_kind: Dict[str, List[int]] = {}
+        for result in results:
+            by_kind.setdefault(result['kind'], []).append(result['id'])
+        objects = {}
+        for kind, ids in by_kind.items():
+            model = models[kind]
+            for obj in model.query.filter(model.id.in_(ids)).all():
+                objects[(kind, obj.id)] = obj
+
+        hydrated = []
+        for result in results:
+            obj = objects.get((result['kind'], result['id']))
+            if obj is None:
+                continue  # Removido depois da última atualização do índice
+            hydrated.append(dict(result, title=document_title(result['kind'], obj),
+                                 snippet=document_snippet(result['kind'], obj)))
+        return hydrated
+
+
+semantic_index = SemanticIndex()
+
+
+# --- Ganchos do SQLAlchemy ---
+
+_PENDING_KEY = 'semantic_index_pending'
+
+
+def _collect_changes(session, flush_context):
+    """Após cada flush, anota os registros indexáveis que foram criados, alterados ou removidos."""
+    sources = _sources()
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    for obj in list(session.new) + list(session.dirty):
+        kind = sources.get(type(obj))
+        if kind is None or obj.id is None or (obj not in session.new and not session.is_modified(obj)):
+            continue
+        user_id, project_id = _owner(kind, obj)
+        pending[(kind, obj.id)] = {'op': 'upsert', 'user_id': user_id, 'project_id': project_id,
+                                   'text': document_text(kind, obj)}
+    for obj in session.deleted:
+        kind = sources.get(type(obj))
+        if kind is not None and obj.id is not None:
+            pending[(kind, obj.id)] = {'op': 'delete'}
+
+
+def _apply_pending(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    try:
+        semantic_index.apply_changes(pending)
+    except Exception as e:
+        # O índice nunca deve quebrar a escrita do usuário; 'flask search-reindex' corrige divergências
+        logger.error("Falha ao atualizar o índice semântico: %s", e)
+
+
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def init_app(app):
+    """Registra os ganchos de atualização incremental e o comando 'flask search-reindex'."""
+    if not event.contains(db.session, 'after_flush', _collect_changes):
+        event.listen(db.session, 'after_flush', _collect_changes)
+        event.listen(db.session, 'after_commit', _apply_pending)
+        event.listen(db.session, 'after_rollback', _discard_pending)
+
+    @app.cli.command('search-reindex')
+    def search_reindex():
+        """Reconstrói o índice semântico de todos os tenants."""
+        from src.models.tenant import Tenant
+        for (tenant_id,) in db.session.query(Tenant.id).all():
+            total = semantic_index.rebuild_tenant(tenant_id)
+            print(f"Tenant {tenant_id}: {total} registros indexados")
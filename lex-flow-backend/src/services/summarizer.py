@@ -0,0 +1,238 @@
+# src/services/summarizer.py
+"""
+Resumidor extrativo local (sem chamadas a modelos pagos).
+
+1. O texto é dividido em frases por um separador que respeita abreviações
+   comuns ("Dr.", "etc.", "ex.") e números decimais.
+2. Cada frase vira um vetor TF-IDF esparso; a similaridade entre frases é
+   calculada apenas para pares que compartilham termos (índice invertido).
+3. As frases são ranqueadas com TextRank e selecionadas gulosamente até o
+   limite de caracteres (`max_length`), evitando frases quase repetidas.
+
+Documentos longos (notas de estudo, revisões do Telos) são processados em
+blocos de tamanho fixo: cada bloco elege suas melhores frases e só os
+candidatos passam para a rodada seguinte, mantendo o custo linear no tamanho
+da entrada.
+"""
+
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.services.categorizer import normalize_text
+
+# Quantidade de frases por bloco no modo em blocos
+CHUNK_SENTENCES = 120
+
+# Menor max_length aceito em /smart-summary (limites menores são elevados a este)
+MIN_SUMMARY_LENGTH = 20
+
+# Peso da posição da frase no score final (frases iniciais costumam introduzir o assunto)
+POSITION_WEIGHT = 0.15
+
+# Frases mais similares que isso a uma frase já escolhida são descartadas
+REDUNDANCY_THRESHOLD = 0.75
+
+DAMPING = 0.85
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-6
+
+ABBREVIATIONS = {
+    'sr', 'sra', 'srs', 'dr', 'dra', 'prof', 'profa', 'etc', 'ex', 'obs', 'pag', 'pg', 'vs', 'av',
+    'n', 'no', 'nº', 'num', 'cap', 'fig', 'vol', 'ed', 'eng', 'adm', 'ltda', 'cia', 'jr',
+    'mr', 'mrs', 'ms', 'e.g', 'i.e', 'approx', 'min', 'max', 'aprox'
+}
+
+STOPWORDS = {
+    # Português
+    'a', 'o', 'as', 'os', 'um', 'uma', 'uns', 'umas', 'de', 'do', 'da', 'dos', 'das', 'em', 'no', 'na',
+    'nos', 'nas', 'por', 'para', 'pra', 'com', 'sem', 'e', 'ou', 'mas', 'que', 'se', 'ao', 'aos', 'como',
+    'mais', 'menos', 'muito', 'ja', 'nao', 'sim', 'eu', 'voce', 'ele', 'ela', 'nos', 'eles', 'elas',
+    'meu', 'minha', 'seu', 'sua', 'isso', 'isto', 'esse', 'essa', 'este', 'esta', 'aquele', 'aquela',
+    'ser', 'estar', 'ter', 'foi', 'era', 'sao', 'esta', 'estao', 'tem', 'ha', 'quando', 'onde', 'qual',
+    'tambem', 'so', 'ate', 'entre', 'sobre', 'depois', 'antes', 'pelo', 'pela', 'pelos', 'pelas',
+    # Inglês
+    'the', 'an', 'and', 'or', 'of', 'to', 'in', 'on', 'for', 'with', 'is', 'are', 'was', 'were', 'be',
+    'it', 'this', 'that', 'as', 'at', 'by', 'from', 'not', 'but', 'have', 'has', 'had', 'i', 'you', 'we'
+}
+
+_BOUNDARY_RE = re.compile(r'[.!?…]+["\')\]]*\s+|\n\s*\n+|\n(?=\s*(?:[-*•]|\d+[.)])\s)')
+_WORD_RE = re.compile(r'\w+')
+
+
+def split_sentences(text: str) -> List[str]:
+    """Divide o texto em frases, respeitando abreviações, decimais, parágrafos e listas."""
+    sentences, start = [], 0
+    for match in _BOUNDARY_RE.finditer(text):
+        end = match.end()
+        candidate = text[start:match.start() + len(match.group().rstrip())]
+        if match.group()[0] == '.':
+            last_word = candidate[:-1].rsplit(None, 1)[-1].lower() if candidate[:-1].split() else ''
+            # "Dr. Silva", "etc. e" e iniciais ("J. R. R.") não encerram a frase
+            if last_word.strip('(') in ABBREVIATIONS or (len(last_word) == 1 and last_word.isalpha()):
+                continue
+        sentence = ' '.join(candidate.split())
+        if sentence:
+            sentences.append(sentence)
+        start = end
+    tail = ' '.join(text[start:].split())
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+
+def _terms(sentence: str) -> List[str]:
+    return [
+        word for word in _WORD_RE.findall(normalize_text(sentence))
+        if len(word) > 2 and word not in STOPWORDS and not word.isdigit()
+    ]
+
+
+def _tfidf_vectors(sentence_terms: List[List[str]], idf: Dict[str, float]) -> List[Dict[str, float]]:
+    """Vetores TF-IDF esparsos (dict termo -> peso) normalizados em L2."""
+    vectors = []
+    for terms in sentence_terms:
+        counts: Dict[str, int] = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        vector = {term: (1 + math.log(count)) * idf.get(term, 1.0) for term, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        vectors.append({term: weight / norm for term, weight in vector.items()} if norm else {})
+    return vectors
+
+
+def _similarity_matrix(vectors: List[Dict[str, float]]) -> np.ndarray:
+    """Produto esparso S·Sᵀ: só pares de frases que compartilham termos são visitados."""
+    n = len(vectors)
+    postings: Dict[str, List[Tuple[int, float]]] = {}
+    for index, vector in enumerate(vectors):
+        for term, weight in vector.items():
+            postings.setdefault(term, []).append((index, weight))
+
+    similarity = np.zeros((n, n), dtype=np.float64)
+    for entries in postings.values():
+        if len(entries) < 2:
+            continue
+        indices = np.fromiter((index for index, _ in entries), dtype=np.intp, count=len(entries))
+        weights = np.fromiter((weight for _, weight in entries), dtype=np.float64, count=len(entries))
+        similarity[np.ix_(indices, indices)] += np.outer(weights, weights)
+    np.fill_diagonal(similarity, 0.0)
+    return similarity
+
+
+def _textrank(similarity: np.ndarray) -> np.ndarray:
+    """PageRank sobre o grafo de similaridade entre frases."""
+    n = similarity.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    transition = np.divide(similarity, row_sums, out=np.full_like(similarity, 1.0 / n), where=row_sums > 0)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(MAX_ITERATIONS):
+        updated = (1 - DAMPING) / n + DAMPING * transition.T.dot(scores)
+        if np.abs(updated - scores).sum() < TOLERANCE:
+            scores = updated
+            break
+        scores = updated
+    return scores
+
+
+def _cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(term, 0.0) for term, weight in a.items())
+
+
+class ExtractiveSummarizer:
+    """Resumidor extrativo baseado em TF-IDF + TextRank com seleção limitada por tamanho."""
+
+    def __init__(self, chunk_sentences: int = CHUNK_SENTENCES, position_weight: float = POSITION_WEIGHT):
+        self.chunk_sentences = chunk_sentences
+        self.position_weight = position_weight
+
+    def _rank(self, indices: List[int], vectors: List[Dict[str, float]], total: int) -> np.ndarray:
+        """Score de cada frase do bloco: TextRank normalizado + um pequeno bônus de posição no documento."""
+        ranks = _textrank(_similarity_matrix([vectors[i] for i in indices]))
+        if ranks.size and ranks.max() > 0:
+            ranks = ranks / ranks.max()
+        positions = np.asarray(indices, dtype=np.float64) / max(total - 1, 1)
+        return (1 - self.position_weight) * ranks + self.position_weight * (1 - positions)
+
+    def _candidates(self, sentences: List[str], vectors: List[Dict[str, float]], max_length: int) -> List[int]:
+        """
+        Reduz documentos longos bloco a bloco: cada bloco mantém apenas as frases que poderiam
+        caber no resumo, até restar um único bloco.
+        """
+        indices = list(range(len(sentences)))
+        average_length = max(1.0, sum(len(s) for s in sentences) / max(len(sentences), 1))
+        keep_per_chunk = max(3, min(self.chunk_sentences // 4, math.ceil(max_length / average_length) + 2))
+
+        while len(indices) > self.chunk_sentences:
+            survivors = []
+            for start in range(0, len(indices), self.chunk_sentences):
+                chunk = indices[start:start + self.chunk_sentences]
+                scores = self._rank(chunk, vectors, len(sentences))
+                best = np.argsort(-scores, kind='stable')[:keep_per_chunk]
+                survivors.extend(chunk[i] for i in sorted(best))
+            indices = survivors
+        return indices
+
+    def summarize(self, text: str, max_length: int = 200) -> Dict[str, object]:
+        """
+        Gera um resumo com no máximo `max_length` caracteres.
+        Retorna {'summary', 'sentences_total', 'sentences_selected', 'chunked'}.
+        """
+        text = text or ''
+        sentences = split_sentences(text)
+        if len(text.strip()) <= max_length or len(sentences) <= 1:
+            summary = ' '.join(text.split())
+            if len(summary) > max_length:
+                summary = self._truncate(summary, max_length)
+            return {'summary': summary, 'sentences_total': len(sentences),
+                    'sentences_selected': len(sentences), 'chunked': False}
+
+        sentence_terms = [_terms(sentence) for sentence in sentences]
+        document_frequency: Dict[str, int] = {}
+        for terms in sentence_terms:
+            for term in set(terms):
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+        total = len(sentences)
+        idf = {term: math.log((1 + total) / (1 + df)) + 1 for term, df in document_frequency.items()}
+        vectors = _tfidf_vectors(sentence_terms, idf)
+
+        candidates = self._candidates(sentences, vectors, max_length)
+        scores = self._rank(candidates, vectors, total)
+
+        selected: List[int] = []
+        used = 0
+        for position in np.argsort(-scores, kind='stable'):
+            index = candidates[position]
+            cost = len(sentences[index]) + (1 if selected else 0)
+            if used + cost > max_length:
+                continue
+            if any(_cosine(vectors[index], vectors[chosen]) > REDUNDANCY_THRESHOLD for chosen in selected):
+                continue
+            selected.append(index)
+            used += cost
+
+        if selected:
+            summary = ' '.join(sentences[index] for index in sorted(selected))
+        else:
+            # Nenhuma frase cabe inteira: trunca a mais relevante
+            summary = self._truncate(sentences[candidates[int(np.argmax(scores))]], max_length)
+
+        return {
+            'summary': summary,
+            'sentences_total': total,
+            'sentences_selected': max(len(selected), 1),
+            'chunked': len(candidates) < total
+        }
+
+    @staticmethod
+    def _truncate(text: str, max_length: int) -> str:
+        if len(text) <= max_length:
+            return text
+        cut = text[:max(max_length - 1, 0)].rsplit(' ', 1)[0]
+        return cut.rstrip(' ,;:') + '…'
@@ -0,0 +1,151 @@
+# src/services/sync_executor.py
+"""
+Executor paralelo dos uploads da sincronização com a nuvem.
+
+Cada arquivo (tarefas, projetos, configurações) de cada provedor é uma `ArtifactTask`
+independente, executada em um pool de threads compartilhado pelo processo:
+
+- o pool tem tamanho fixo (CLOUD_SYNC_WORKERS), então várias sincronizações simultâneas
+  disputam as mesmas threads em vez de abrir conexões sem limite;
+- cada provedor tem um teto de uploads simultâneos (CLOUD_SYNC_PROVIDER_CONCURRENCY,
+  ex: "dropbox=2,google_drive=4"), para respeitar os limites de taxa de cada API;
+- um arquivo que falha é refeito sozinho, com backoff, até CLOUD_SYNC_ARTIFACT_ATTEMPTS
+  vezes; os que já deram certo não são reenviados.
+
+As tarefas só fazem chamadas de rede: consultas e gravações no banco ficam na thread
+que chamou `run` (ver `CloudSyncManager.sync_connections`).
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from src.services import telemetry
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = int(os.environ.get('CLOUD_SYNC_WORKERS', '8'))
+DEFAULT_PROVIDER_CONCURRENCY = 3
+MAX_ATTEMPTS = int(os.environ.get('CLOUD_SYNC_ARTIFACT_ATTEMPTS', '3'))
+RETRY_BASE_SECONDS = float(os.environ.get('CLOUD_SYNC_RETRY_BASE_SECONDS', '1.0'))
+
+
+def parse_provider_limits(value: Optional[str]) -> Dict[str, int]:
+    """Lê limites no formato "dropbox=2,google_drive=4"."""
+    limits = {}
+    for item in (value or '').split(','):
+        name, _, limit = item.partition('=')
+        if name.strip() and limit.strip().isdigit():
+            limits[name.strip()] = max(1, int(limit))
+    return limits
+
+
+@dataclass
+class ArtifactTask:
+    """Upload de um arquivo para um provedor. `run` não recebe argumentos e retorna o resultado do upload."""
+    provider: str
+    artifact: str
+    run: Callable[[], Dict[str, Any]]
+    attempts: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    duration: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.result is not None
+
+
+@dataclass
+class Once:
+    """Valor calculado uma única vez e compartilhado entre tarefas (ex: a pasta do Lex Flow no provedor).
+    Uma falha não fica guardada: a próxima tentativa calcula de novo."""
+    factory: Callable[[], Any]
+    _value: Any = None
+    _done: bool = False
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def get(self) -> Any:
+        if not self._done:
+            with self._lock:
+                if not self._done:
+                    self._value = self.factory()
+                    self._done = True
+        return self._value
+
+
+class SyncExecutor:
+    """Pool limitado, com teto por provedor e retentativa por arquivo."""
+
+    def __init__(self, max_workers: int = None, provider_limits: Dict[str, int] = None,
+                 max_attempts: int = None, retry_base: float = None, sleep: Callable[[float], None] = time.sleep):
+        self.max_workers = max_workers or MAX_WORKERS
+        self.provider_limits = provider_limits if provider_limits is not None else parse_provider_limits(
+            os.environ.get('CLOUD_SYNC_PROVIDER_CONCURRENCY'))
+        self.max_attempts = max_attempts or MAX_ATTEMPTS
+        self.retry_base = retry_base if retry_base is not None else RETRY_BASE_SECONDS
+        self.sleep = sleep
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='cloud-sync')
+        return self._pool
+
+    def _semaphore(self, provider: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if provider not in self._semaphores:
+                limit = self.provider_limits.get(provider, DEFAULT_PROVIDER_CONCURRENCY)
+                self._semaphores[provider] = threading.BoundedSemaphore(limit)
+            return self._semaphores[provider]
+
+    def _execute(self, task: ArtifactTask, labels: Dict[str, str]) -> ArtifactTask:
+        semaphore = self._semaphore(task.provider)
+        started = time.perf_counter()
+        while True:
+            task.attempts += 1
+            # A vaga do provedor é liberada durante o backoff
+            with semaphore:
+                try:
+                    task.result, task.error = task.run(), None
+                except Exception as e:
+                    task.error = str(e) or e.__class__.__name__
+            if task.error is None or task.attempts >= self.max_attempts:
+                break
+            logger.warning("Upload de %s para %s falhou (tentativa %d): %s",
+                           task.artifact, task.provider, task.attempts, task.error)
+            telemetry.http_retries.inc(reason='artifact', **dict(labels, provider=task.provider, operation=task.artifact))
+            self.sleep(random.uniform(0, self.retry_base * (2 ** (task.attempts - 1))))
+        task.duration = time.perf_counter() - started
+        return task
+
+    def run(self, tasks: Iterable[ArtifactTask]) -> List[ArtifactTask]:
+        """Executa as tarefas em paralelo e espera todas terminarem (com sucesso ou não)."""
+        tasks = list(tasks)
+        # Os rótulos de contexto (tenant) vêm da thread da requisição
+        labels = telemetry.context_labels()
+        wait([self.pool.submit(self._execute, task, labels) for task in tasks])
+        return tasks
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+
+sync_executor = SyncExecutor()
@@ -0,0 +1,221 @@
+# src/services/sync_scheduler.py
+"""
+Sincronização e backup automáticos das conexões de nuvem, conforme `sync_settings`:
+
+    {'auto_sync': True, 'backup_frequency': 'daily'}    # 'hourly', 'daily' ou 'weekly'
+
+Cada conexão guarda a próxima execução em `cloud_sync.next_sync_at` (coluna indexada).
+A cada CLOUD_SCHEDULER_INTERVAL segundos o agendador busca as conexões vencidas, já
+reagenda cada uma (o que também funciona como "reserva" entre processos, com
+SELECT ... FOR UPDATE SKIP LOCKED no PostgreSQL) e as entrega a um pool de threads de
+tamanho fixo (CLOUD_SCHEDULER_WORKERS). Só busca tantas quantas o pool tem livres.
+
+Para não concentrar milhares de backups no mesmo horário:
+- a primeira execução cai em um ponto aleatório do primeiro intervalo;
+- cada reagendamento varia ±CLOUD_SCHEDULER_JITTER (fração do intervalo);
+- o início das sincronizações de cada provedor passa por um token bucket
+  (CLOUD_SCHEDULER_PROVIDER_RATES, ex: "dropbox=2/s,onedrive=60/m").
+
+Cada execução (`run_sync`; em routes/cloud.py, `run_scheduled_backup`) faz a sincronização
+incremental e grava uma nova versão do backup .lexflow. Uma execução que falha é tentada de
+novo em CLOUD_SCHEDULER_RETRY_MINUTES (ou no próximo intervalo, se for menor). `last_sync` e
+`sync_status` são gravados pela própria sincronização (`run_provider_sync`).
+"""
+
+import logging
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src import db
+from src.utils.rate_limit import RateLimiter, parse_rates
+
+logger = logging.getLogger(__name__)
+
+FREQUENCIES = {
+    'hourly': timedelta(hours=1),
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+}
+DEFAULT_FREQUENCY = 'daily'
+INTERVAL_SECONDS = float(os.environ.get('CLOUD_SCHEDULER_INTERVAL', '30'))
+MAX_WORKERS = int(os.environ.get('CLOUD_SCHEDULER_WORKERS', '4'))
+JITTER = float(os.environ.get('CLOUD_SCHEDULER_JITTER', '0.1'))
+RETRY_AFTER = timedelta(minutes=int(os.environ.get('CLOUD_SCHEDULER_RETRY_MINUTES', '30')))
+DEFAULT_PROVIDER_RATE = os.environ.get('CLOUD_SCHEDULER_DEFAULT_RATE', '5/s')
+
+RunSync = Callable[[int, str], Tuple[Dict[str, Any], int]]
+
+
+def sync_interval(settings: Optional[Dict[str, Any]]) -> Optional[timedelta]:
+    """Intervalo da sincronização automática; None se ela está desligada."""
+    settings = settings or {}
+    if not settings.get('auto_sync', False):
+        return None
+    return FREQUENCIES.get(settings.get('backup_frequency') or DEFAULT_FREQUENCY, FREQUENCIES[DEFAULT_FREQUENCY])
+
+
+def next_sync_time(interval: timedelta, now: datetime, first: bool = False, jitter: float = JITTER) -> datetime:
+    """
+    Próxima execução: na primeira, um ponto aleatório do intervalo (espalha conexões
+    criadas juntas); nas seguintes, um intervalo com variação de ±`jitter`.
+    """
+    if first:
+        return now + interval * random.random()
+    return now + interval * (1 + random.uniform(-jitter, jitter))
+
+
+class SyncScheduler:
+    """Agendador das sincronizações automáticas (ver a descrição do módulo)."""
+
+    def __init__(self, run_sync: RunSync, max_workers: int = MAX_WORKERS,
+                 provider_rates: Optional[Dict[str, str]] = None, default_rate: Optional[str] = DEFAULT_PROVIDER_RATE):
+        self.run_sync = run_sync
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(
+            parse_rates(os.environ.get('CLOUD_SCHEDULER_PROVIDER_RATES')) if provider_rates is None else provider_rates,
+            default=default_rate
+        )
+        self.app = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def init_app(self, app):
+        self.app = app
+
+    @staticmethod
+    def schedule(cloud_sync, now: datetime = None, first: bool = False):
+        """Recalcula `next_sync_at` pelas configurações atuais da conexão (o chamador faz o commit)."""
+        interval = sync_interval(cloud_sync.sync_settings) if cloud_sync.sync_enabled else None
+        cloud_sync.next_sync_at = next_sync_time(interval, now or datetime.utcnow(), first) if interval else None
+
+    def backfill(self) -> int:
+        """Agenda as conexões com sincronização automática que ainda não têm `next_sync_at` (ex: anteriores à coluna)."""
+        from src.models.cloud_sync import CloudSync
+
+        pending = CloudSync.query.filter(CloudSync.sync_enabled.is_(True), CloudSync.next_sync_at.is_(None)).all()
+        now = datetime.utcnow()
+        scheduled = 0
+        for cloud_sync in pending:
+            self.schedule(cloud_sync, now, first=True)
+            scheduled += cloud_sync.next_sync_at is not None
+        db.session.commit()
+        return scheduled
+
+    def claim_due(self, limit: int, now: datetime = None) -> List[Tuple[int, int, str]]:
+        """
+        Reserva até `limit` conexões vencidas, mais atrasadas primeiro, já as reagendando
+        para o próximo intervalo. Retorna [(id, user_id, provider)].
+        """
+        from src.models.cloud_sync import CloudSync
+
+        if limit <= 0:
+            return []
+        now = now or datetime.utcnow()
+        due = (CloudSync.query
+               .filter(CloudSync.sync_enabled.is_(True), CloudSync.next_sync_at <= now)
+               .order_by(CloudSync.next_sync_at)
+               .limit(limit)
+               .with_for_update(skip_locked=True)
+               .all())
+        claimed = []
+        for cloud_sync in due:
+            self.schedule(cloud_sync, now)
+            if cloud_sync.next_sync_at is not None:
+                claimed.append((cloud_sync.id, cloud_sync.user_id, cloud_sync.provider))
+        db.session.commit()
+        return claimed
+
+    def _pool_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='cloud-scheduler')
+            return self._pool
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def tick(self, now: datetime = None) -> int:
+        """Reserva as conexões vencidas que cabem no pool e as envia para sincronizar. Retorna quantas."""
+        with self._lock:
+            free = self.max_workers - self._in_flight
+        claimed = self.claim_due(free, now)
+        pool = self._pool_executor()
+        for item in claimed:
+            with self._lock:
+                self._in_flight += 1
+            pool.submit(self._run, *item)
+        if claimed:
+            logger.info("Sincronizações automáticas iniciadas: %d", len(claimed))
+        return len(claimed)
+
+    def _run(self, cloud_sync_id: int, user_id: int, provider: str):
+        try:
+            self.limiter.acquire(provider)
+            with self.app.app_context():
+                try:
+                    body, status = self.run_sync(user_id, provider)
+                    if status != 200 or not body.get('success'):
+                        logger.warning("Sincronização automática da conexão %s (%s) falhou: %s",
+                                       cloud_sync_id, provider, body.get('error'))
+                        self._retry_soon(cloud_sync_id)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error("Erro na sincronização automática da conexão %s: %s", cloud_sync_id, e)
+                    self._retry_soon(cloud_sync_id)
+                finally:
+                    db.session.remove()
+        finally:
+            self._release()
+
+    @staticmethod
+    def _retry_soon(cloud_sync_id: int):
+        """Antecipa a próxima tentativa após uma falha (sem passar do próximo intervalo já agendado)."""
+        from src.models.cloud_sync import CloudSync
+
+        cloud_sync = db.session.get(CloudSync, cloud_sync_id)
+        if cloud_sync is None or cloud_sync.next_sync_at is None:
+            return
+        retry_at = next_sync_time(RETRY_AFTER, datetime.utcnow())
+        if retry_at < cloud_sync.next_sync_at:
+            cloud_sync.next_sync_at = retry_at
+            db.session.commit()
+
+    def run(self, interval: float = INTERVAL_SECONDS, stop_event: Optional[threading.Event] = None):
+        """Laço do agendador."""
+        stop_event = stop_event or self._stop_event
+        with self.app.app_context():
+            try:
+                self.backfill()
+            except Exception as e:
+                db.session.rollback()
+                logger.error("Erro ao agendar as conexões existentes: %s", e)
+            finally:
+                db.session.remove()
+        while not stop_event.is_set():
+            with self.app.app_context():
+                try:
+                    self.tick()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error("Erro no agendador de sincronizações: %s", e)
+                finally:
+                    db.session.remove()
+            stop_event.wait(interval)
+
+    def start(self, interval: float = INTERVAL_SECONDS):
+        """Inicia o agendador em uma thread daemon dentro do próprio processo."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self.run, kwargs={'interval': interval},
+                                            name='cloud-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,169 @@
+# src/services/task_context.py
+"""
+Contexto das sugestões de tarefas montado no servidor.
+
+O cliente envia só a intenção ("preparar a apresentação de sexta") e o servidor busca
+o que é relevante para ela, em consultas indexadas e de colunas enxutas:
+- tarefas abertas do usuário, ordenadas pela combinação de similaridade com a
+  intenção e score de prioridade (PriorityScoringEngine);
+- conclusões recentes, ordenadas por similaridade e recência;
+- seções do framework TELOS mais próximas da intenção;
+- anotações, revisões e vídeos relacionados, via índice semântico.
+
+Cada grupo entra com um número fixo de itens (os mais relevantes), e o ContextBuilder
+garante o orçamento de tokens do prompt, então o tamanho não cresce com o histórico.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from src import db
+from src.services.priority_scoring import PriorityScoringEngine
+from src.services.semantic_index import get_embedder, semantic_index
+
+logger = logging.getLogger(__name__)
+
+# Quantos candidatos buscar no banco e quantos levar ao prompt, por grupo
+OPEN_CANDIDATES = 200
+OPEN_SELECTED = 10
+COMPLETED_WINDOW_DAYS = 30
+COMPLETED_CANDIDATES = 100
+COMPLETED_SELECTED = 8
+RELATED_NOTES = 6
+FRAMEWORK_SECTIONS = 6
+
+# Peso da similaridade com a intenção frente ao score de prioridade/recência (0 a 1)
+RELEVANCE_WEIGHT = 0.6
+RECENCY_HALF_LIFE_DAYS = 7.0
+
+
+def _similarities(intent: str, texts: List[str]) -> np.ndarray:
+    """Similaridade de cosseno entre a intenção e cada texto (0 sem intenção)."""
+    if not intent or not texts:
+        return np.zeros(len(texts), dtype=np.float32)
+    embedder = get_embedder()
+    vectors = embedder.embed([intent] + texts)
+    return np.clip(vectors[1:] @ vectors[0], 0.0, 1.0)
+
+
+def _blend(similarity: np.ndarray, secondary: np.ndarray, has_intent: bool) -> np.ndarray:
+    if not has_intent:
+        return secondary
+    return RELEVANCE_WEIGHT * similarity + (1 - RELEVANCE_WEIGHT) * secondary
+
+
+def _task_text(row: Any) -> str:
+    return f"{row.title or ''}. {row.description or ''} {row.category or ''}"
+
+
+class TaskContextAssembler:
+    """Busca e ranqueia o histórico do usuário para o prompt de sugestões de tarefas."""
+
+    def __init__(self, priority_engine: Optional[PriorityScoringEngine] = None):
+        self.priority_engine = priority_engine or PriorityScoringEngine()
+
+    def open_tasks(self, user, intent: str, priority_categories=()) -> List[Dict[str, Any]]:
+        from src.models.project import Task
+
+        rows = db.session.query(
+            Task.id, Task.title, Task.description, Task.status, Task.category,
+            Task.priority, Task.due_date, Task.estimated_time
+        ).filter(
+            Task.created_by == user.id, Task.status != 'completed'
+        ).order_by(Task.updated_at.desc()).limit(OPEN_CANDIDATES).all()
+        if not rows:
+            return []
+
+        scored = self.priority_engine.score_tasks([row._asdict() for row in rows], priority_categories)
+        priority = np.zeros(len(rows), dtype=np.float32)
+        for result in scored:
+            priority[result['index']] = result['priority_score']
+        if priority.max() > 0:
+            priority /= priority.max()
+
+        similarity = _similarities(intent, [_task_text(row) for row in rows])
+        ranking = _blend(similarity, priority, bool(intent))
+        return [
+            {
+                'title': rows[index].title,
+                'description': rows[index].description,
+                'status': rows[index].status,
+                'category': rows[index].category,
+                'priority': rows[index].priority,
+                'due_date': rows[index].due_date,
+                'estimated_time': rows[index].estimated_time
+            }
+            for index in self.priority_engine.top_k(ranking, OPEN_SELECTED)
+        ]
+
+    def completed_tasks(self, user, intent: str, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        from src.models.project import Task
+
+        now = now or datetime.utcnow()
+        rows = db.session.query(
+            Task.title, Task.description, Task.category, Task.completed_at
+        ).filter(
+            Task.created_by == user.id, Task.status == 'completed',
+            Task.completed_at >= now - timedelta(days=COMPLETED_WINDOW_DAYS)
+        ).order_by(Task.completed_at.desc()).limit(COMPLETED_CANDIDATES).all()
+        if not rows:
+            return []
+
+        age_days = np.array([(now - row.completed_at).total_seconds() / 86400 for row in rows], dtype=np.float32)
+        recency = np.power(0.5, age_days / RECENCY_HALF_LIFE_DAYS)
+        similarity = _similarities(intent, [_task_text(row) for row in rows])
+        ranking = _blend(similarity, recency, bool(intent))
+        selected = sorted(self.priority_engine.top_k(ranking, COMPLETED_SELECTED), key=lambda index: -age_days[index])
+        return [
+            {'title': rows[index].title, 'category': rows[index].category, 'completed_at': rows[index].completed_at}
+            for index in selected
+        ]
+
+    def goals(self, user, intent: str) -> Dict[str, Any]:
+        """Seções do framework TELOS, das mais próximas da intenção para as menos."""
+        from src.models.telos import TelosFramework
+
+        framework = TelosFramework.query.filter_by(user_id=user.id).first()
+        if not framework or not isinstance(framework.content, dict):
+            return {}
+        sections = [(key, value) for key, value in framework.content.items() if value]
+        if not intent:
+            return dict(sections[:FRAMEWORK_SECTIONS])
+        similarity = _similarities(intent, [f"{key} {value}" for key, value in sections])
+        order = np.argsort(-similarity, kind='stable')[:FRAMEWORK_SECTIONS]
+        return {sections[index][0]: sections[index][1] for index in order}
+
+    def related_notes(self, user, intent: str) -> List[Dict[str, Any]]:
+        if not intent:
+            return []
+        try:
+            results = semantic_index.search(
+                user.tenant_id, user.id, intent, RELATED_NOTES,
+                kinds=['quick_note', 'telos_review', 'study_video']
+            )
+            # O título de uma anotação rápida é o próprio início do texto
+            return [
+                {'content': item['snippet']} if item['kind'] == 'quick_note'
+                else {'title': item['title'], 'content': item['snippet']}
+                for item in semantic_index.hydrate(results)
+            ]
+        except Exception as e:
+            logger.warning("Busca semântica indisponível para o contexto de tarefas: %s", e)
+            return []
+
+    def assemble(self, user, intent: str = '', preferences: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Contexto no mesmo formato que o cliente enviava, pronto para `AIService.get_task_suggestions`."""
+        preferences = preferences or {}
+        intent = (intent or '').strip()
+        priority_categories = preferences.get('priority_categories', [])
+        return {
+            'current_tasks': self.open_tasks(user, intent, priority_categories),
+            'completed_tasks': self.completed_tasks(user, intent),
+            'goals': self.goals(user, intent),
+            'related_notes': self.related_notes(user, intent),
+            'preferences': preferences,
+            'additional_context': intent
+        }
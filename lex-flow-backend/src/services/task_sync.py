@@ -0,0 +1,268 @@
+# src/services/task_sync.py
+"""
+Sincronização em lote das tarefas com GitHub, Trello e Notion (/api/integrations/sync/tasks).
+
+1. As tarefas do usuário são lidas em uma consulta, e os vínculos já existentes
+   (`external_task_links`) em outra.
+2. Para cada tarefa e alvo, o hash do conteúdo enviado é comparado com o do vínculo:
+   tarefas sem vínculo viram criações, as alteradas viram atualizações e as demais são puladas.
+3. As chamadas vão para o pool do alvo (INTEGRATIONS_SYNC_WORKERS threads por alvo,
+   compartilhadas entre os usuários). O limite de taxa é aplicado antes do envio ao pool,
+   pela thread que conduz a sincronização: uma chamada só entra no pool quando o token bucket
+   do usuário naquele alvo libera, e cada usuário tem no máximo INTEGRATIONS_SYNC_WORKERS
+   chamadas por alvo no pool. Assim nenhuma thread do pool fica parada esperando o limite de
+   um usuário. Os limites padrão seguem os das APIs (GitHub 5000/h, Notion 3/s,
+   Trello 100/10s) e podem ser trocados em INTEGRATIONS_SYNC_RATES (ex: "github=80/m,notion=2/s").
+4. Os resultados voltam por tarefa, assim que todos os alvos dela terminam. Os vínculos são
+   gravados pela thread que conduz a sincronização (a sessão do banco não é compartilhada com
+   os pools), com commit a cada COMMIT_EVERY resultados.
+
+Sincronizações com mais de INTEGRATIONS_SYNC_INLINE_LIMIT tarefas vão para a fila de jobs
+(job 'integrations.sync_tasks') em vez de prender a requisição.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, Iterator, Optional, Tuple
+
+from src import db
+from src.services.integrations import IntegrationsService
+from src.utils.rate_limit import RateLimiter, parse_rates
+
+logger = logging.getLogger(__name__)
+
+TARGETS = {
+    # alvo: (nome exibido, chave do destino em syncTargets)
+    'github': ('GitHub', 'github_repo'),
+    'trello': ('Trello', 'trello_list'),
+    'notion': ('Notion', 'notion_database'),
+}
+DESTINATION_KEYS = tuple(key for _, key in TARGETS.values())
+DEFAULT_RATES = {'github': '5000/h', 'notion': '3/s', 'trello': '100/10s'}
+MAX_WORKERS = int(os.environ.get('INTEGRATIONS_SYNC_WORKERS', '4'))
+COMMIT_EVERY = int(os.environ.get('INTEGRATIONS_SYNC_COMMIT_EVERY', '100'))
+INLINE_LIMIT = int(os.environ.get('INTEGRATIONS_SYNC_INLINE_LIMIT', '200'))
+
+# Campos que vão para o serviço externo: só mudanças neles disparam uma atualização
+SYNCED_FIELDS = ('title', 'description', 'priority', 'category', 'due_date', 'completed')
+
+
+def task_payload(task) -> Dict[str, Any]:
+    """Tarefa no formato esperado pelos métodos `sync_task_to_*` do IntegrationsService."""
+    payload = task.to_dict()
+    payload['completed'] = task.status == 'completed'
+    return payload
+
+
+def content_hash(payload: Dict[str, Any]) -> str:
+    content = {field: payload.get(field) for field in SYNCED_FIELDS}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def send_task(service: IntegrationsService, target: str, payload: Dict[str, Any], destination: str,
+              external_id: Optional[str] = None) -> Dict[str, Any]:
+    """Cria (ou atualiza, com `external_id`) o item da tarefa no alvo. Retorna {} se a API falhou."""
+    if target == 'github':
+        return service.sync_task_to_github_issue(payload, destination, int(external_id) if external_id else None)
+    if target == 'trello':
+        return service.sync_task_to_trello_card(payload, destination, external_id)
+    return service.sync_task_to_notion_page(payload, destination, external_id)
+
+
+def external_id_of(target: str, result: Dict[str, Any]) -> str:
+    # Issues são endereçadas pelo número no repositório, não pelo ID global
+    return str(result['number'] if target == 'github' else result['id'])
+
+
+# (tarefa, alvo, destino, hash, payload, id externo a atualizar)
+Call = Tuple[int, str, str, str, Dict[str, Any], Optional[str]]
+
+
+class TaskSyncDispatcher:
+    """Pools por alvo, compartilhados entre as requisições, com um token bucket por usuário e alvo."""
+
+    def __init__(self, rates: Optional[Dict[str, str]] = None, max_workers: int = MAX_WORKERS):
+        configured = parse_rates(os.environ.get('INTEGRATIONS_SYNC_RATES')) if rates is None else rates
+        rates = dict(DEFAULT_RATES, **configured)
+        # Os limites das APIs valem por token, então cada usuário tem o próprio balde
+        self.limiters = {target: RateLimiter({}, default=rates.get(target)) for target in TARGETS}
+        self.max_workers = max_workers
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, target: str) -> ThreadPoolExecutor:
+        with self._lock:
+            if target not in self._pools:
+                self._pools[target] = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                         thread_name_prefix=f'task-sync-{target}')
+            return self._pools[target]
+
+    def _submit(self, user_id: int, service: IntegrationsService, queues: Dict[str, Deque[Call]],
+                in_flight: Dict[str, int], pending: Dict[Future, Call]) -> Optional[float]:
+        """
+        Envia aos pools as chamadas que o limite do usuário já permite. Retorna em quantos
+        segundos o próximo balde libera (None se nenhuma chamada ficou esperando o limite).
+        """
+        retry_in = None
+        for target, queue in queues.items():
+            bucket = self.limiters[target].bucket(str(user_id))
+            while queue and in_flight[target] < self.max_workers:
+                delay = bucket.try_acquire() if bucket else 0.0
+                if delay:
+                    retry_in = delay if retry_in is None else min(retry_in, delay)
+                    break
+                call = queue.popleft()
+                _, _, destination, _, payload, external_id = call
+                future = self._pool(target).submit(send_task, service, target, payload, destination, external_id)
+                pending[future] = call
+                in_flight[target] += 1
+        return retry_in
+
+    @staticmethod
+    def active_targets(service: IntegrationsService, destinations: Dict[str, Any]) -> Tuple[Dict[str, str], list]:
+        """Alvos com destino informado e credenciais configuradas: ({alvo: destino}, [erros])."""
+        available = service.get_available_integrations()
+        active, errors = {}, []
+        for target, (label, key) in TARGETS.items():
+            destination = str(destinations.get(key) or '').strip()
+            if not destination:
+                continue
+            if available[target]:
+                active[target] = destination
+            else:
+                errors.append({'target': target, 'error': f'Credenciais do {label} não configuradas.'})
+        return active, errors
+
+    def sync(self, user_id: int, destinations: Dict[str, Any], credentials: Dict[str, str]) -> Iterator[Dict[str, Any]]:
+        """
+        Sincroniza as tarefas do usuário. Gera um evento por tarefa
+        ({'task_id', 'title', 'results': {alvo: {'action', ...}}}) e, no fim, o resumo ({'done': True, ...}).
+        Se o consumidor parar no meio, as chamadas que ainda não começaram são canceladas.
+        """
+        from src.models.integration import ExternalTaskLink
+        from src.models.project import Task
+
+        service = IntegrationsService(credentials)
+        active, errors = self.active_targets(service, destinations)
+        yield from errors
+        counts = {'created': 0, 'updated': 0, 'unchanged': 0, 'failed': 0}
+        tasks = Task.query.filter_by(created_by=user_id).order_by(Task.id).all() if active else []
+        links = {
+            (link.task_id, link.target): link
+            for link in ExternalTaskLink.query.filter(ExternalTaskLink.user_id == user_id,
+                                                      ExternalTaskLink.target.in_(list(active))).all()
+        } if tasks else {}
+
+        titles: Dict[int, str] = {}
+        results: Dict[int, Dict[str, Dict[str, Any]]] = {}
+        waiting: Dict[int, int] = {}
+        queues: Dict[str, Deque[Call]] = {target: deque() for target in active}
+        for task in tasks:
+            payload = task_payload(task)
+            digest = content_hash(payload)
+            titles[task.id] = task.title
+            results[task.id] = {}
+            for target, destination in active.items():
+                link = links.get((task.id, target))
+                same_place = link is not None and link.destination == destination
+                if same_place and link.content_hash == digest:
+                    results[task.id][target] = {'action': 'unchanged', 'id': link.external_id, 'url': link.url}
+                    counts['unchanged'] += 1
+                    continue
+                queues[target].append((task.id, target, destination, digest, payload,
+                                       link.external_id if same_place else None))
+                waiting[task.id] = waiting.get(task.id, 0) + 1
+
+        def task_event(task_id):
+            return {'task_id': task_id, 'title': titles[task_id], 'results': results.pop(task_id)}
+
+        in_flight = {target: 0 for target in active}
+        pending: Dict[Future, Call] = {}
+        try:
+            # Tarefas sem nenhuma chamada pendente já estão prontas
+            for task_id in [task_id for task_id in results if task_id not in waiting]:
+                yield task_event(task_id)
+
+            written = 0
+            while pending or any(queues.values()):
+                retry_in = self._submit(user_id, service, queues, in_flight, pending)
+                if not pending:
+                    time.sleep(retry_in or 0)
+                    continue
+                done, _ = wait(list(pending), timeout=retry_in, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task_id, target, destination, digest, _, _ = pending.pop(future)
+                    in_flight[target] -= 1
+                    link = links.get((task_id, target))
+                    updating = link is not None and link.destination == destination
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error("Erro ao sincronizar a tarefa %s com %s: %s", task_id, target, e)
+                        result = {}
+                    if result:
+                        action = 'updated' if updating else 'created'
+                        links[(task_id, target)] = self._remember(link, user_id, task_id, target, destination,
+                                                                  digest, result)
+                        results[task_id][target] = {'action': action, 'id': external_id_of(target, result),
+                                                    'url': result.get('url')}
+                        written += 1
+                        if written % COMMIT_EVERY == 0:
+                            db.session.commit()
+                    else:
+                        action = 'failed'
+                        results[task_id][target] = {
+                            'action': action, 'error': f'Falha ao sincronizar a tarefa com o {TARGETS[target][0]}.'
+                        }
+                    counts[action] += 1
+                    waiting[task_id] -= 1
+                    if not waiting[task_id]:
+                        yield task_event(task_id)
+        finally:
+            for future in pending:
+                future.cancel()
+            db.session.commit()
+
+        logger.info("Tarefas do usuário %s sincronizadas com %s: %s", user_id, ', '.join(active) or '-', counts)
+        yield dict(done=True, synced_tasks=len(tasks), **counts)
+
+    @staticmethod
+    def _remember(link, user_id: int, task_id: int, target: str, destination: str, digest: str,
+                  result: Dict[str, Any]):
+        from src.models.integration import ExternalTaskLink
+
+        if link is None:
+            link = ExternalTaskLink(user_id=user_id, task_id=task_id, target=target)
+            db.session.add(link)
+        link.destination = destination
+        link.external_id = external_id_of(target, result)
+        link.url = result.get('url')
+        link.content_hash = digest
+        link.synced_at = datetime.utcnow()
+        return link
+
+
+def summarize(events: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Consome os eventos e monta a resposta única (formato usado pela tela de integrações)."""
+    summary = {'synced_tasks': 0, 'results': {target: [] for target in TARGETS}}
+    summary['results']['errors'] = []
+    for event in events:
+        if event.get('done'):
+            summary.update({key: value for key, value in event.items() if key != 'done'})
+        elif 'task_id' not in event:
+            summary['results']['errors'].append(event['error'])
+        else:
+            for target, result in event['results'].items():
+                if result['action'] == 'failed':
+                    summary['results']['errors'].append(f"Tarefa '{event['title']}': {result['error']}")
+                elif result['action'] != 'unchanged':
+                    summary['results'][target].append({'task_id': event['task_id'], 'id': result['id'],
+                                                       'url': result['url'], 'action': result['action']})
+    return summary
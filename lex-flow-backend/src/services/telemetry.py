@@ -0,0 +1,255 @@
+# src/services/telemetry.py
+"""
+Telemetria das chamadas aos modelos de IA, exposta em /metrics no formato de texto do Prometheus.
+
+Registra, por provedor, operação, endpoint e tenant:
+- latência de cada chamada (histograma) e o total de chamadas por status;
+- tokens de entrada e de saída (do `usage` da resposta ou, na falta dele, estimados);
+- falhas ao interpretar o JSON retornado pelo modelo;
+- acertos e faltas dos caches de respostas;
+- uso de fallback (Gemini -> OpenAI, IA -> resposta estática).
+
+Também mede as chamadas HTTP aos provedores de nuvem (latência, status e retentativas),
+registradas pela camada de transporte em http_transport.py.
+
+O endpoint e o tenant vêm de variáveis de contexto preenchidas a cada requisição
+(`init_app` e os decoradores `token_required`), então os serviços não precisam
+recebê-los como parâmetro. As métricas ficam em memória, por processo.
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+current_endpoint = contextvars.ContextVar('telemetry_endpoint', default='none')
+current_tenant = contextvars.ContextVar('telemetry_tenant', default='none')
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def set_endpoint(endpoint: Optional[str]):
+    current_endpoint.set(endpoint or 'none')
+
+
+def set_tenant(tenant_id: Any):
+    current_tenant.set(str(tenant_id) if tenant_id is not None else 'none')
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[str, str] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    """Contador monotônico com labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(name, 'none')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels.get(name, 'none')) for name in self.labelnames), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Histograma com buckets cumulativos, soma e contagem, por combinação de labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._values: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, amount: float, **labels):
+        key = tuple(str(labels.get(name, 'none')) for name in self.labelnames)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if amount <= bound:
+                    series['counts'][index] += 1
+                    break
+            series['sum'] += amount
+            series['count'] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, dict(series, counts=list(series['counts']))) for key, series in self._values.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series['counts']):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ('le', _format_number(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {series['sum']:.6f}")
+            lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+_CALL_LABELS = ('provider', 'operation', 'endpoint', 'tenant')
+
+llm_request_duration = registry.register(Histogram(
+    'lexflow_llm_request_duration_seconds', 'Latência das chamadas aos provedores de IA.', _CALL_LABELS
+))
+llm_requests = registry.register(Counter(
+    'lexflow_llm_requests_total', 'Chamadas aos provedores de IA por status.', _CALL_LABELS + ('status',)
+))
+llm_tokens = registry.register(Counter(
+    'lexflow_llm_tokens_total', 'Tokens consumidos por tipo (prompt/completion).', _CALL_LABELS + ('kind',)
+))
+llm_parse_failures = registry.register(Counter(
+    'lexflow_llm_parse_failures_total', 'Respostas de IA cujo JSON não pôde ser interpretado.', _CALL_LABELS
+))
+llm_fallbacks = registry.register(Counter(
+    'lexflow_llm_fallbacks_total', 'Uso de fallback entre provedores ou para respostas estáticas.',
+    ('operation', 'from_provider', 'to_provider', 'endpoint', 'tenant')
+))
+cache_requests = registry.register(Counter(
+    'lexflow_cache_requests_total', 'Consultas aos caches de respostas de IA.', ('cache', 'result', 'endpoint', 'tenant')
+))
+
+_HTTP_LABELS = ('provider', 'operation', 'endpoint', 'tenant')
+
+http_request_duration = registry.register(Histogram(
+    'lexflow_http_request_duration_seconds', 'Latência de cada tentativa de chamada HTTP aos provedores de nuvem.',
+    _HTTP_LABELS
+))
+http_requests = registry.register(Counter(
+    'lexflow_http_requests_total', 'Tentativas de chamadas HTTP aos provedores de nuvem por status.',
+    _HTTP_LABELS + ('status',)
+))
+http_retries = registry.register(Counter(
+    'lexflow_http_retries_total', 'Retentativas de chamadas HTTP aos provedores de nuvem por motivo.',
+    _HTTP_LABELS + ('reason',)
+))
+
+
+def context_labels() -> Dict[str, str]:
+    return {'endpoint': current_endpoint.get(), 'tenant': current_tenant.get()}
+
+
+def extract_usage(response: Any) -> Tuple[Optional[int], Optional[int]]:
+    """Tokens (prompt, completion) informados pela resposta do Gemini ou da OpenAI, se houver."""
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        return getattr(usage, 'prompt_tokens', None), getattr(usage, 'completion_tokens', None)
+    metadata = getattr(response, 'usage_metadata', None)
+    if metadata is not None:
+        return getattr(metadata, 'prompt_token_count', None), getattr(metadata, 'candidates_token_count', None)
+    return None, None
+
+
+class LLMCall:
+    """Resultado de uma chamada em andamento, preenchido dentro de `track_llm_call`."""
+
+    def __init__(self, prompt: str = ''):
+        self.prompt = prompt
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+        self.completion_text = ''
+
+    def record_response(self, response: Any, text: str = ''):
+        self.prompt_tokens, self.completion_tokens = extract_usage(response)
+        self.completion_text = text or ''
+
+
+@contextmanager
+def track_llm_call(provider: str, operation: str, prompt: str = ''):
+    """Mede a latência, o status e os tokens de uma chamada ao provedor."""
+    from src.services.ai_batch import estimate_tokens
+
+    labels = dict(context_labels(), provider=provider, operation=operation)
+    call = LLMCall(prompt)
+    started = time.perf_counter()
+    status = 'success'
+    try:
+        yield call
+    except Exception:
+        status = 'error'
+        raise
+    finally:
+        llm_request_duration.observe(time.perf_counter() - started, **labels)
+        llm_requests.inc(status=status, **labels)
+        prompt_tokens = call.prompt_tokens if call.prompt_tokens is not None else (
+            estimate_tokens(prompt) if prompt else 0)
+        completion_tokens = call.completion_tokens if call.completion_tokens is not None else (
+            estimate_tokens(call.completion_text) if call.completion_text else 0)
+        if prompt_tokens:
+            llm_tokens.inc(prompt_tokens, kind='prompt', **labels)
+        if completion_tokens:
+            llm_tokens.inc(completion_tokens, kind='completion', **labels)
+
+
+def record_parse_failure(provider: str, operation: str):
+    llm_parse_failures.inc(provider=provider, operation=operation, **context_labels())
+
+
+def record_fallback(operation: str, from_provider: str, to_provider: str):
+    llm_fallbacks.inc(operation=operation, from_provider=from_provider, to_provider=to_provider, **context_labels())
+
+
+def record_cache(cache: str, hit: bool):
+    cache_requests.inc(cache=cache, result='hit' if hit else 'miss', **context_labels())
+
+
+def init_app(app):
+    """Preenche o endpoint do contexto de telemetria no início de cada requisição."""
+    from flask import request
+
+    @app.before_request
+    def _telemetry_context():
+        set_endpoint(request.endpoint)
+        set_tenant(None)
@@ -0,0 +1,180 @@
+# src/services/token_refresher.py
+"""
+Renovação antecipada dos tokens OAuth das conexões de nuvem.
+
+Uma thread em segundo plano renova, a cada CLOUD_TOKEN_REFRESH_INTERVAL segundos, os
+tokens das conexões com `sync_enabled` que expiram nos próximos
+CLOUD_TOKEN_REFRESH_MARGIN segundos. Assim a sincronização encontra o token já válido
+e não espera pela renovação. Os tokens descriptografados ficam em um cache em memória
+por até CLOUD_TOKEN_CACHE_SECONDS (evita o Fernet a cada chamada).
+
+Cada conexão (linha de `cloud_sync`) tem um lock próprio: se duas sincronizações
+encontram o mesmo token vencido, só uma chama o provedor e a outra reaproveita o
+resultado. Entre processos, a linha é relida com SELECT ... FOR UPDATE (PostgreSQL).
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src import db
+
+logger = logging.getLogger(__name__)
+
+REFRESH_MARGIN = timedelta(seconds=int(os.environ.get('CLOUD_TOKEN_REFRESH_MARGIN', '300')))
+REFRESH_INTERVAL_SECONDS = float(os.environ.get('CLOUD_TOKEN_REFRESH_INTERVAL', '60'))
+CACHE_SECONDS = float(os.environ.get('CLOUD_TOKEN_CACHE_SECONDS', '300'))
+
+Failure = Tuple[Dict[str, Any], int]
+
+
+@dataclass
+class CachedToken:
+    access_token: str
+    ciphertext: str        # valor da coluna quando o token foi lido; se mudar, o cache é descartado
+    cached_at: float
+
+
+class TokenRefresher:
+    """Cache de tokens descriptografados e renovação (em primeiro ou segundo plano) por conexão."""
+
+    def __init__(self, get_provider: Callable[[str], Any], oauth_configs: Dict[str, Dict[str, str]],
+                 margin: timedelta = REFRESH_MARGIN, cache_seconds: float = CACHE_SECONDS):
+        self.get_provider = get_provider
+        self.oauth_configs = oauth_configs
+        self.margin = margin
+        self.cache_seconds = cache_seconds
+        self.app = None
+        self._cache: Dict[int, CachedToken] = {}
+        self._locks: Dict[int, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._retry_at: Dict[int, float] = {}  # após uma falha, o segundo plano espera a margem antes de tentar de novo
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def init_app(self, app):
+        self.app = app
+
+    def _lock_for(self, cloud_sync_id: int) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(cloud_sync_id, threading.Lock())
+
+    def invalidate(self, cloud_sync_id: int):
+        """Descarta o token em cache (ex: conexão salva de novo ou desconectada)."""
+        self._cache.pop(cloud_sync_id, None)
+        self._retry_at.pop(cloud_sync_id, None)
+
+    @staticmethod
+    def is_expired(cloud_sync, now: datetime = None) -> bool:
+        return bool(cloud_sync.token_expires_at and cloud_sync.token_expires_at <= (now or datetime.utcnow()))
+
+    def is_due(self, cloud_sync, now: datetime = None) -> bool:
+        """O token expira dentro da margem e deve ser renovado pelo refresher."""
+        return bool(cloud_sync.token_expires_at and
+                    cloud_sync.token_expires_at <= (now or datetime.utcnow()) + self.margin)
+
+    def _decrypted(self, cloud_sync) -> str:
+        cached = self._cache.get(cloud_sync.id)
+        if (cached and cached.ciphertext == cloud_sync.access_token and
+                time.monotonic() - cached.cached_at < self.cache_seconds):
+            return cached.access_token
+        service = self.get_provider(cloud_sync.provider)
+        access_token = service.decrypt_token(cloud_sync.access_token)
+        self._cache[cloud_sync.id] = CachedToken(access_token, cloud_sync.access_token, time.monotonic())
+        return access_token
+
+    def access_token(self, cloud_sync) -> Tuple[Optional[str], Optional[Failure]]:
+        """
+        Token de acesso da conexão. Só renova aqui se já expirou (o refresher não rodou a
+        tempo); perto do vencimento, devolve o atual e deixa a renovação para o segundo plano.
+        Retorna (token, None) ou (None, (corpo de erro, status HTTP)).
+        """
+        if not self.is_expired(cloud_sync):
+            return self._decrypted(cloud_sync), None
+        return self.refresh(cloud_sync)
+
+    def refresh(self, cloud_sync, force: bool = False) -> Tuple[Optional[str], Optional[Failure]]:
+        """Renova o token da conexão (uma vez, mesmo com chamadas concorrentes) e grava o novo no banco."""
+        with self._lock_for(cloud_sync.id):
+            # Outra thread (ou processo) pode ter renovado enquanto esperávamos o lock
+            db.session.refresh(cloud_sync, with_for_update=True)
+            if not force and not self.is_due(cloud_sync):
+                db.session.commit()
+                return self._decrypted(cloud_sync), None
+            service = self.get_provider(cloud_sync.provider)
+            refresh_token = service.decrypt_token(cloud_sync.refresh_token) if cloud_sync.refresh_token else ''
+            if not refresh_token:
+                db.session.commit()
+                self._retry_at[cloud_sync.id] = time.monotonic() + self.margin.total_seconds()
+                return None, ({'error': 'Token expired and no refresh token available'}, 401)
+
+            config = self.oauth_configs[cloud_sync.provider]
+            try:
+                new_tokens = service.refresh_access_token(refresh_token, config['client_id'], config['client_secret'])
+            except Exception as e:
+                new_tokens = {'error': str(e)}
+            if 'access_token' not in new_tokens:
+                db.session.rollback()
+                self._retry_at[cloud_sync.id] = time.monotonic() + self.margin.total_seconds()
+                logger.warning("Falha ao renovar o token da conexão %s (%s): %s",
+                               cloud_sync.id, cloud_sync.provider, new_tokens.get('error'))
+                return None, ({'error': 'Failed to refresh token'}, 401)
+
+            cloud_sync.access_token = service.encrypt_token(new_tokens['access_token'])
+            if new_tokens.get('refresh_token'):
+                # Alguns provedores (ex: Microsoft) trocam também o refresh token
+                cloud_sync.refresh_token = service.encrypt_token(new_tokens['refresh_token'])
+            if 'expires_in' in new_tokens:
+                cloud_sync.token_expires_at = datetime.utcnow() + timedelta(seconds=new_tokens['expires_in'])
+            db.session.commit()
+            self._retry_at.pop(cloud_sync.id, None)
+            self._cache[cloud_sync.id] = CachedToken(new_tokens['access_token'], cloud_sync.access_token, time.monotonic())
+            return new_tokens['access_token'], None
+
+    def refresh_due(self) -> Dict[str, int]:
+        """Renova os tokens que vencem dentro da margem (conexões com sincronização ativa)."""
+        from src.models.cloud_sync import CloudSync
+
+        due = CloudSync.query.filter(
+            CloudSync.sync_enabled.is_(True),
+            CloudSync.refresh_token.isnot(None),
+            CloudSync.token_expires_at <= datetime.utcnow() + self.margin
+        ).all()
+        counts = {'refreshed': 0, 'failed': 0}
+        now = time.monotonic()
+        for cloud_sync in due:
+            if self._retry_at.get(cloud_sync.id, 0) > now:
+                continue
+            _, failure = self.refresh(cloud_sync)
+            counts['failed' if failure else 'refreshed'] += 1
+        if any(counts.values()):
+            logger.info("Tokens renovados: %(refreshed)d, falhas: %(failed)d", counts)
+        return counts
+
+    def run(self, interval: float = REFRESH_INTERVAL_SECONDS, stop_event: Optional[threading.Event] = None):
+        """Laço do refresher em segundo plano."""
+        stop_event = stop_event or self._stop_event
+        while not stop_event.is_set():
+            with self.app.app_context():
+                try:
+                    self.refresh_due()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error("Erro na renovação de tokens: %s", e)
+                finally:
+                    db.session.remove()
+            stop_event.wait(interval)
+
+    def start(self, interval: float = REFRESH_INTERVAL_SECONDS):
+        """Inicia o refresher em uma thread daemon dentro do próprio processo."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self.run, kwargs={'interval': interval},
+                                            name='token-refresher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
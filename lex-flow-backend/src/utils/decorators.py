@@ -1,10 +1,12 @@
 # src/utils/decorators.py
 
+import asyncio
 import jwt
 from functools import wraps
 from flask import request, jsonify, current_app
 # Verifique se o caminho de importação do modelo User está correto
 from src.models.user import User 
+from src.services import telemetry
 
 def token_required(f):
     @wraps(f)
@@ -25,6 +27,7 @@ def token_required(f):
             # if not user:
             #     return jsonify({'message': 'Usuário não encontrado!'}), 401
             current_user = {'id': data['user_id'], 'username': data['username']}
+            telemetry.set_tenant(data.get('tenant_id'))
         except jwt.ExpiredSignatureError:
             return jsonify({'message': 'Token expirou!'}), 401
         except jwt.InvalidTokenError:
@@ -32,4 +35,16 @@ def token_required(f):
 
         return f(current_user, *args, **kwargs)
 
-    return decorated
\ No newline at end of file
+    return decorated
+
+def async_route(f):
+    """Decorator para rotas assíncronas"""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            return loop.run_until_complete(f(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
@@ -0,0 +1,100 @@
+# src/utils/rate_limit.py
+"""
+Limite de taxa por token bucket, seguro entre threads.
+
+O balde começa cheio (`capacity` fichas) e é reabastecido continuamente a `rate` fichas
+por segundo; cada chamada consome uma ficha e espera quando o balde está vazio. As
+taxas são escritas como "quantidade/período", ex: "3/s", "100/10s", "60/m", "5000/h".
+"""
+
+import re
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+_RATE_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*/\s*(\d+(?:\.\d+)?)?\s*([smhd])\s*$')
+
+
+class TokenBucket:
+    """Balde com `capacity` fichas, reabastecido a `rate` fichas por segundo."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        if rate <= 0:
+            raise ValueError("A taxa do token bucket deve ser positiva")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """Consome as fichas se houver; senão retorna quantos segundos faltam para haver (0 = consumiu)."""
+        with self._lock:
+            self._refill(self.clock())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """Espera até consumir as fichas. Retorna False se o `timeout` (segundos) se esgotar antes."""
+        deadline = None if timeout is None else self.clock() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return True
+            if deadline is not None:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            self.sleep(wait)
+
+
+def parse_rate(value: str) -> TokenBucket:
+    """Balde a partir de "quantidade/período" (ex: "100/10s" = até 100 chamadas a cada 10 segundos)."""
+    match = _RATE_PATTERN.match(value or '')
+    if not match:
+        raise ValueError(f"Taxa inválida: {value!r} (use, por exemplo, '3/s', '100/10s' ou '5000/h')")
+    count, span, unit = float(match.group(1)), float(match.group(2) or 1), match.group(3)
+    return TokenBucket(rate=count / (span * _PERIODS[unit]), capacity=count)
+
+
+def parse_rates(value: Optional[str]) -> Dict[str, str]:
+    """Lê taxas por chave no formato "dropbox=10/s,onedrive=600/m" (entradas inválidas são ignoradas)."""
+    rates = {}
+    for item in (value or '').split(','):
+        name, _, rate = item.partition('=')
+        if name.strip() and _RATE_PATTERN.match(rate):
+            rates[name.strip()] = rate.strip()
+    return rates
+
+
+class RateLimiter:
+    """Um token bucket por chave (ex: provedor), criado sob demanda a partir das taxas configuradas."""
+
+    def __init__(self, rates: Dict[str, str], default: Optional[str] = None):
+        self.rates = dict(rates)
+        self.default = default
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, key: str) -> Optional[TokenBucket]:
+        """Balde da chave; None se ela não tem limite."""
+        with self._lock:
+            if key not in self._buckets:
+                rate = self.rates.get(key, self.default)
+                self._buckets[key] = parse_rate(rate) if rate else None
+            return self._buckets[key]
+
+    def acquire(self, key: str, timeout: Optional[float] = None) -> bool:
+        bucket = self.bucket(key)
+        return bucket.acquire(timeout=timeout) if bucket else True
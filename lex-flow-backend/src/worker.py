@@ -0,0 +1,63 @@
+# src/worker.py
+"""
+Processo worker da fila de jobs em segundo plano.
+
+Uso (a partir de 'lex-flow-backend'):
+    python -m src.worker
+
+É a forma padrão de rodar os jobs: o processo web não inicia workers (a não ser no
+servidor de desenvolvimento com JOB_WORKER_INLINE=true).
+
+Vários processos worker podem rodar ao mesmo tempo: cada job é reivindicado
+atomicamente no banco. Para que as notificações Socket.IO cheguem aos clientes
+conectados ao processo web, aponte SOCKETIO_MESSAGE_QUEUE (ex: redis://...) para
+a mesma fila de mensagens usada pelo servidor; sem ela, os clientes consultam
+/api/jobs/<id>.
+"""
+
+import logging
+import os
+import signal
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_socketio import SocketIO
+
+from src.main import app
+from src.routes.cloud import sync_scheduler, token_refresher
+from src.services.job_queue import job_queue
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    message_queue = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+    job_queue.socketio = SocketIO(message_queue=message_queue) if message_queue else None
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+
+    threads = [
+        threading.Thread(target=job_queue.work, kwargs={'stop_event': stop_event}, name=f"job-worker-{index}")
+        for index in range(int(os.environ.get('JOB_WORKER_THREADS', '2')))
+    ]
+    # Renovação antecipada dos tokens OAuth e sincronização automática
+    # (no processo web elas só rodam com JOB_WORKER_INLINE=true)
+    services = [
+        threading.Thread(target=token_refresher.run, kwargs={'stop_event': stop_event}, name='token-refresher'),
+        threading.Thread(target=sync_scheduler.run, kwargs={'stop_event': stop_event}, name='cloud-scheduler'),
+    ]
+    for thread in threads + services:
+        thread.start()
+    logging.info("Worker de jobs iniciado com %d thread(s)", len(threads))
+
+    stop_event.wait()
+    for thread in threads + services:
+        thread.join()
+
+
+if __name__ == '__main__':
+    main()